@@ -65,7 +65,7 @@ from django.shortcuts import render
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.db.models import Sum, Count
-from programs.models import Program, Project
+from programs.models import Program, Project, ImpactSnapshot
 from events.models import Event, EventRegistration
 from testimonials.models import Testimonial
 from partners.models import Partner
@@ -110,9 +110,8 @@ def public_dashboard(request):
     # If not, you might calculate from event registrations or member counts
     total_beneficiaries = Program.objects.aggregate(total=Sum('beneficiaries_reached'))['total'] or total_members * 2
     
-    # Carbon sequestered (tons CO2) - rough estimate based on trees planted
-    # Average tree sequesters ~0.02 tons CO2 per year
-    carbon_sequestered = int(total_trees_planted * 0.02)
+    # Carbon sequestered (tons CO2) - per-species growth model totals (programs/carbon.py)
+    carbon_sequestered = ImpactSnapshot.current().carbon_sequestered
     
     # Get counts for other user types if needed for display
     total_farmers = User.objects.filter(user_type='farmer').count()
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Announcement, AnnouncementAttachment, Newsletter, Feedback, ContactMessage
+from .models import Announcement, AnnouncementAttachment, Newsletter, Feedback, ContactMessage, SegmentCount
 
 
 class AnnouncementAttachmentInline(admin.TabularInline):
@@ -89,7 +89,10 @@ class NewsletterAdmin(admin.ModelAdmin):
             'fields': ('scheduled_for', 'sent_at', 'status', 'is_template', 'target_segment')
         }),
         ('Statistics', {
-            'fields': ('total_recipients', 'sent_count', 'delivered_count', 'opened_count', 'click_count', 'bounce_count', 'unsubscribe_count')
+            'fields': ('total_recipients', 'sent_count', 'delivered_count', 'opened_count', 'click_count', 'bounce_count', 'unsubscribe_count', 'failed_count')
+        }),
+        ('Delivery', {
+            'fields': ('delivery_cursor', 'delivery_heartbeat')
         }),
         ('Campaign Tracking', {
             'fields': ('campaign_id', 'tracking_id')
@@ -99,7 +102,11 @@ class NewsletterAdmin(admin.ModelAdmin):
         }),
     )
     
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = (
+        'total_recipients', 'sent_count', 'delivered_count', 'opened_count', 'click_count',
+        'bounce_count', 'unsubscribe_count', 'failed_count',
+        'delivery_cursor', 'delivery_heartbeat', 'created_at', 'updated_at',
+    )
 
 
 @admin.register(Feedback)
@@ -157,4 +164,16 @@ class ContactMessageAdmin(admin.ModelAdmin):
         }),
     )
     
-    readonly_fields = ('created_at', 'updated_at')
\ No newline at end of file
+    readonly_fields = ('created_at', 'updated_at')
+
+@admin.register(SegmentCount)
+class SegmentCountAdmin(admin.ModelAdmin):
+    list_display = ('segment', 'members', 'email', 'sms', 'newsletter', 'updated_at')
+    readonly_fields = ('segment', 'members', 'email', 'sms', 'newsletter', 'updated_at')
+    
+    # Kept by communications.segments; rebuild with `manage.py rebuild_segments`
+    def has_add_permission(self, request):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
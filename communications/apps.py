@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class CommunicationsConfig(AppConfig):
     name = 'communications'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,250 @@
+"""
+Newsletter delivery.
+
+Nothing is sent from a request: schedule() marks a newsletter due and
+`manage.py send_newsletters` (run from cron) delivers what is due with
+deliver():
+
+    1. a conditional UPDATE claims the newsletter ('sending' plus a claim
+       token), so two runs never deliver the same newsletter
+    2. recipients, the segment's members who take newsletters
+       (communications.segments), are read in keyset batches of BATCH_SIZE
+       (pk > cursor), never with OFFSET and never all at once
+    3. each wave of CONCURRENCY batches is sent in parallel, every worker
+       thread keeping one mail connection (SMTP session or anymail client)
+       open for the whole run
+    4. after each wave one UPDATE adds its counts to the newsletter, moves
+       delivery_cursor past it and refreshes the heartbeat
+
+A run that dies is resumed from delivery_cursor by the next run once its
+heartbeat is older than STALE_AFTER seconds; at most the wave that was in
+flight is sent twice. Setting the status to 'cancelled' stops a run after
+its current wave.
+"""
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from . import segments, tracking
+from .models import Newsletter
+
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+SCHEDULABLE = ('draft', 'scheduled', 'failed', 'cancelled')
+
+
+def _config():
+    return {
+        'BATCH_SIZE': 200,
+        'CONCURRENCY': 1,
+        'STALE_AFTER': 600,
+        'EMAIL_BACKEND': None,  # None: settings.EMAIL_BACKEND
+        **getattr(settings, 'NEWSLETTER_DELIVERY', {}),
+    }
+
+
+def recipients(newsletter):
+    """Users in the newsletter's segment who receive newsletters (communications.segments), in pk order"""
+    return User.objects.filter(
+        segment_memberships__segment=newsletter.target_segment,
+        segment_memberships__newsletter=True,
+    ).order_by('pk')
+
+
+def schedule(newsletter, when=None):
+    """Queue `newsletter` for delivery at `when` (now by default); a cancelled or failed one resumes where it stopped"""
+    return bool(Newsletter.objects.filter(
+        pk=newsletter.pk, is_template=False, status__in=SCHEDULABLE,
+    ).update(status='scheduled', scheduled_for=when or timezone.now()))
+
+
+def due():
+    """Newsletters to deliver now: scheduled ones whose time has come, and sends whose run died"""
+    now = timezone.now()
+    stale = now - timedelta(seconds=_config()['STALE_AFTER'])
+    return Newsletter.objects.filter(is_template=False).filter(
+        Q(status='scheduled', scheduled_for__lte=now)
+        | Q(status='sending') & (Q(delivery_heartbeat__isnull=True) | Q(delivery_heartbeat__lt=stale))
+    )
+
+
+def progress(newsletter):
+    newsletter = Newsletter.objects.only(
+        'status', 'total_recipients', 'sent_count', 'failed_count', 'delivery_heartbeat', 'sent_at',
+    ).get(pk=newsletter.pk)
+    handled = newsletter.sent_count + newsletter.failed_count
+    return {
+        'status': newsletter.status,
+        'total_recipients': newsletter.total_recipients,
+        'sent': newsletter.sent_count,
+        'failed': newsletter.failed_count,
+        'remaining': max(newsletter.total_recipients - handled, 0),
+        'percent': min(round(100 * handled / newsletter.total_recipients, 1), 100.0) if newsletter.total_recipients else None,
+        'heartbeat': newsletter.delivery_heartbeat,
+        'sent_at': newsletter.sent_at,
+    }
+
+
+def deliver_due(**options):
+    """deliver() every due newsletter; returns their summaries"""
+    summaries = []
+    for pk in due().order_by('scheduled_for').values_list('pk', flat=True):
+        summary = deliver(Newsletter(pk=pk), **options)
+        if summary is not None:
+            summaries.append(summary)
+    return summaries
+
+
+def deliver(newsletter, concurrency=None, batch_size=None):
+    """
+    Send `newsletter` to whoever it has not reached yet. Returns a summary,
+    or None when it is not due or another run holds it.
+    """
+    config = _config()
+    concurrency = max(concurrency or config['CONCURRENCY'], 1)
+    batch_size = max(batch_size or config['BATCH_SIZE'], 1)
+
+    token = uuid.uuid4()
+    if not due().filter(pk=newsletter.pk).update(status='sending', delivery_claim=token, delivery_heartbeat=timezone.now()):
+        return None
+    newsletter = Newsletter.objects.get(pk=newsletter.pk)
+    rows = recipients(newsletter)
+    if newsletter.delivery_cursor == 0:
+        Newsletter.objects.filter(pk=newsletter.pk, delivery_claim=token).update(
+            total_recipients=segments.count(newsletter.target_segment, 'newsletter'),
+        )
+    held = Newsletter.objects.filter(pk=newsletter.pk, status='sending', delivery_claim=token)
+
+    cursor = newsletter.delivery_cursor
+    sent = failed = waves = 0
+    sender = _Sender(newsletter, config['EMAIL_BACKEND'])
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='newsletter') as pool:
+            while True:
+                batches = []
+                while len(batches) < concurrency:
+                    batch = list(rows.filter(pk__gt=cursor).values_list('pk', 'email')[:batch_size])
+                    if not batch:
+                        break
+                    batches.append(batch)
+                    cursor = batch[-1][0]
+                if not batches:
+                    break
+
+                results = list(pool.map(sender.send, batches))
+                wave_sent = sum(result[0] for result in results)
+                wave_failed = sum(result[1] for result in results)
+                if not held.update(
+                    sent_count=F('sent_count') + wave_sent,
+                    failed_count=F('failed_count') + wave_failed,
+                    delivery_cursor=cursor,
+                    delivery_heartbeat=timezone.now(),
+                ):
+                    logger.info("Newsletter %s: stopped after %d wave(s), no longer held by this run", newsletter.pk, waves)
+                    return _summary(newsletter, 'stopped', sent, failed, waves)
+                sent += wave_sent
+                failed += wave_failed
+                waves += 1
+    finally:
+        sender.close()
+
+    held.update(
+        status=Case(When(sent_count=0, failed_count__gt=0, then=Value('failed')), default=Value('sent')),
+        sent_at=timezone.now(),
+        delivery_claim=None,
+    )
+    status = Newsletter.objects.filter(pk=newsletter.pk).values_list('status', flat=True).get()
+    logger.info("Newsletter %s: %s, %d sent and %d failed in %d wave(s)", newsletter.pk, status, sent, failed, waves)
+    return _summary(newsletter, status, sent, failed, waves)
+
+
+def _summary(newsletter, status, sent, failed, waves):
+    return {'newsletter': newsletter.pk, 'status': status, 'sent': sent, 'failed': failed, 'waves': waves}
+
+
+class _Sender:
+    """Builds and sends the messages of a batch over the calling thread's own connection"""
+
+    def __init__(self, newsletter, backend=None):
+        self.newsletter_id = newsletter.pk
+        self.subject = newsletter.subject
+        self.body = newsletter.content
+        self.html = newsletter.html_content
+        self.backend = backend
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = []
+
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = get_connection(self.backend)
+            connection.open()
+            with self.lock:
+                self.connections.append(connection)
+        return connection
+
+    def message(self, pk, email, connection):
+        message = EmailMultiAlternatives(
+            subject=self.subject,
+            body=self.body,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[email],
+            connection=connection,
+        )
+        if self.html:
+            # Per-recipient links and open pixel (communications.tracking)
+            message.attach_alternative(tracking.personalize(self.html, tracking.token(self.newsletter_id, pk)), 'text/html')
+        # Echoed back by anymail tracking webhooks; ignored by other backends
+        message.tags = ['newsletter']
+        message.metadata = {'newsletter_id': self.newsletter_id, 'user_id': pk}
+        return message
+
+    def send(self, batch):
+        """(sent, failed) for [(pk, email), ...]"""
+        sent = failed = 0
+        for pk, email in batch:
+            try:
+                connection = self.connection()
+                if connection.send_messages([self.message(pk, email, connection)]):
+                    sent += 1
+                else:
+                    failed += 1
+            except Exception:
+                logger.warning("Newsletter delivery to user %s failed", pk, exc_info=True)
+                failed += 1
+                self.reset()
+        return sent, failed
+
+    def reset(self):
+        """Drop this thread's connection after an error; the next message opens a fresh one"""
+        connection = getattr(self.local, 'connection', None)
+        self.local.connection = None
+        if connection is not None:
+            with self.lock:
+                self.connections.remove(connection)
+            _close(connection)
+
+    def close(self):
+        with self.lock:
+            connections, self.connections = self.connections, []
+        for connection in connections:
+            _close(connection)
+
+
+def _close(connection):
+    try:
+        connection.close()
+    except Exception:
+        logger.debug("Could not close mail connection", exc_info=True)
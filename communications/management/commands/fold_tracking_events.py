@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from communications import tracking
+from communications.models import Newsletter
+
+
+class Command(BaseCommand):
+    help = "Add recorded newsletter opens, clicks, bounces and unsubscribes to the newsletter counters (run every minute)"
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--recount', action='store_true', help="Then recount every newsletter from its folded events")
+    
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            folded = tracking.fold()
+            total += folded
+            if not folded:
+                break
+        self.stdout.write(f"Folded {total} tracking event(s)")
+        
+        if options['recount']:
+            for newsletter in Newsletter.objects.filter(tracking_events__isnull=False).distinct().only('pk'):
+                tracking.refold(newsletter)
+            self.stdout.write("Recounted tracked newsletters")
+        self.stdout.write(self.style.SUCCESS("Newsletter tracking counters up to date"))
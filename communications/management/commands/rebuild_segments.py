@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from communications import segments
+
+
+class Command(BaseCommand):
+    help = "Recompute segment memberships and counts from communications.segments.SEGMENTS"
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Users refreshed per transaction")
+    
+    def handle(self, *args, **options):
+        written = segments.rebuild(batch_size=max(options['batch_size'], 1))
+        self.stdout.write(f"Wrote {written} membership row(s)")
+        for segment, totals in segments.counts().items():
+            self.stdout.write(f"  {segment}: {totals['members']} member(s), {totals['newsletter']} newsletter recipient(s)")
+        self.stdout.write(self.style.SUCCESS("Segments up to date"))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from communications import delivery
+from communications.models import Newsletter
+
+
+class Command(BaseCommand):
+    help = "Deliver scheduled newsletters that are due, resuming any send whose run died"
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--newsletter', type=int, help="Only this newsletter (it must still be due)")
+        parser.add_argument('--concurrency', type=int, help="Batches in flight, overriding NEWSLETTER_DELIVERY")
+        parser.add_argument('--batch-size', type=int, help="Recipients per batch, overriding NEWSLETTER_DELIVERY")
+    
+    def handle(self, *args, **options):
+        settings = {'concurrency': options['concurrency'], 'batch_size': options['batch_size']}
+        if options['newsletter']:
+            if not Newsletter.objects.filter(pk=options['newsletter']).exists():
+                raise CommandError(f"Newsletter {options['newsletter']} does not exist")
+            summary = delivery.deliver(Newsletter(pk=options['newsletter']), **settings)
+            summaries = [summary] if summary else []
+        else:
+            summaries = delivery.deliver_due(**settings)
+        
+        for summary in summaries:
+            self.stdout.write(
+                f"  Newsletter {summary['newsletter']}: {summary['status']}, "
+                f"{summary['sent']} sent, {summary['failed']} failed"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Delivered {len(summaries)} newsletter(s)"))
@@ -0,0 +1,20 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:28
+
+import core.storage
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='announcementattachment',
+            name='file',
+            field=models.FileField(storage=core.storage.content_addressed_storage, upload_to='announcements/attachments/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf', 'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', 'jpg', 'png', 'zip'])]),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_audience(apps, schema_editor):
+    """Audience rows for the announcements already published, oldest first so ids follow publish order"""
+    Announcement = apps.get_model('communications', 'Announcement')
+    AnnouncementAudience = apps.get_model('communications', 'AnnouncementAudience')
+    targeted = {}
+    for announcement_id, user_id in Announcement.objects.filter(
+        is_published=True, specific_users__isnull=False,
+    ).values_list('pk', 'specific_users'):
+        targeted.setdefault(announcement_id, []).append(user_id)
+    rows = []
+    published = Announcement.objects.filter(is_published=True).order_by('publish_date', 'pk')
+    for pk, audience, publish_date, expiry_date in published.values_list('pk', 'target_audience', 'publish_date', 'expiry_date').iterator():
+        dates = {'announcement_id': pk, 'publish_date': publish_date, 'expiry_date': expiry_date}
+        rows.append(AnnouncementAudience(audience=audience, **dates))
+        rows.extend(AnnouncementAudience(user_id=user_id, **dates) for user_id in targeted.get(pk, []))
+    AnnouncementAudience.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0002_alter_announcementattachment_file'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnnouncementReadCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_read', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='announcement_cursor', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AnnouncementAudience',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('audience', models.CharField(blank=True, help_text='target_audience value; blank on per-user rows', max_length=20)),
+                ('publish_date', models.DateTimeField()),
+                ('expiry_date', models.DateTimeField(blank=True, null=True)),
+                ('announcement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audience_rows', to='communications.announcement')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='announcement_audience', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['audience', '-publish_date'], name='announce_aud_audience_idx'), models.Index(fields=['user', '-publish_date'], name='announce_aud_user_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('announcement', 'audience'), name='unique_announcement_audience'), models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('announcement', 'user'), name='unique_announcement_user')],
+            },
+        ),
+        migrations.RunPython(fill_audience, migrations.RunPython.noop),
+    ]
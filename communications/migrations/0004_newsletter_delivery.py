@@ -0,0 +1,37 @@
+# Generated by Django 6.0.1 on 2026-10-17 04:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0003_announcement_audience'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newsletter',
+            name='delivery_claim',
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='newsletter',
+            name='delivery_cursor',
+            field=models.BigIntegerField(default=0, help_text='Highest recipient id already handed to the mail backend'),
+        ),
+        migrations.AddField(
+            model_name='newsletter',
+            name='delivery_heartbeat',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='newsletter',
+            name='failed_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='newsletter',
+            index=models.Index(fields=['status', 'scheduled_for'], name='newsletter_due_idx'),
+        ),
+    ]
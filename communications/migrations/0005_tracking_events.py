@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-17 04:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0004_newsletter_delivery'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackingCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(default='newsletters', max_length=50, unique=True)),
+                ('last_event', models.BigIntegerField(default=0, help_text='Highest TrackingEvent id folded')),
+                ('folded_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TrackingEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.PositiveSmallIntegerField(choices=[(1, 'Open'), (2, 'Click'), (3, 'Bounce'), (4, 'Unsubscribe'), (5, 'Delivered'), (6, 'Spam complaint')])),
+                ('channel', models.PositiveSmallIntegerField(choices=[(1, 'Email'), (2, 'SMS')], default=1)),
+                ('recorded_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('url', models.CharField(blank=True, default='', help_text='Clicked link', max_length=500)),
+                ('newsletter', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='tracking_events', to='communications.newsletter')),
+                ('user', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['newsletter', 'user', 'kind'], name='tracking_event_recipient_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,118 @@
+# Generated by Django 6.0.1 on 2026-10-17 04:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+# A frozen copy of the communications.segments rules as they stood when segments
+# were introduced; later changes reach existing rows through `manage.py rebuild_segments`
+
+MEMBER_TYPES = ['member', 'farmer', 'youth', 'executive']
+
+SEGMENTS = {
+    'all': [{}],
+    'members': [{'user_type__in': MEMBER_TYPES}],
+    'executive': [{'user_type': 'executive'}, {'membership_type': 'executive'}],
+    'youth': [{'user_type': 'youth'}],
+    'women': [{'gender': 'female'}],
+    'farmers': [{'user_type': 'farmer'}],
+    'staff': [{'is_staff': True}, {'user_type__in': ['staff', 'admin']}],
+    'custom': [],
+}
+
+CHANNELS = ('email', 'sms', 'newsletter')
+
+
+def _matches(user, lookups):
+    for lookup, expected in lookups.items():
+        field, _, operator = lookup.partition('__')
+        value = getattr(user, field)
+        if operator == 'in' and value not in expected:
+            return False
+        if not operator and value != expected:
+            return False
+    return True
+
+
+def _memberships(user, profile):
+    if not user.is_active:
+        return {}
+    email = bool(user.email) and (profile is None or profile.receive_email)
+    reach = {
+        'email': email,
+        'sms': bool(user.phone) and (profile is None or profile.receive_sms),
+        'newsletter': email and user.newsletter_subscription and (profile is None or profile.receive_newsletter),
+    }
+    return {
+        segment: dict(reach) for segment, alternatives in SEGMENTS.items()
+        if any(_matches(user, lookups) for lookups in alternatives)
+    }
+
+
+def fill_segments(apps, schema_editor):
+    """Memberships and counts for the existing users"""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    MemberProfile = apps.get_model('accounts', 'MemberProfile')
+    SegmentMembership = apps.get_model('communications', 'SegmentMembership')
+    SegmentCount = apps.get_model('communications', 'SegmentCount')
+    profiles = {profile.user_id: profile for profile in MemberProfile.objects.all()}
+    rows = []
+    for user in User.objects.order_by('pk').iterator():
+        for segment, reach in _memberships(user, profiles.get(user.pk)).items():
+            rows.append(SegmentMembership(user_id=user.pk, segment=segment, **reach))
+    SegmentMembership.objects.bulk_create(rows, batch_size=500)
+    totals = {
+        row.pop('segment'): row
+        for row in SegmentMembership.objects.values('segment').annotate(
+            members=Count('id'),
+            **{channel: Count('id', filter=Q(**{channel: True})) for channel in CHANNELS},
+        )
+    }
+    SegmentCount.objects.bulk_create([
+        SegmentCount(segment=segment, **totals.get(segment, {}))
+        for segment in SEGMENTS
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_memberprofile_options_and_more'),
+        ('communications', '0005_tracking_events'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SegmentCount',
+            fields=[
+                ('segment', models.CharField(choices=[('all', 'All Users'), ('members', 'Members Only'), ('executive', 'Executive Committee'), ('youth', 'Youth Members'), ('women', 'Women Members'), ('farmers', 'Farmer Members'), ('staff', 'Staff Only'), ('custom', 'Custom Audience')], max_length=20, primary_key=True, serialize=False)),
+                ('members', models.IntegerField(default=0)),
+                ('email', models.IntegerField(default=0, help_text='Members reachable by email')),
+                ('sms', models.IntegerField(default=0, help_text='Members reachable by SMS')),
+                ('newsletter', models.IntegerField(default=0, help_text='Members who receive newsletters')),
+                ('updated_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['segment'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SegmentMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('segment', models.CharField(choices=[('all', 'All Users'), ('members', 'Members Only'), ('executive', 'Executive Committee'), ('youth', 'Youth Members'), ('women', 'Women Members'), ('farmers', 'Farmer Members'), ('staff', 'Staff Only'), ('custom', 'Custom Audience')], max_length=20)),
+                ('email', models.BooleanField(default=False)),
+                ('sms', models.BooleanField(default=False)),
+                ('newsletter', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segment_memberships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('newsletter', True)), fields=['segment', 'user'], name='segment_newsletter_idx')],
+                'constraints': [models.UniqueConstraint(fields=('segment', 'user'), name='unique_segment_member')],
+            },
+        ),
+        migrations.RunPython(fill_segments, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,9 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.core.validators import FileExtensionValidator
+from core.storage import content_addressed_storage
 
 
 User = get_user_model()
@@ -89,12 +91,153 @@ class Announcement(models.Model):
         if self.is_published and not self.published_by and hasattr(self, 'request') and self.request.user:
             self.published_by = self.request.user
         super().save(*args, **kwargs)
+    
+    @classmethod
+    def audiences_for(cls, user):
+        """The target_audience values whose announcements `user` sees"""
+        if not user.is_authenticated:
+            return ['all']
+        if user.is_staff or user.user_type == 'executive':
+            # Staff and executives can see all announcements
+            return [audience for audience, _ in cls.TARGET_AUDIENCE]
+        audiences = ['all', 'members']
+        if user.membership_type == 'honorary':
+            audiences.append('executive')
+        # Plus the segments (communications.segments) the user belongs to
+        for segment in SegmentMembership.objects.filter(user=user).values_list('segment', flat=True):
+            if segment not in audiences:
+                audiences.append(segment)
+        return audiences
+    
+    @classmethod
+    def visible_to(cls, user):
+        """Published, unexpired announcements targeted at the user"""
+        return cls.objects.filter(pk__in=AnnouncementAudience.for_user(user).values('announcement_id'))
+    
+    def sync_audience(self):
+        """
+        Bring this announcement's AnnouncementAudience rows in line with its
+        audience and publishing fields. Rows that still apply keep their ids,
+        so editing an announcement does not make it unread again.
+        """
+        wanted = set()
+        if self.is_published:
+            wanted.add((self.target_audience, None))
+            wanted.update(('', user_id) for user_id in self.specific_users.values_list('pk', flat=True))
+        
+        stale, outdated = [], []
+        for pk, audience, user_id, publish_date, expiry_date in AnnouncementAudience.objects.filter(
+            announcement=self,
+        ).values_list('pk', 'audience', 'user_id', 'publish_date', 'expiry_date'):
+            if (audience, user_id) not in wanted:
+                stale.append(pk)
+                continue
+            wanted.discard((audience, user_id))
+            if (publish_date, expiry_date) != (self.publish_date, self.expiry_date):
+                outdated.append(pk)
+        
+        if stale:
+            AnnouncementAudience.objects.filter(pk__in=stale).delete()
+        if outdated:
+            AnnouncementAudience.objects.filter(pk__in=outdated).update(
+                publish_date=self.publish_date,
+                expiry_date=self.expiry_date,
+            )
+        AnnouncementAudience.objects.bulk_create([
+            AnnouncementAudience(
+                announcement=self,
+                audience=audience,
+                user_id=user_id,
+                publish_date=self.publish_date,
+                expiry_date=self.expiry_date,
+            )
+            for audience, user_id in wanted
+        ], batch_size=500, ignore_conflicts=True)
+
+
+class AnnouncementAudience(models.Model):
+    """
+    Who a published announcement is for: one row per announcement for its
+    target_audience, plus one per user in specific_users. Maintained by
+    Announcement.sync_audience(), so a feed is an index range scan on
+    (audience, publish_date) and (user, publish_date) with no join on
+    specific_users and no DISTINCT. Row ids only grow, which makes them the
+    unread cursor (AnnouncementReadCursor).
+    """
+    announcement = models.ForeignKey(Announcement, on_delete=models.CASCADE, related_name='audience_rows')
+    audience = models.CharField(max_length=20, blank=True, help_text="target_audience value; blank on per-user rows")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='announcement_audience')
+    # Copied from the announcement so the feed never reads it to filter
+    publish_date = models.DateTimeField()
+    expiry_date = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['audience', '-publish_date'], name='announce_aud_audience_idx'),
+            models.Index(fields=['user', '-publish_date'], name='announce_aud_user_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['announcement', 'audience'],
+                condition=Q(user__isnull=True),
+                name='unique_announcement_audience',
+            ),
+            models.UniqueConstraint(
+                fields=['announcement', 'user'],
+                condition=Q(user__isnull=False),
+                name='unique_announcement_user',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.announcement_id} -> {self.user_id or self.audience}"
+    
+    @classmethod
+    def for_user(cls, user, now=None):
+        """Unexpired rows addressed to `user`, directly or through one of their audiences"""
+        now = now or timezone.now()
+        targeted = Q(audience__in=Announcement.audiences_for(user), user__isnull=True)
+        if user.is_authenticated:
+            targeted |= Q(user=user)
+        return cls.objects.filter(targeted).filter(Q(expiry_date__isnull=True) | Q(expiry_date__gt=now))
+
+
+class AnnouncementReadCursor(models.Model):
+    """The highest AnnouncementAudience id a user has marked read"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='announcement_cursor')
+    last_read = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.user} @ {self.last_read}"
+    
+    @classmethod
+    def position(cls, user):
+        return cls.objects.filter(user=user).values_list('last_read', flat=True).first() or 0
+    
+    @classmethod
+    def advance(cls, user, position):
+        """Move the cursor forward to `position`; it never moves back"""
+        cursor, created = cls.objects.get_or_create(user=user, defaults={'last_read': position})
+        if not created:
+            cls.objects.filter(pk=cursor.pk, last_read__lt=position).update(
+                last_read=position, updated_at=timezone.now(),
+            )
+        return max(cursor.last_read, position)
+    
+    @classmethod
+    def unread(cls, user):
+        """(announcements published to `user` since their cursor, position to advance the cursor to)"""
+        latest = AnnouncementAudience.objects.aggregate(latest=models.Max('pk'))['latest'] or 0
+        rows = AnnouncementAudience.for_user(user).filter(pk__gt=cls.position(user), pk__lte=latest)
+        return Announcement.objects.filter(pk__in=rows.values('announcement_id')), latest
 
 
 class AnnouncementAttachment(models.Model):
     announcement = models.ForeignKey(Announcement, on_delete=models.CASCADE, related_name='attachment_files')
     file = models.FileField(
         upload_to='announcements/attachments/',
+        storage=content_addressed_storage,
         validators=[
             FileExtensionValidator(allowed_extensions=['pdf', 'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', 'jpg', 'png', 'zip'])
         ]
@@ -162,6 +305,12 @@ class Newsletter(models.Model):
     click_count = models.IntegerField(default=0)
     bounce_count = models.IntegerField(default=0)
     unsubscribe_count = models.IntegerField(default=0)
+    failed_count = models.IntegerField(default=0)
+    
+    # Delivery progress (communications.delivery)
+    delivery_cursor = models.BigIntegerField(default=0, help_text="Highest recipient id already handed to the mail backend")
+    delivery_claim = models.UUIDField(null=True, blank=True, editable=False)
+    delivery_heartbeat = models.DateTimeField(null=True, blank=True)
     
     # Campaign tracking
     campaign_id = models.CharField(max_length=100, null=True, blank=True)
@@ -170,11 +319,129 @@ class Newsletter(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    COUNTER_FIELDS = [
+        'total_recipients', 'sent_count', 'delivered_count', 'opened_count', 'click_count',
+        'bounce_count', 'unsubscribe_count', 'failed_count',
+        'delivery_cursor', 'delivery_claim', 'delivery_heartbeat',
+    ]
+    
     class Meta:
         ordering = ['-scheduled_for']
+        indexes = [
+            models.Index(fields=['status', 'scheduled_for'], name='newsletter_due_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - Edition {self.edition_number or 'N/A'}"
+    
+    def save(self, *args, **kwargs):
+        # Delivery counters and progress are only written by communications.delivery,
+        # never from a possibly stale instance (an edit form opened mid-send)
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+
+class TrackingEvent(models.Model):
+    """
+    One open, click, bounce, ... of a recipient's copy of a newsletter.
+    Append-only: rows are inserted by communications.tracking and never
+    updated; tracking.fold() adds those past TrackingCursor to the
+    Newsletter counters.
+    """
+    OPEN = 1
+    CLICK = 2
+    BOUNCE = 3
+    UNSUBSCRIBE = 4
+    DELIVERED = 5
+    COMPLAINT = 6
+    KIND_CHOICES = (
+        (OPEN, 'Open'),
+        (CLICK, 'Click'),
+        (BOUNCE, 'Bounce'),
+        (UNSUBSCRIBE, 'Unsubscribe'),
+        (DELIVERED, 'Delivered'),
+        (COMPLAINT, 'Spam complaint'),
+    )
+    
+    EMAIL = 1
+    SMS = 2
+    CHANNEL_CHOICES = (
+        (EMAIL, 'Email'),
+        (SMS, 'SMS'),
+    )
+    
+    newsletter = models.ForeignKey(Newsletter, on_delete=models.CASCADE, related_name='tracking_events', db_index=False)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', db_index=False)
+    kind = models.PositiveSmallIntegerField(choices=KIND_CHOICES)
+    channel = models.PositiveSmallIntegerField(choices=CHANNEL_CHOICES, default=EMAIL)
+    recorded_at = models.DateTimeField(default=timezone.now)
+    url = models.CharField(max_length=500, blank=True, default='', help_text="Clicked link")
+    
+    class Meta:
+        indexes = [
+            # Also serves newsletter lookups: "has this recipient opened before?" while folding
+            models.Index(fields=['newsletter', 'user', 'kind'], name='tracking_event_recipient_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} of newsletter {self.newsletter_id} by {self.user_id or 'unknown'}"
+
+
+class TrackingCursor(models.Model):
+    """How far tracking.fold() has added TrackingEvent rows to the Newsletter counters"""
+    GLOBAL_KEY = 'newsletters'
+    
+    key = models.CharField(max_length=50, unique=True, default=GLOBAL_KEY)
+    last_event = models.BigIntegerField(default=0, help_text="Highest TrackingEvent id folded")
+    folded_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"Tracking cursor ({self.key}) at {self.last_event}"
+
+
+class SegmentMembership(models.Model):
+    """
+    One active user in one segment (communications.segments), with whether
+    they can be reached there by email, SMS and the newsletter. Maintained by
+    segments.refresh(); never edited directly.
+    """
+    segment = models.CharField(max_length=20, choices=Announcement.TARGET_AUDIENCE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='segment_memberships')
+    email = models.BooleanField(default=False)
+    sms = models.BooleanField(default=False)
+    newsletter = models.BooleanField(default=False)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['segment', 'user'], name='unique_segment_member'),
+        ]
+        indexes = [
+            # Newsletter recipients: a range scan in user order (delivery's keyset)
+            models.Index(fields=['segment', 'user'], condition=Q(newsletter=True), name='segment_newsletter_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} in {self.segment}"
+
+
+class SegmentCount(models.Model):
+    """Size of a segment, kept current by segments.refresh() adding the difference of every change"""
+    segment = models.CharField(max_length=20, choices=Announcement.TARGET_AUDIENCE, primary_key=True)
+    members = models.IntegerField(default=0)
+    email = models.IntegerField(default=0, help_text="Members reachable by email")
+    sms = models.IntegerField(default=0, help_text="Members reachable by SMS")
+    newsletter = models.IntegerField(default=0, help_text="Members who receive newsletters")
+    updated_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['segment']
+    
+    def __str__(self):
+        return f"{self.get_segment_display()}: {self.members}"
 
 
 class Feedback(models.Model):
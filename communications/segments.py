@@ -0,0 +1,212 @@
+"""
+Recipient segments: who an Announcement.target_audience or a
+Newsletter.target_segment reaches.
+
+A segment is declared once, in SEGMENTS, as a list of alternatives, each a
+dict of CustomUser field lookups (exact or __in); an active user is in the
+segment when any alternative matches. 'custom' has no standing members:
+those announcements name their users in specific_users.
+
+Membership is materialized in SegmentMembership, one row per user per
+segment, flagged with whether the user can be reached there by email, SMS
+and the newsletter (consent and MemberProfile preferences included), and
+SegmentCount holds each segment's totals. Consumers never evaluate the
+rules themselves:
+
+    delivery.recipients()           an index range scan on (segment, user)
+    Announcement.audiences_for()    one lookup by user
+    counts()                        one row per segment
+
+refresh(user_ids) brings some users' rows in line with the rules while
+holding their user rows locked, and adds the difference to SegmentCount
+with core.counters.apply_counts, so concurrent changes never lose a count.
+The price is a hot row: every sign-up adds to SegmentCount 'all' and
+'members', so simultaneous sign-ups queue on those two row locks until they
+commit. That is cheap at KACAF's sign-up rate; buffering them through
+counters.increment() would free the rows but leave the counts open to
+drift around recount().
+communications.signals calls it when a CustomUser or MemberProfile save
+touches a field the rules read. QuerySet.update() bypasses signals: code
+that bulk-updates those fields calls refresh() itself (tracking.fold), and
+`manage.py rebuild_segments` recomputes everything, e.g. after a change to
+SEGMENTS.
+"""
+import logging
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from accounts.models import MemberProfile
+from core import counters
+from .models import Announcement, SegmentCount, SegmentMembership
+
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+MEMBER_TYPES = ['member', 'farmer', 'youth', 'executive']
+
+# Announcement.TARGET_AUDIENCE value -> alternatives of CustomUser lookups
+SEGMENTS = {
+    'all': [{}],
+    'members': [{'user_type__in': MEMBER_TYPES}],
+    'executive': [{'user_type': 'executive'}, {'membership_type': 'executive'}],
+    'youth': [{'user_type': 'youth'}],
+    'women': [{'gender': 'female'}],
+    'farmers': [{'user_type': 'farmer'}],
+    'staff': [{'is_staff': True}, {'user_type__in': ['staff', 'admin']}],
+    'custom': [],
+}
+
+# Ways a member can be reached; a boolean column each on SegmentMembership and a total on SegmentCount
+CHANNELS = ('email', 'sms', 'newsletter')
+
+# Fields the rules and channels read: saves that touch none of them leave memberships alone
+USER_FIELDS = {
+    'is_active', 'is_staff', 'user_type', 'membership_type', 'gender', 'email', 'phone', 'newsletter_subscription',
+}
+PROFILE_FIELDS = {'receive_email', 'receive_sms', 'receive_newsletter'}
+
+LABEL = 'communications.SegmentCount'
+
+
+def _matches(user, lookups):
+    for lookup, expected in lookups.items():
+        field, _, operator = lookup.partition('__')
+        value = getattr(user, field)
+        if operator == 'in':
+            if value not in expected:
+                return False
+        elif operator:
+            raise ValueError(f"Unsupported segment lookup {lookup!r}")
+        elif value != expected:
+            return False
+    return True
+
+
+def memberships(user, profile=None):
+    """{segment: {channel: reachable}} for `user` under SEGMENTS; `profile` is their MemberProfile, if any"""
+    if not user.is_active:
+        return {}
+    email = bool(user.email) and (profile is None or profile.receive_email)
+    reach = {
+        'email': email,
+        'sms': bool(user.phone) and (profile is None or profile.receive_sms),
+        'newsletter': email and user.newsletter_subscription and (profile is None or profile.receive_newsletter),
+    }
+    return {
+        segment: dict(reach) for segment, alternatives in SEGMENTS.items()
+        if any(_matches(user, lookups) for lookups in alternatives)
+    }
+
+
+def _count(totals, segment, reach, sign):
+    totals[(LABEL, 'members')][segment] += sign
+    for channel in CHANNELS:
+        if reach[channel]:
+            totals[(LABEL, channel)][segment] += sign
+
+
+def refresh(user_ids):
+    """Bring the memberships of `user_ids` in line with SEGMENTS; returns the number of rows written"""
+    user_ids = list(set(user_ids))
+    if not user_ids:
+        return 0
+    with transaction.atomic():
+        # Serializes refreshes of the same user, so each sees the other's rows
+        users = list(User.objects.select_for_update().filter(pk__in=user_ids).only(*USER_FIELDS))
+        profiles = {
+            profile.user_id: profile
+            for profile in MemberProfile.objects.filter(user_id__in=user_ids).only('user_id', *PROFILE_FIELDS)
+        }
+        wanted = {
+            (user.pk, segment): reach
+            for user in users
+            for segment, reach in memberships(user, profiles.get(user.pk)).items()
+        }
+
+        totals = defaultdict(lambda: defaultdict(int))
+        stale = []
+        for pk, user_id, segment, *flags in SegmentMembership.objects.filter(user_id__in=user_ids).values_list(
+            'pk', 'user_id', 'segment', *CHANNELS,
+        ):
+            reach = dict(zip(CHANNELS, flags))
+            if wanted.get((user_id, segment)) == reach:
+                del wanted[(user_id, segment)]
+                continue
+            stale.append(pk)
+            _count(totals, segment, reach, -1)
+        for (user_id, segment), reach in wanted.items():
+            _count(totals, segment, reach, 1)
+
+        if stale:
+            SegmentMembership.objects.filter(pk__in=stale).delete()
+        SegmentMembership.objects.bulk_create([
+            SegmentMembership(user_id=user_id, segment=segment, **reach)
+            for (user_id, segment), reach in wanted.items()
+        ], batch_size=500)
+        counters.apply_counts(totals)
+    return len(stale) + len(wanted)
+
+
+def forget(user_ids):
+    """Take users who are about to be deleted out of every segment"""
+    with transaction.atomic():
+        list(User.objects.select_for_update().filter(pk__in=user_ids).values_list('pk', flat=True))
+        rows = SegmentMembership.objects.filter(user_id__in=user_ids)
+        totals = defaultdict(lambda: defaultdict(int))
+        for segment, *flags in rows.values_list('segment', *CHANNELS):
+            _count(totals, segment, dict(zip(CHANNELS, flags)), -1)
+        rows.delete()
+        counters.apply_counts(totals)
+
+
+def rebuild(batch_size=1000):
+    """Recompute every user's memberships, then every SegmentCount; returns the number of rows written"""
+    SegmentCount.objects.bulk_create(
+        [SegmentCount(segment=segment) for segment, _ in Announcement.TARGET_AUDIENCE], ignore_conflicts=True,
+    )
+    written = last = 0
+    while True:
+        user_ids = list(User.objects.filter(pk__gt=last).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not user_ids:
+            break
+        written += refresh(user_ids)
+        last = user_ids[-1]
+    recount()
+    logger.info("Rebuilt segment memberships, %d row(s) written", written)
+    return written
+
+
+def recount():
+    """Set every SegmentCount from the SegmentMembership rows"""
+    with transaction.atomic():
+        totals = {
+            row.pop('segment'): row
+            for row in SegmentMembership.objects.values('segment').annotate(
+                members=Count('id'),
+                **{channel: Count('id', filter=Q(**{channel: True})) for channel in CHANNELS},
+            )
+        }
+        now = timezone.now()
+        for segment in SegmentCount.objects.select_for_update().values_list('segment', flat=True):
+            SegmentCount.objects.filter(segment=segment).update(
+                updated_at=now, **totals.get(segment, {'members': 0, **{channel: 0 for channel in CHANNELS}}),
+            )
+
+
+def counts():
+    """{segment: {'members': n, 'email': n, 'sms': n, 'newsletter': n}}"""
+    return {
+        row.pop('segment'): row
+        for row in SegmentCount.objects.values('segment', 'members', *CHANNELS, 'updated_at')
+    }
+
+
+def count(segment, channel='members'):
+    """Members of `segment`, or those reachable on `channel`"""
+    return SegmentCount.objects.filter(segment=segment).values_list(channel, flat=True).first() or 0
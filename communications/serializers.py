@@ -18,8 +18,9 @@ class NewsletterSerializer(serializers.ModelSerializer):
     class Meta:
         model = Newsletter
         fields = '__all__'
-        read_only_fields = ['sent_count', 'delivered_count', 'opened_count', 'click_count',
-                           'bounce_count', 'unsubscribe_count', 'created_at', 'updated_at']
+        read_only_fields = ['total_recipients', 'sent_count', 'delivered_count', 'opened_count', 'click_count',
+                           'bounce_count', 'unsubscribe_count', 'failed_count',
+                           'delivery_cursor', 'delivery_heartbeat', 'created_at', 'updated_at']
 
 
 class FeedbackSerializer(serializers.ModelSerializer):
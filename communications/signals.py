@@ -0,0 +1,58 @@
+# communications/signals.py
+from anymail.signals import tracking as anymail_tracking
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, pre_delete, m2m_changed
+from django.dispatch import receiver
+from accounts.models import MemberProfile
+from . import segments, tracking
+from .models import Announcement
+
+
+@receiver(post_save, sender=Announcement)
+def sync_audience_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance.sync_audience()
+
+
+@receiver(m2m_changed, sender=Announcement.specific_users.through)
+def sync_audience_on_targeting(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        instance.sync_audience()
+        return
+    # Changed from the user's side: instance is a user, pk_set the announcements
+    announcements = Announcement.objects.filter(pk__in=pk_set) if pk_set else Announcement.objects.filter(audience_rows__user=instance)
+    for announcement in announcements:
+        announcement.sync_audience()
+
+
+@receiver(anymail_tracking)
+def record_newsletter_event(sender, event, esp_name, **kwargs):
+    """Opens, clicks, bounces, ... reported by the ESP's webhook (anymail.urls)"""
+    tracking.record_anymail_event(event)
+
+
+def _touches(update_fields, fields):
+    return update_fields is None or not fields.isdisjoint(update_fields)
+
+
+@receiver(post_save, sender=get_user_model())
+def refresh_segments_on_user_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Logins save last_login only; those leave segments alone
+    if raw or not _touches(update_fields, segments.USER_FIELDS):
+        return
+    segments.refresh([instance.pk])
+
+
+@receiver(post_save, sender=MemberProfile)
+def refresh_segments_on_profile_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not _touches(update_fields, segments.PROFILE_FIELDS):
+        return
+    segments.refresh([instance.user_id])
+
+
+@receiver(pre_delete, sender=get_user_model())
+def forget_segments_on_user_delete(sender, instance, **kwargs):
+    segments.forget([instance.pk])
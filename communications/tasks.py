@@ -0,0 +1,73 @@
+"""Background jobs for communications (see core/jobs.py)"""
+from django.conf import settings
+from django.core.mail import send_mail
+
+from core.jobs import job
+from . import delivery
+from .models import ContactMessage, Newsletter
+
+
+@job(max_attempts=5, timeout=60)
+def notify_contact_message(message_id):
+    """Tell the office about a new contact message"""
+    contact_message = ContactMessage.objects.filter(pk=message_id).first()
+    if contact_message is None:
+        return
+    send_mail(
+        subject=f'New Contact Message: {contact_message.subject}',
+        message=f"""
+        New contact message received:
+        
+        Name: {contact_message.name}
+        Email: {contact_message.email}
+        Phone: {contact_message.phone}
+        Organization: {contact_message.organization}
+        Category: {contact_message.get_category_display()}
+        Subject: {contact_message.subject}
+        Message: {contact_message.message}
+        
+        Received at: {contact_message.created_at}
+        """,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[getattr(settings, 'ADMIN_EMAIL', settings.DEFAULT_FROM_EMAIL)],
+        fail_silently=False,
+    )
+
+
+@job(max_attempts=5, timeout=60)
+def send_contact_response(message_id):
+    """Email the staff response to whoever sent the contact message"""
+    contact_message = ContactMessage.objects.filter(pk=message_id).exclude(response__isnull=True).exclude(response='').first()
+    if contact_message is None:
+        return
+    send_mail(
+        subject=f'Re: {contact_message.subject}',
+        message=contact_message.response,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[contact_message.email],
+        fail_silently=False,
+    )
+
+
+@job(max_attempts=3, timeout=60)
+def send_newsletter_test(newsletter_id, email):
+    newsletter = Newsletter.objects.filter(pk=newsletter_id).first()
+    if newsletter is None:
+        return
+    send_mail(
+        subject=f"[TEST] {newsletter.subject}",
+        message=newsletter.content,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[email],
+        html_message=newsletter.html_content,
+        fail_silently=False,
+    )
+
+
+@job(max_attempts=10, timeout=None)
+def deliver_newsletter(newsletter_id):
+    """
+    Deliver a scheduled newsletter. delivery.deliver() resumes from its own
+    cursor, so a retry after a crash picks up where the last run stopped.
+    """
+    delivery.deliver(Newsletter(pk=newsletter_id))
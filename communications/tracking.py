@@ -0,0 +1,237 @@
+"""
+Newsletter open, click, bounce and unsubscribe tracking.
+
+Every recipient's copy carries a token, "<newsletter>-<user>-<signature>"
+with the ids in base 36, that the endpoints check without a query:
+
+    pixel_url(token)        a 1x1 GIF; loading it records an open
+    click_url(token, url)   records a click, then redirects to `url`, which
+                            is signed with the token so it is no open redirect
+
+anymail's tracking webhooks (opened, clicked, bounced, unsubscribed, ...)
+are matched to the same newsletter and user through the metadata delivery
+sets on each message.
+
+A hit or webhook event is one INSERT into TrackingEvent, an append-only
+table, committed without waiting for the WAL flush on PostgreSQL; nothing
+updates a Newsletter row per hit. fold() (`manage.py fold_tracking_events`,
+run from cron) adds the events past TrackingCursor to the newsletter
+counters with one F() UPDATE per counter (core.counters.apply_counts).
+Opens, bounces, deliveries and unsubscribes count each recipient once;
+clicks count every click.
+"""
+import logging
+import re
+from collections import defaultdict
+from datetime import timedelta
+from html import unescape
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Count, Exists, Max, OuterRef, Q
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.html import escape
+from django.utils.http import base36_to_int, int_to_base36, urlencode
+
+from core import counters
+from . import segments
+from .models import Newsletter, TrackingCursor, TrackingEvent
+
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+TOKEN_SALT = 'communications.tracking.recipient'
+CLICK_SALT = 'communications.tracking.click'
+SIGNATURE_LENGTH = 12
+
+# Transparent 1x1 GIF
+PIXEL = (
+    b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00'
+    b',\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+)
+
+COUNTERS = {
+    TrackingEvent.OPEN: 'opened_count',
+    TrackingEvent.CLICK: 'click_count',
+    TrackingEvent.BOUNCE: 'bounce_count',
+    TrackingEvent.UNSUBSCRIBE: 'unsubscribe_count',
+    TrackingEvent.DELIVERED: 'delivered_count',
+}
+PER_RECIPIENT = (TrackingEvent.OPEN, TrackingEvent.BOUNCE, TrackingEvent.UNSUBSCRIBE, TrackingEvent.DELIVERED)
+# Events after which a recipient gets no more newsletters
+OPT_OUTS = (TrackingEvent.UNSUBSCRIBE, TrackingEvent.COMPLAINT)
+
+# anymail event_type -> TrackingEvent kind
+ANYMAIL_EVENTS = {
+    'opened': TrackingEvent.OPEN,
+    'clicked': TrackingEvent.CLICK,
+    'bounced': TrackingEvent.BOUNCE,
+    'rejected': TrackingEvent.BOUNCE,
+    'failed': TrackingEvent.BOUNCE,
+    'unsubscribed': TrackingEvent.UNSUBSCRIBE,
+    'delivered': TrackingEvent.DELIVERED,
+    'complained': TrackingEvent.COMPLAINT,
+}
+
+LINK_RE = re.compile(r'''(href\s*=\s*)(["'])(https?://[^"']+)\2''', re.IGNORECASE)
+
+
+def _config():
+    return {
+        'BASE_URL': 'http://localhost:8000',
+        'FOLD_BATCH': 50000,  # events folded per transaction
+        'FOLD_LAG': 10,  # seconds an event waits before folding, so in-flight inserts are not skipped
+        **getattr(settings, 'NEWSLETTER_TRACKING', {}),
+    }
+
+
+def _sign(salt, value):
+    return salted_hmac(salt, value).hexdigest()[:SIGNATURE_LENGTH]
+
+
+def token(newsletter_id, user_id):
+    ids = f'{int_to_base36(newsletter_id)}-{int_to_base36(user_id)}'
+    return f'{ids}-{_sign(TOKEN_SALT, ids)}'
+
+
+def parse_token(value):
+    """(newsletter id, user id) from a token, or None when it is malformed or forged"""
+    try:
+        newsletter, user, signature = value.split('-')
+        ids = f'{newsletter}-{user}'
+        if not constant_time_compare(signature, _sign(TOKEN_SALT, ids)):
+            return None
+        return base36_to_int(newsletter), base36_to_int(user)
+    except ValueError:
+        return None
+
+
+def click_signature(value, url):
+    return _sign(CLICK_SALT, f'{value}:{url}')
+
+
+def pixel_url(value):
+    return _config()['BASE_URL'].rstrip('/') + reverse('communications:tracking_pixel', args=[value])
+
+
+def click_url(value, url):
+    path = reverse('communications:tracking_click', args=[value])
+    return f"{_config()['BASE_URL'].rstrip('/')}{path}?{urlencode({'u': url, 's': click_signature(value, url)})}"
+
+
+def personalize(html, value):
+    """The recipient's copy of `html`: links routed through click_url() and the open pixel appended"""
+    html = LINK_RE.sub(
+        lambda match: f'{match[1]}{match[2]}{escape(click_url(value, unescape(match[3])))}{match[2]}', html,
+    )
+    pixel = f'<img src="{pixel_url(value)}" width="1" height="1" alt="" style="display:none">'
+    closing = html.lower().rfind('</body>')
+    if closing == -1:
+        return html + pixel
+    return html[:closing] + pixel + html[closing:]
+
+
+def record(newsletter_id, user_id, kind, channel=TrackingEvent.EMAIL, url=''):
+    """Append one event; a single INSERT"""
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            # Losing the last few hits in a database crash is acceptable; waiting for the flush is not
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL synchronous_commit TO OFF")
+        TrackingEvent.objects.create(
+            newsletter_id=newsletter_id, user_id=user_id, kind=kind, channel=channel, url=url[:500],
+        )
+
+
+def record_anymail_event(event):
+    """Record an anymail tracking event for a newsletter message; others are ignored"""
+    kind = ANYMAIL_EVENTS.get(event.event_type)
+    metadata = event.metadata or {}
+    if kind is None or not metadata.get('newsletter_id'):
+        return False
+    try:
+        newsletter_id = int(metadata['newsletter_id'])
+        user_id = int(metadata['user_id']) if metadata.get('user_id') else None
+    except (TypeError, ValueError):
+        logger.warning("Ignoring %s event with malformed metadata %r", event.event_type, metadata)
+        return False
+    record(newsletter_id, user_id, kind, url=event.click_url or '')
+    return True
+
+
+def fold():
+    """
+    Add the events recorded since the last fold to the Newsletter counters.
+    Returns the number of events folded; concurrent folds wait for each other.
+    """
+    config = _config()
+    cursor, _ = TrackingCursor.objects.get_or_create(key=TrackingCursor.GLOBAL_KEY)
+    with transaction.atomic():
+        cursor = TrackingCursor.objects.select_for_update().get(pk=cursor.pk)
+        start = cursor.last_event
+        settled = TrackingEvent.objects.filter(
+            pk__gt=start, recorded_at__lt=timezone.now() - timedelta(seconds=config['FOLD_LAG']),
+        ).aggregate(end=Max('pk'))['end']
+        if settled is None:
+            return 0
+        end = min(settled, start + config['FOLD_BATCH'])
+        window = TrackingEvent.objects.filter(pk__gt=start, pk__lte=end)
+
+        totals = defaultdict(lambda: defaultdict(int))
+        # Clicks, and events nobody can be identified for, count every row
+        every = window.filter(kind__in=list(COUNTERS)).filter(Q(kind=TrackingEvent.CLICK) | Q(user__isnull=True))
+        for newsletter_id, kind, count in every.values('newsletter_id', 'kind').annotate(
+            count=Count('id'),
+        ).values_list('newsletter_id', 'kind', 'count'):
+            totals[('communications.Newsletter', COUNTERS[kind])][newsletter_id] += count
+        # The rest count a recipient once: the first time they appear for that kind
+        earlier = TrackingEvent.objects.filter(
+            newsletter_id=OuterRef('newsletter_id'), user_id=OuterRef('user_id'), kind=OuterRef('kind'), pk__lte=start,
+        )
+        first = window.filter(kind__in=PER_RECIPIENT, user__isnull=False).exclude(Exists(earlier))
+        for newsletter_id, kind, count in first.values('newsletter_id', 'kind').annotate(
+            count=Count('user_id', distinct=True),
+        ).values_list('newsletter_id', 'kind', 'count'):
+            totals[('communications.Newsletter', COUNTERS[kind])][newsletter_id] += count
+
+        counters.apply_counts(totals)
+        opted_out = User.objects.filter(
+            pk__in=window.filter(kind__in=OPT_OUTS, user__isnull=False).values('user_id'),
+            newsletter_subscription=True,
+        )
+        opted_out_ids = list(opted_out.values_list('pk', flat=True))
+        if opted_out_ids:
+            User.objects.filter(pk__in=opted_out_ids).update(newsletter_subscription=False)
+            # update() sends no post_save
+            segments.refresh(opted_out_ids)
+
+        folded = window.count()
+        cursor.last_event = end
+        cursor.folded_at = timezone.now()
+        cursor.save(update_fields=['last_event', 'folded_at'])
+    logger.info("Folded %d tracking event(s) up to %d", folded, end)
+    return folded
+
+
+def refold(newsletter):
+    """Recount one newsletter's tracking counters from all of its folded events"""
+    with transaction.atomic():
+        last_event = TrackingCursor.objects.select_for_update().filter(
+            key=TrackingCursor.GLOBAL_KEY,
+        ).values_list('last_event', flat=True).first() or 0
+        events = TrackingEvent.objects.filter(newsletter=newsletter, pk__lte=last_event)
+        counts = {field: 0 for field in COUNTERS.values()}
+        for kind, rows, recipients, anonymous in events.values('kind').annotate(
+            rows=Count('id'),
+            recipients=Count('user_id', distinct=True),
+            anonymous=Count('id', filter=Q(user__isnull=True)),
+        ).values_list('kind', 'rows', 'recipients', 'anonymous'):
+            if kind in COUNTERS:
+                counts[COUNTERS[kind]] = rows if kind not in PER_RECIPIENT else recipients + anonymous
+        Newsletter.objects.filter(pk=newsletter.pk).update(**counts)
+    return counts
@@ -23,6 +23,10 @@ urlpatterns = [
     path('contact/', views.contact, name='contact'),  # ✅ This is what your template needs
     path('newsletter/subscribe/', views.newsletter_subscribe, name='newsletter_subscribe'),
     path('announcements/', views.announcement_list, name='announcement_list'),
+    
+    # Newsletter tracking (open pixel and link redirects)
+    path('t/o/<str:token>.gif', views.tracking_pixel, name='tracking_pixel'),
+    path('t/c/<str:token>/', views.tracking_click, name='tracking_click'),
 
     # API routes (router URLs)
     path('', include(router.urls)),
@@ -1,16 +1,27 @@
+import logging
+
+from django.db import DatabaseError
 from django.db.models import Q
+from django.http import Http404, HttpResponse, HttpResponseRedirect
 from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.utils.dateparse import parse_datetime
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.core.mail import send_mail
-from django.conf import settings
 from rest_framework import viewsets, permissions, status
 from rest_framework import filters
 import django_filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Announcement, AnnouncementAttachment, Newsletter, Feedback, ContactMessage
+from core.cache import cache_policy
+from core import counters
+from search.filters import FullTextSearchFilter
+from . import delivery, segments, tasks, tracking
+from .models import (
+    Announcement, AnnouncementAttachment, AnnouncementReadCursor, Newsletter, Feedback, ContactMessage,
+    TrackingEvent,
+)
 from .serializers import (
     AnnouncementSerializer, NewsletterSerializer,
     FeedbackSerializer, ContactMessageSerializer,
@@ -25,6 +36,8 @@ from django.utils import timezone
 from .models import Announcement, Newsletter, Feedback, ContactMessage
 from .forms import AnnouncementForm, NewsletterForm, FeedbackForm, ContactMessageForm
 
+logger = logging.getLogger(__name__)
+
 class AnnouncementFilter(django_filters.FilterSet):
     announcement_type = django_filters.CharFilter(field_name='announcement_type')
     priority = django_filters.CharFilter(field_name='priority')
@@ -41,7 +54,7 @@ class AnnouncementFilter(django_filters.FilterSet):
 class AnnouncementViewSet(viewsets.ModelViewSet):
     queryset = Announcement.objects.filter(is_published=True)
     serializer_class = AnnouncementSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
     filterset_class = AnnouncementFilter
     search_fields = ['title', 'content', 'summary']
     ordering_fields = ['publish_date', 'priority', 'created_at']
@@ -54,52 +67,19 @@ class AnnouncementViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
     
     def get_queryset(self):
-        queryset = super().get_queryset()
-        user = self.request.user
-        
-        # Filter by publish date and expiry date
-        now = timezone.now()
-        queryset = queryset.filter(
-            Q(expiry_date__isnull=True) | Q(expiry_date__gt=now)
-        )
-        
-        # Filter by target audience
-        if user.is_authenticated:
-            if user.is_staff or user.user_type == 'executive':
-                # Staff and executives can see all announcements
-                return queryset
-            
-            # Filter based on target audience
-            audience_filter = Q(target_audience='all') | Q(target_audience='members')
-            
-            # Add specific user targeting
-            audience_filter |= Q(specific_users=user)
-            
-            # Add role-based targeting
-            if user.user_type == 'executive':
-                audience_filter |= Q(target_audience='executive')
-            elif user.membership_type == 'honorary':
-                audience_filter |= Q(target_audience__in=['executive', 'members'])
-            
-            # Apply audience filter
-            queryset = queryset.filter(audience_filter)
-        else:
-            # Non-authenticated users can only see public announcements
-            queryset = queryset.filter(target_audience='all')
-        
-        return queryset.distinct()
+        return Announcement.visible_to(self.request.user)
     
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
         
-        # Increment view count
-        instance.view_count += 1
-        instance.save()
+        # Increment view count (buffered, flushed in bulk)
+        counters.increment(instance, 'view_count')
         
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cache_policy('communications.announcements.latest')
     def latest(self, request):
         latest_announcements = self.get_queryset().order_by('-publish_date')[:10]
         serializer = self.get_serializer(latest_announcements, many=True)
@@ -113,6 +93,26 @@ class AnnouncementViewSet(viewsets.ModelViewSet):
         ).order_by('-publish_date')
         serializer = self.get_serializer(urgent_announcements, many=True)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def unread(self, request):
+        """Announcements published to the user since they last marked the feed read"""
+        announcements, cursor = AnnouncementReadCursor.unread(request.user)
+        serializer = self.get_serializer(announcements.order_by('-publish_date'), many=True)
+        return Response({'cursor': cursor, 'count': len(serializer.data), 'results': serializer.data})
+    
+    @action(detail=False, methods=['post'], url_path='mark-read')
+    def mark_read(self, request):
+        """Advance the read cursor to `cursor` (as returned by unread), or past everything published so far"""
+        cursor = request.data.get('cursor')
+        if cursor is None:
+            _, cursor = AnnouncementReadCursor.unread(request.user)
+        else:
+            try:
+                cursor = int(cursor)
+            except (TypeError, ValueError):
+                return Response({'cursor': ["A valid integer is required."]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'cursor': AnnouncementReadCursor.advance(request.user, cursor)})
 
 
 class NewsletterViewSet(viewsets.ModelViewSet):
@@ -123,7 +123,7 @@ class NewsletterViewSet(viewsets.ModelViewSet):
     search_fields = ['title', 'subject', 'content']
     
     def get_permissions(self):
-        if self.action in ['create', 'update', 'partial_update', 'destroy', 'send_test']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'send_test', 'send', 'progress', 'segments']:
             permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
         else:
             permission_classes = [permissions.IsAuthenticated]
@@ -142,20 +142,40 @@ class NewsletterViewSet(viewsets.ModelViewSet):
     def send_test(self, request, pk=None):
         newsletter = self.get_object()
         
-        # Send test email to requester
-        try:
-            send_mail(
-                subject=f"[TEST] {newsletter.subject}",
-                message=newsletter.content,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[request.user.email],
-                html_message=newsletter.html_content,
-                fail_silently=False,
+        if not request.user.email:
+            return Response({'error': 'Your account has no email address'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Send test email to requester from a background job
+        tasks.send_newsletter_test.enqueue(newsletter_id=newsletter.pk, email=request.user.email)
+        return Response({'message': f'Test email queued for {request.user.email}'}, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=True, methods=['post'])
+    def send(self, request, pk=None):
+        """Queue the newsletter for delivery by a background job; nothing is sent in this request"""
+        newsletter = self.get_object()
+        when = request.data.get('scheduled_for')
+        if when:
+            when = parse_datetime(str(when))
+            if when is None:
+                return Response({'scheduled_for': ["Expected an ISO 8601 datetime."]}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(when):
+                when = timezone.make_aware(when)
+        if not delivery.schedule(newsletter, when):
+            return Response(
+                {'error': f"A {newsletter.get_status_display().lower()} newsletter cannot be sent."},
+                status=status.HTTP_409_CONFLICT,
             )
-            
-            return Response({'message': f'Test email sent to {request.user.email}'}, status=status.HTTP_200_OK)
-        except Exception as e:
-            return Response({'error': f'Failed to send test email: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        tasks.deliver_newsletter.enqueue(run_at=when, newsletter_id=newsletter.pk)
+        return Response(delivery.progress(newsletter), status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=True, methods=['get'])
+    def progress(self, request, pk=None):
+        return Response(delivery.progress(self.get_object()))
+    
+    @action(detail=False, methods=['get'])
+    def segments(self, request):
+        """Size of every target segment, and how many of its members each channel reaches"""
+        return Response(segments.counts())
     
     @action(detail=False, methods=['get'])
     def templates(self, request):
@@ -260,30 +280,8 @@ class ContactMessageViewSet(viewsets.ModelViewSet):
             referrer=referrer
         )
         
-        # Send notification email to admin
-        try:
-            contact_message = serializer.instance
-            send_mail(
-                subject=f'New Contact Message: {contact_message.subject}',
-                message=f"""
-                New contact message received:
-                
-                Name: {contact_message.name}
-                Email: {contact_message.email}
-                Phone: {contact_message.phone}
-                Organization: {contact_message.organization}
-                Category: {contact_message.get_category_display()}
-                Subject: {contact_message.subject}
-                Message: {contact_message.message}
-                
-                Received at: {contact_message.created_at}
-                """,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[settings.ADMIN_EMAIL] if hasattr(settings, 'ADMIN_EMAIL') else [settings.DEFAULT_FROM_EMAIL],
-                fail_silently=True,
-            )
-        except Exception:
-            pass  # Silently fail email notification
+        # Notify the office from a background job: the request itself only writes rows
+        tasks.notify_contact_message.enqueue(message_id=serializer.instance.pk)
     
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated, permissions.IsAdminUser])
     def respond(self, request, pk=None):
@@ -300,19 +298,9 @@ class ContactMessageViewSet(viewsets.ModelViewSet):
         contact_message.responded_at = timezone.now()
         contact_message.save()
         
-        # Send response email
-        try:
-            send_mail(
-                subject=f'Re: {contact_message.subject}',
-                message=response,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[contact_message.email],
-                fail_silently=True,
-            )
-            
-            return Response({'message': 'Response sent successfully'}, status=status.HTTP_200_OK)
-        except Exception as e:
-            return Response({'error': f'Failed to send email: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        # Send response email from a background job
+        tasks.send_contact_response.enqueue(message_id=contact_message.pk)
+        return Response({'message': 'Response queued for sending'}, status=status.HTTP_202_ACCEPTED)
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated, permissions.IsAdminUser])
     def new_messages(self, request):
@@ -336,25 +324,8 @@ class ContactMessageViewSet(viewsets.ModelViewSet):
 @login_required
 def message_list(request):
     """Web view for listing messages and announcements"""
-    # Get announcements based on user role
-    if request.user.is_staff or getattr(request.user, 'user_type', None) == 'executive':
-        announcements = Announcement.objects.filter(is_published=True)
-    elif request.user.is_authenticated:
-        # FIXED: Use chained filters instead of mixing kwargs with Q objects
-        announcements = Announcement.objects.filter(
-            Q(is_published=True) &
-            (Q(target_audience='all') | 
-             Q(target_audience='members') |
-             Q(specific_users=request.user))
-        ).distinct()
-    else:
-        announcements = Announcement.objects.filter(is_published=True, target_audience='all')
-    
-    # Filter by expiry date
-    now = timezone.now()
-    announcements = announcements.filter(
-        Q(expiry_date__isnull=True) | Q(expiry_date__gt=now)
-    )
+    # Get announcements targeted at the user (published and unexpired)
+    announcements = Announcement.visible_to(request.user)
     
     # Get newsletters
     newsletters = Newsletter.objects.filter(status='sent').order_by('-sent_at')[:10]
@@ -551,9 +522,8 @@ def announcement_detail(request, pk):
             messages.error(request, "You don't have permission to view this announcement.")
             return redirect('communications:announcement_list')
     
-    # Increment view count
-    announcement.view_count += 1
-    announcement.save(update_fields=['view_count'])
+    # Increment view count (buffered, flushed in bulk)
+    counters.increment(announcement, 'view_count')
     
     # Get attachments
     attachments = announcement.attachments.all()
@@ -755,4 +725,41 @@ def announcement_remove_attachment(request, pk, attachment_pk):
     return redirect('communications:announcement_edit', pk=pk)
 
 
+# ------------------------------------------------------------
+# Newsletter tracking endpoints (communications/tracking.py)
+# Plain views on purpose: no session, authentication or DRF work per hit
+# ------------------------------------------------------------
+
+def tracking_pixel(request, token):
+    """1x1 GIF that records an open; always answers with the image"""
+    recipient = tracking.parse_token(token)
+    if recipient is not None:
+        try:
+            tracking.record(*recipient, TrackingEvent.OPEN)
+        except DatabaseError:
+            logger.warning("Could not record open for %s", token, exc_info=True)
+    response = HttpResponse(tracking.PIXEL, content_type='image/gif')
+    response['Cache-Control'] = 'no-store, private'
+    return response
+
+
+def tracking_click(request, token):
+    """Record a click on a newsletter link, then redirect to it"""
+    url = request.GET.get('u', '')
+    signature = request.GET.get('s', '')
+    if not url.startswith(('http://', 'https://')) or not constant_time_compare(
+        signature, tracking.click_signature(token, url),
+    ):
+        raise Http404("Unknown link")
+    recipient = tracking.parse_token(token)
+    if recipient is not None:
+        try:
+            tracking.record(*recipient, TrackingEvent.CLICK, url=url)
+        except DatabaseError:
+            logger.warning("Could not record click for %s", token, exc_info=True)
+    response = HttpResponseRedirect(url)
+    response['Cache-Control'] = 'no-store, private'
+    return response
+
+
 # ... (keep all your existing code below) ...
@@ -0,0 +1,37 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import Blob, Job
+
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'name', 'size', 'ref_count', 'touched_at')
+    list_filter = ('ref_count',)
+    search_fields = ('sha256', 'name')
+    readonly_fields = ('sha256', 'name', 'size', 'ref_count', 'created_at', 'touched_at')
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'run_at', 'attempts', 'max_attempts', 'locked_by', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'last_error')
+    date_hierarchy = 'run_at'
+    readonly_fields = (
+        'name', 'kwargs', 'attempts', 'max_attempts', 'timeout', 'locked_by', 'locked_at',
+        'last_error', 'created_at', 'finished_at',
+    )
+    actions = ['retry_now']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    @admin.action(description="Retry selected jobs now")
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, run_at=timezone.now(), attempts=0, finished_at=None,
+        )
+        self.message_user(request, f"{updated} job(s) queued")
@@ -0,0 +1,27 @@
+from django.apps import AppConfig
+from django.conf import settings
+from django.utils.module_loading import autodiscover_modules
+
+
+class CoreConfig(AppConfig):
+    name = 'core'
+    verbose_name = 'Core Services'
+    
+    def ready(self):
+        # Cache health checks with hit-rate stats (replaces health_check.cache)
+        from health_check.plugins import plugin_dir
+        from .health import CacheStatsBackend
+        
+        for backend in settings.CACHES:
+            plugin_dir.register(CacheStatsBackend, backend=backend)
+        
+        # Evict cached view responses when the models they depend on change
+        from .invalidation import connect_signals
+        connect_signals()
+        
+        # Reference counts for content-addressed uploads
+        from .signals import connect_signals as connect_blob_signals
+        connect_blob_signals()
+        
+        # Register background jobs declared in each app's tasks.py (see core/jobs.py)
+        autodiscover_modules('tasks')
@@ -0,0 +1,176 @@
+"""
+Shared cache layer and declarative per-view cache policies.
+
+Policies are declared in settings.VIEW_CACHE_POLICIES and applied to
+read-only DRF actions with the @cache_policy decorator:
+
+    @action(detail=False, methods=['get'])
+    @cache_policy('events.upcoming')
+    def upcoming(self, request):
+        ...
+
+Every policy belongs to one or more key families. A family has a generation
+token that is folded into its cache keys; bumping the token (see
+core/invalidation.py) evicts every key of the family at once.
+"""
+import hashlib
+import logging
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLICY = {
+    'TTL': 300,
+    'VARY_ON_ROLE': False,
+    'VARY_ON_USER': False,
+    'VARY_ON_PARAMS': (),
+    'FAMILIES': None,  # defaults to the policy name
+}
+
+STATS_KEY = 'cachestats:{name}:{outcome}'
+GENERATION_KEY = 'cachegen:{family}'
+
+
+def get_cache():
+    """Cache used for view responses and hit-rate stats"""
+    return caches[getattr(settings, 'VIEW_CACHE_ALIAS', 'default')]
+
+
+def get_policy(name):
+    """Return the declared policy for a view, merged with the defaults"""
+    declared = getattr(settings, 'VIEW_CACHE_POLICIES', {}).get(name)
+    if declared is None:
+        return None
+    policy = {**DEFAULT_POLICY, **declared}
+    policy['FAMILIES'] = tuple(policy['FAMILIES'] or (name,))
+    return policy
+
+
+def get_generations(families):
+    """Current generation token of each family, creating tokens for unseen (or evicted) families"""
+    cache = get_cache()
+    keys = {family: GENERATION_KEY.format(family=family) for family in families}
+    found = cache.get_many(list(keys.values()))
+    
+    generations = {}
+    for family, key in keys.items():
+        token = found.get(key)
+        if token is None:
+            # add() is atomic: if another worker raced us, use its token
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            token = cache.get(key)
+        generations[family] = token
+    return generations
+
+
+def bump_generations(families):
+    """Evict every cached key of the given families with a single write"""
+    if not families:
+        return
+    get_cache().set_many(
+        {GENERATION_KEY.format(family=family): uuid.uuid4().hex for family in families},
+        timeout=None,
+    )
+
+
+def user_role(user):
+    """Coarse role used to vary cached responses"""
+    if not user.is_authenticated:
+        return 'anonymous'
+    if user.is_staff:
+        return 'staff'
+    return getattr(user, 'user_type', None) or 'member'
+
+
+def build_cache_key(name, policy, request, view_kwargs=None):
+    """Key for a cached response: view name plus a digest of family generations and whatever the policy varies on"""
+    generations = get_generations(policy['FAMILIES'])
+    parts = [f"{family}@{generations[family]}" for family in policy['FAMILIES']]
+    parts.append(request.get_host())
+    for kwarg, value in sorted((view_kwargs or {}).items()):
+        parts.append(f"{kwarg}={value}")
+    if policy['VARY_ON_USER']:
+        parts.append(f"user={request.user.pk or 0}")
+    elif policy['VARY_ON_ROLE']:
+        parts.append(f"role={user_role(request.user)}")
+    for param in sorted(policy['VARY_ON_PARAMS']):
+        parts.append(f"{param}={request.query_params.get(param, '')}")
+    digest = hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest()
+    return f"view:{name}:{digest}"
+
+
+def record_outcome(name, outcome):
+    """Count a hit or miss for a policy; shared across workers through the cache"""
+    cache = get_cache()
+    key = STATS_KEY.format(name=name, outcome=outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def cache_stats(names=None):
+    """Hit/miss totals for the given policies (all declared policies by default)"""
+    if names is None:
+        names = getattr(settings, 'VIEW_CACHE_POLICIES', {}).keys()
+    keys = {
+        (name, outcome): STATS_KEY.format(name=name, outcome=outcome)
+        for name in names
+        for outcome in ('hits', 'misses')
+    }
+    values = get_cache().get_many(list(keys.values()))
+    
+    policies = {}
+    for (name, outcome), key in keys.items():
+        policies.setdefault(name, {'hits': 0, 'misses': 0})[outcome] = values.get(key, 0)
+    
+    hits = sum(p['hits'] for p in policies.values())
+    misses = sum(p['misses'] for p in policies.values())
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total * 100, 1) if total else None,
+        'policies': policies,
+    }
+
+
+def cache_policy(name):
+    """
+    Cache successful GET responses of a DRF view method according to the named policy.
+    Cache failures never break the view; they fall through to an uncached response.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            policy = get_policy(name)
+            if policy is None or request.method != 'GET':
+                return view_method(self, request, *args, **kwargs)
+            
+            try:
+                key = build_cache_key(name, policy, request, kwargs)
+                cached = get_cache().get(key)
+            except Exception:
+                logger.warning("View cache unavailable for %s", name, exc_info=True)
+                return view_method(self, request, *args, **kwargs)
+            
+            if cached is not None:
+                record_outcome(name, 'hits')
+                return Response(cached)
+            
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                try:
+                    get_cache().set(key, response.data, timeout=policy['TTL'])
+                    record_outcome(name, 'misses')
+                except Exception:
+                    logger.warning("Could not store %s in the view cache", name, exc_info=True)
+            return response
+        return wrapper
+    return decorator
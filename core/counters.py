@@ -0,0 +1,215 @@
+"""
+Buffered view/download counters.
+
+increment() records a hit in the shared cache instead of rewriting the row.
+Hits land in time buckets of COUNTER_BUFFER['INTERVAL'] seconds. flush()
+folds every closed bucket into the database with one
+UPDATE ... SET field = field + CASE pk ... END per model field, so a popular
+document costs no row lock per view and parallel workers never lose
+increments. flush() runs opportunistically from increment() once a bucket
+has closed, and from `manage.py flush_counters`. A flush claims its buckets
+(advances the last-flushed mark) before writing them, so a worker that takes
+over an expired flush lock never applies the same buckets twice.
+
+Buffering needs a cache every process shares (Redis, memcached, the
+database cache). A process-local cache (LocMem, the default without
+REDIS_URL) would keep each worker's hits where flush_counters cannot see
+them, so with one, or with COUNTER_BUFFER['SHARED'] set to False,
+increment() writes straight to the database instead.
+"""
+import logging
+import time
+import uuid
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from .cache import get_cache
+
+
+logger = logging.getLogger(__name__)
+
+# (model label, counter field) -> timestamp field refreshed on flush, or None
+COUNTER_FIELDS = {
+    ('documents.Document', 'view_count'): 'last_viewed',
+    ('documents.Document', 'download_count'): 'last_downloaded',
+    ('documents.DocumentTemplate', 'usage_count'): 'last_used',
+    ('communications.Announcement', 'view_count'): None,
+    ('events.EventResource', 'download_count'): None,
+    ('resources.Resource', 'views'): None,
+    ('resources.Resource', 'downloads'): None,
+    # Folded from communications.TrackingEvent rather than buffered here
+    ('communications.Newsletter', 'opened_count'): None,
+    ('communications.Newsletter', 'click_count'): None,
+    ('communications.Newsletter', 'bounce_count'): None,
+    ('communications.Newsletter', 'unsubscribe_count'): None,
+    ('communications.Newsletter', 'delivered_count'): None,
+    # Membership changes applied by communications.segments
+    ('communications.SegmentCount', 'members'): 'updated_at',
+    ('communications.SegmentCount', 'email'): 'updated_at',
+    ('communications.SegmentCount', 'sms'): 'updated_at',
+    ('communications.SegmentCount', 'newsletter'): 'updated_at',
+}
+
+SEQ_KEY = 'counter:{bucket}:seq'
+SLOT_KEY = 'counter:{bucket}:slot:{slot}'
+COUNT_KEY = 'counter:{bucket}:{label}:{field}:{pk}'
+LAST_FLUSHED_KEY = 'counter:last-flushed'
+FLUSH_LOCK_KEY = 'counter:flush-lock'
+
+UPDATE_CHUNK_SIZE = 500
+
+
+def _config():
+    # SHARED: None decides from the cache backend
+    return {
+        'INTERVAL': 60, 'KEY_TTL': 86400, 'SHARED': None, 'FLUSH_LOCK_TIMEOUT': 600,
+        **getattr(settings, 'COUNTER_BUFFER', {}),
+    }
+
+
+def buffered(cache=None):
+    """Whether increments can be buffered: the cache is visible to every process"""
+    shared = _config()['SHARED']
+    if shared is not None:
+        return shared
+    return not isinstance(cache or get_cache(), (LocMemCache, DummyCache))
+
+
+def current_bucket():
+    return int(time.time()) // _config()['INTERVAL']
+
+
+def last_closed_bucket():
+    # One bucket of grace absorbs clock skew between workers
+    return current_bucket() - 2
+
+
+def increment(instance, field, amount=1):
+    """Buffer `amount` for instance.<field>; falls back to a direct F() update if the cache is down"""
+    label = instance._meta.label
+    if (label, field) not in COUNTER_FIELDS:
+        raise ValueError(f"{label}.{field} is not a buffered counter")
+
+    cache = get_cache()
+    if not buffered(cache):
+        apply_counts({(label, field): {instance.pk: amount}})
+        return
+    ttl = _config()['KEY_TTL']
+    bucket = current_bucket()
+    key = COUNT_KEY.format(bucket=bucket, label=label, field=field, pk=instance.pk)
+    try:
+        if cache.add(key, amount, timeout=ttl):
+            # First hit for this row in the bucket: register it so flush() can find it
+            seq_key = SEQ_KEY.format(bucket=bucket)
+            cache.add(seq_key, 0, timeout=ttl)
+            slot = cache.incr(seq_key)
+            cache.set(SLOT_KEY.format(bucket=bucket, slot=slot), (label, field, instance.pk), timeout=ttl)
+        else:
+            cache.incr(key, amount)
+    except Exception:
+        logger.warning("Counter buffer unavailable, writing %s.%s directly", label, field, exc_info=True)
+        apply_counts({(label, field): {instance.pk: amount}})
+        return
+
+    maybe_flush()
+
+
+def maybe_flush():
+    """Flush if a closed bucket is still pending; cheap enough to call on every increment"""
+    try:
+        last_flushed = get_cache().get(LAST_FLUSHED_KEY)
+    except Exception:
+        return
+    if last_flushed is None or last_flushed < last_closed_bucket():
+        flush()
+
+
+def flush():
+    """
+    Apply every closed bucket to the database. Returns the number of rows updated.
+    Only one worker flushes at a time; the others return immediately.
+    """
+    cache = get_cache()
+    config = _config()
+    token = uuid.uuid4().hex
+    if not cache.add(FLUSH_LOCK_KEY, token, timeout=config['FLUSH_LOCK_TIMEOUT']):
+        return 0
+
+    try:
+        last_closed = last_closed_bucket()
+        stored = last_flushed = cache.get(LAST_FLUSHED_KEY)
+        if last_flushed is None:
+            last_flushed = last_closed - config['KEY_TTL'] // config['INTERVAL']
+        buckets = range(last_flushed + 1, last_closed + 1)
+
+        seqs = cache.get_many([SEQ_KEY.format(bucket=bucket) for bucket in buckets])
+        totals = defaultdict(lambda: defaultdict(int))
+        used_keys = list(seqs)
+        for bucket in buckets:
+            slot_count = seqs.get(SEQ_KEY.format(bucket=bucket))
+            if not slot_count:
+                continue
+            slot_keys = [SLOT_KEY.format(bucket=bucket, slot=slot) for slot in range(1, slot_count + 1)]
+            slots = cache.get_many(slot_keys)
+            count_keys = {
+                COUNT_KEY.format(bucket=bucket, label=label, field=field, pk=pk): (label, field, pk)
+                for label, field, pk in slots.values()
+            }
+            counts = cache.get_many(list(count_keys))
+            for key, amount in counts.items():
+                label, field, pk = count_keys[key]
+                totals[(label, field)][pk] += amount
+            used_keys += slot_keys + list(count_keys)
+
+        # Claim the buckets before writing: should this flush outlive its lock, the
+        # worker that takes over starts after them instead of applying them again
+        cache.set(LAST_FLUSHED_KEY, last_closed, timeout=None)
+        try:
+            updated = apply_counts(totals)
+        except Exception:
+            if cache.get(FLUSH_LOCK_KEY) == token:
+                # Nobody took over: hand the buckets back to the next flush
+                if stored is None:
+                    cache.delete(LAST_FLUSHED_KEY)
+                else:
+                    cache.set(LAST_FLUSHED_KEY, stored, timeout=None)
+            raise
+        cache.delete_many(used_keys)
+        return updated
+    finally:
+        # Release only our own lock; an expired one may belong to another worker by now
+        if cache.get(FLUSH_LOCK_KEY) == token:
+            cache.delete(FLUSH_LOCK_KEY)
+
+
+def apply_counts(totals):
+    """
+    Add {(label, field): {pk: amount}} to the database with one UPDATE per
+    model field (chunked), using F() so concurrent writers are never lost.
+    """
+    updated = 0
+    now = timezone.now()
+    with transaction.atomic():
+        for (label, field), amounts in totals.items():
+            model = apps.get_model(label)
+            timestamp_field = COUNTER_FIELDS[(label, field)]
+            pks = list(amounts)
+            for start in range(0, len(pks), UPDATE_CHUNK_SIZE):
+                chunk = pks[start:start + UPDATE_CHUNK_SIZE]
+                delta = Case(
+                    *[When(pk=pk, then=Value(amounts[pk])) for pk in chunk],
+                    default=Value(0),
+                    output_field=IntegerField(),
+                )
+                changes = {field: F(field) + delta}
+                if timestamp_field:
+                    changes[timestamp_field] = now
+                updated += model._default_manager.filter(pk__in=chunk).update(**changes)
+    return updated
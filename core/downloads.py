@@ -0,0 +1,201 @@
+"""
+Streaming file downloads with HTTP Range and conditional GET.
+
+serve_file() answers If-None-Match / If-Modified-Since with 304, a single
+`Range: bytes=...` with 206 (honouring If-Range), and streams the body in
+CHUNK_SIZE pieces so a large manual never sits in worker memory. With
+FILE_DOWNLOADS['OFFLOAD'] set and a fronting proxy configured, the bytes are
+handed to the proxy instead:
+
+    'x-accel-redirect'  nginx, internal location at ACCEL_PREFIX mapped to MEDIA_ROOT
+    'x-sendfile'        Apache mod_xsendfile / lighttpd, needs a local file path
+
+Multi-range requests are answered with the whole file, which RFC 9110 allows.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+from rest_framework.renderers import JSONRenderer
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class PassthroughRenderer(JSONRenderer):
+    """Lets file actions accept any Accept header; error payloads still render as JSON"""
+    media_type = '*/*'
+    format = 'file'
+
+
+def _config():
+    return {
+        'OFFLOAD': '',
+        'ACCEL_PREFIX': '/protected-media/',
+        'CHUNK_SIZE': 64 * 1024,
+        **getattr(settings, 'FILE_DOWNLOADS', {}),
+    }
+
+
+def parse_range(header, size):
+    """
+    Return the inclusive (start, end) of a single byte range, or None when the
+    header is absent, malformed or asks for several ranges (serve everything).
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    return start, min(end, size - 1)
+
+
+def if_range_matches(request, etag, last_modified):
+    """A Range only applies if If-Range (when sent) still names this representation"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return etag is not None and if_range == etag
+    if if_range.startswith('W/'):
+        # Weak validators never match If-Range
+        return False
+    return last_modified is not None and parse_http_date_safe(if_range) == last_modified
+
+
+def iter_range(storage, name, start, length, chunk_size):
+    with storage.open(name, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_file(request, fieldfile, etag=None, last_modified=None, filename=None,
+               as_attachment=True, private=True):
+    """
+    Build a download response for a FieldFile.
+    etag is the raw validator (e.g. a content hash), last_modified a datetime.
+    """
+    config = _config()
+    filename = filename or os.path.basename(fieldfile.name)
+    etag = quote_etag(etag) if etag else None
+    last_modified = int(last_modified.timestamp()) if last_modified else None
+
+    def finish(response):
+        if etag:
+            response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        response['Accept-Ranges'] = 'bytes'
+        if private:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True, max_age=0)
+        return response
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return finish(not_modified)
+
+    offload = config['OFFLOAD']
+    if offload == 'x-accel-redirect':
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = config['ACCEL_PREFIX'].rstrip('/') + '/' + quote(fieldfile.name)
+        return finish(_describe(response, filename, as_attachment))
+    if offload == 'x-sendfile':
+        try:
+            path = fieldfile.path
+        except NotImplementedError:
+            path = None
+        if path:
+            response = HttpResponse()
+            response['X-Sendfile'] = path
+            return finish(_describe(response, filename, as_attachment))
+
+    size = fieldfile.size
+    byte_range = None
+    if if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return finish(response)
+
+    if request.method == 'HEAD':
+        response = _describe(HttpResponse(), filename, as_attachment)
+        response['Content-Length'] = size
+        return finish(response)
+
+    if byte_range is None:
+        response = FileResponse(
+            fieldfile.storage.open(fieldfile.name, 'rb'),
+            as_attachment=as_attachment,
+            filename=filename,
+        )
+        response.block_size = config['CHUNK_SIZE']
+        return finish(response)
+
+    start, end = byte_range
+    length = end - start + 1
+    response = StreamingHttpResponse(
+        iter_range(fieldfile.storage, fieldfile.name, start, length, config['CHUNK_SIZE']),
+        status=206,
+    )
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = length
+    return finish(_describe(response, filename, as_attachment))
+
+
+def starts_download(request, response):
+    """True for a GET that transfers the file from its first byte (not a resume, HEAD or 304)"""
+    if request.method != 'GET':
+        return False
+    if response.status_code == 206:
+        return response['Content-Range'].startswith('bytes 0-')
+    if response.status_code != 200:
+        return False
+    if response.has_header('X-Accel-Redirect') or response.has_header('X-Sendfile'):
+        # Offloaded: the proxy answers the Range itself, so judge by what the client asked for
+        match = RANGE_RE.match(request.META.get('HTTP_RANGE', '').strip())
+        if match:
+            first, last = match.groups()
+            # "bytes=-N" is a suffix, not the start; "bytes=-" is malformed and gets the whole file
+            return int(first) == 0 if first else not last
+    return True
+
+
+def _describe(response, filename, as_attachment):
+    content_type, encoding = mimetypes.guess_type(filename)
+    # Never advertise a Content-Encoding: the client must store the bytes as-is
+    response['Content-Type'] = 'application/octet-stream' if encoding or not content_type else content_type
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    return response
@@ -0,0 +1,226 @@
+"""
+Spatial helpers for models carrying a free-text "lat,lng" gps_coordinates field.
+
+GeoLocated (core.models) stores the parsed point in indexed latitude /
+longitude columns plus a geohash, so map queries are index range scans
+instead of loading every row and parsing strings in Python.
+
+GeoFilter adds these query parameters to any viewset over a GeoLocated model:
+
+    ?bbox=west,south,east,north        rows inside the box (Leaflet's toBBoxString order)
+    ?near=lat,lng&radius=<km>          rows within radius km, nearest first
+    ?near=lat,lng&nearest=<n>          the n nearest rows, nearest first
+
+Rows matched by `near` are annotated with `distance_km`. cluster() groups a
+(viewport-filtered) queryset by geohash prefix for map views.
+"""
+import math
+import re
+
+from django.db.models import Avg, Count, F, Sum, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt, Substr
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9  # cells of about 5 x 5 m
+
+COORDINATES_RE = re.compile(r'^\s*\(?\s*(-?\d+(?:\.\d+)?)\s*[,;\s]\s*(-?\d+(?:\.\d+)?)\s*\)?\s*$')
+
+MAX_NEAREST = 500
+
+# Map zoom level -> geohash prefix length, roughly 8-16 clusters across a 256px tile
+ZOOM_PRECISION = [1, 1, 1, 2, 2, 3, 3, 3, 4, 4, 5, 5, 5, 6, 6, 7, 7, 7, 8]
+
+
+def parse_coordinates(text):
+    """(lat, lng) from a "lat,lng" string, or None when missing, malformed or out of range"""
+    match = COORDINATES_RE.match(text or '')
+    if not match:
+        return None
+    lat, lng = float(match.group(1)), float(match.group(2))
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+def geohash_encode(lat, lng, precision=GEOHASH_PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits, bit_count, even = 0, 0, True
+    while len(chars) < precision:
+        interval, value = (lng_range, lng) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+
+def geohash_bounds(geohash):
+    """(south, west, north, east) of a geohash cell"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        bits = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            interval = lng_range if even else lat_range
+            middle = (interval[0] + interval[1]) / 2
+            if bits >> shift & 1:
+                interval[0] = middle
+            else:
+                interval[1] = middle
+            even = not even
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distance_expression(lat, lng):
+    """Great-circle distance in km from (lat, lng) to each row, computed by the database"""
+    lat_rad, lng_rad = math.radians(lat), math.radians(lng)
+    a = (
+        Power(Sin((Radians(F('latitude')) - Value(lat_rad)) / 2), 2)
+        + Value(math.cos(lat_rad)) * Cos(Radians(F('latitude')))
+        * Power(Sin((Radians(F('longitude')) - Value(lng_rad)) / 2), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(a))
+
+
+def bbox_around(lat, lng, radius_km):
+    """(south, west, north, east) enclosing a circle; used to hit the lat/lng index before exact distances"""
+    dlat = radius_km / KM_PER_DEGREE
+    dlng = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+    return max(lat - dlat, -90), lng - dlng, min(lat + dlat, 90), lng + dlng
+
+
+def within_bbox(queryset, south, west, north, east):
+    queryset = queryset.filter(latitude__gte=south, latitude__lte=north)
+    if west <= east:
+        return queryset.filter(longitude__gte=max(west, -180), longitude__lte=min(east, 180))
+    # Box crossing the antimeridian
+    return queryset.filter(longitude__gte=west) | queryset.filter(longitude__lte=east)
+
+
+def parse_bbox(value):
+    try:
+        west, south, east, north = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValidationError({'bbox': "Expected west,south,east,north."})
+    if south > north or not (-90 <= south <= 90 and -90 <= north <= 90):
+        raise ValidationError({'bbox': "Latitudes must be ordered and within -90..90."})
+    return south, west, north, east
+
+
+class GeoFilter(BaseFilterBackend):
+    """Bounding-box, radius and nearest-N filters over GeoLocated models"""
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        if 'bbox' in params:
+            queryset = within_bbox(queryset, *parse_bbox(params['bbox']))
+        if 'near' not in params:
+            return queryset
+
+        point = parse_coordinates(params['near'])
+        if point is None:
+            raise ValidationError({'near': "Expected lat,lng."})
+        if 'radius' in params:
+            return self.within_radius(queryset, point, self.number(params, 'radius', float))
+        if 'nearest' in params:
+            return self.nearest(queryset, point, min(self.number(params, 'nearest', int), MAX_NEAREST))
+        raise ValidationError({'near': "Combine with radius=<km> or nearest=<n>."})
+
+    @staticmethod
+    def number(params, name, cast):
+        try:
+            value = cast(params[name])
+        except ValueError:
+            raise ValidationError({name: "Must be a number."})
+        if value <= 0:
+            raise ValidationError({name: "Must be positive."})
+        return value
+
+    def within_radius(self, queryset, point, radius_km):
+        lat, lng = point
+        return within_bbox(queryset, *bbox_around(lat, lng, radius_km)).annotate(
+            distance_km=distance_expression(lat, lng),
+        ).filter(distance_km__lte=radius_km).order_by('distance_km', 'pk')
+
+    def nearest(self, queryset, point, count):
+        """Grow a search box from 1 km until it holds `count` rows, then keep the closest"""
+        lat, lng = point
+        located = queryset.filter(latitude__isnull=False)
+        radius_km = 1.0
+        while True:
+            box = within_bbox(located, *bbox_around(lat, lng, radius_km))
+            if radius_km >= math.pi * EARTH_RADIUS_KM or box.count() >= count:
+                break
+            radius_km *= 4
+
+        def by_distance(rows):
+            return rows.annotate(distance_km=distance_expression(lat, lng)).order_by('distance_km', 'pk')
+
+        candidates = list(by_distance(box).values_list('pk', 'distance_km')[:count])
+        if len(candidates) == count:
+            # A box corner reaches further than its edge, so rows just outside the
+            # box may beat the furthest candidate: search once more out to it
+            reach = candidates[-1][1]
+            box = within_bbox(located, *bbox_around(lat, lng, reach))
+            candidates = by_distance(box).values_list('pk', 'distance_km')[:count]
+        return by_distance(queryset.filter(pk__in=[pk for pk, _ in candidates]))
+
+
+def tile_bounds(z, x, y):
+    """(south, west, north, east) of web-mercator (slippy map) tile z/x/y"""
+    n = 2 ** z
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return south, x / n * 360 - 180, north, (x + 1) / n * 360 - 180
+
+
+def zoom_precision(zoom):
+    return ZOOM_PRECISION[max(0, min(zoom, len(ZOOM_PRECISION) - 1))]
+
+
+def cluster(queryset, zoom, weight=None):
+    """
+    Group located rows into geohash cells sized for `zoom`: one row per cell
+    with its count, optional summed `weight` field, centroid and bounds.
+    """
+    precision = zoom_precision(zoom)
+    aggregates = {'count': Count('pk'), 'lat': Avg('latitude'), 'lng': Avg('longitude')}
+    if weight:
+        aggregates['weight'] = Sum(weight)
+    rows = queryset.filter(latitude__isnull=False).order_by().annotate(
+        cell=Substr('geohash', 1, precision),
+    ).values('cell').annotate(**aggregates).order_by('cell')
+
+    clusters = []
+    for row in rows:
+        south, west, north, east = geohash_bounds(row['cell'])
+        clusters.append({
+            'cell': row['cell'],
+            'count': row['count'],
+            'weight': row.get('weight'),
+            'lat': round(row['lat'], 6),
+            'lng': round(row['lng'], 6),
+            'bounds': [round(west, 6), round(south, 6), round(east, 6), round(north, 6)],
+        })
+    return clusters
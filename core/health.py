@@ -0,0 +1,18 @@
+from django.conf import settings
+from health_check.cache.backends import CacheBackend
+
+from .cache import cache_stats
+
+
+class CacheStatsBackend(CacheBackend):
+    """Standard cache health check that also reports view-cache hit rates"""
+    
+    def pretty_status(self):
+        status = super().pretty_status()
+        if self.errors or self.backend != getattr(settings, 'VIEW_CACHE_ALIAS', 'default'):
+            return status
+        
+        stats = cache_stats()
+        if stats['hit_rate'] is None:
+            return status
+        return f"{status} (hit rate {stats['hit_rate']}%: {stats['hits']} hits / {stats['misses']} misses)"
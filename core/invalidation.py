@@ -0,0 +1,139 @@
+"""
+Signal-driven invalidation of cached view responses.
+
+settings.CACHE_DEPENDENCIES maps a model to the key families that depend on it:
+
+    'communications.Announcement': {
+        'families': ['announcements'],
+        'm2m': ['specific_users'],
+        'references': ['event', 'program', 'project'],
+    }
+
+- families:   evicted whenever a row of the model is saved or deleted
+- m2m:        many-to-many fields whose changes also evict the families
+- references: foreign keys to other models (cross-app edges). Saving or
+              deleting a referenced row evicts the families only when a row
+              of this model actually points at it.
+
+Evictions are collected per transaction and applied once on commit, so a
+bulk admin edit produces a single invalidation pass.
+"""
+import logging
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models.signals import post_save, pre_delete, m2m_changed
+
+from .cache import bump_generations
+
+
+logger = logging.getLogger(__name__)
+
+PENDING_ATTR = '_pending_cache_invalidation'
+
+
+class DependencyRegistry:
+    """Model -> key family graph built from settings.CACHE_DEPENDENCIES"""
+
+    def __init__(self):
+        self.families = defaultdict(set)     # model -> families evicted by its own rows
+        self.through = defaultdict(set)      # m2m through model -> families
+        self.references = defaultdict(list)  # referenced model -> [(dependent model, fk name, families)]
+
+    def load(self, dependencies):
+        for label, spec in dependencies.items():
+            model = apps.get_model(label)
+            families = set(spec.get('families', ()))
+            self.families[model] |= families
+
+            for field_name in spec.get('m2m', ()):
+                through = model._meta.get_field(field_name).remote_field.through
+                self.through[through] |= families
+
+            for field_name in spec.get('references', ()):
+                target = model._meta.get_field(field_name).related_model
+                self.references[target].append((model, field_name, families))
+        return self
+
+    def families_for(self, instance):
+        """Families to evict when this instance changes, following cross-app edges"""
+        model = type(instance)
+        families = set(self.families.get(model, ()))
+        for dependent, field_name, dependent_families in self.references.get(model, ()):
+            if dependent_families - families and dependent._default_manager.filter(**{field_name: instance.pk}).exists():
+                families |= dependent_families
+        return families
+
+    def watched_models(self):
+        return set(self.families) | set(self.references)
+
+
+registry = DependencyRegistry()
+
+
+def invalidate(families, using=DEFAULT_DB_ALIAS):
+    """
+    Queue families for eviction when the current transaction commits.
+    Outside a transaction the eviction happens immediately.
+    """
+    if not families:
+        return
+    connection = connections[using]
+    if not connection.in_atomic_block:
+        _evict(families)
+        return
+
+    pending = getattr(connection, PENDING_ATTR, None)
+    if pending is None or not _is_scheduled(connection, pending):
+        pending = _PendingInvalidation()
+        setattr(connection, PENDING_ATTR, pending)
+        transaction.on_commit(pending, using=using)
+    pending.families.update(families)
+
+
+class _PendingInvalidation:
+    """on_commit callback carrying the families collected during one transaction"""
+
+    def __init__(self):
+        self.families = set()
+
+    def __call__(self):
+        _evict(self.families)
+
+
+def _is_scheduled(connection, pending):
+    # The callback disappears from run_on_commit when its transaction (or savepoint) rolls back
+    return any(entry[1] is pending for entry in connection.run_on_commit)
+
+
+def _evict(families):
+    try:
+        bump_generations(families)
+    except Exception:
+        logger.warning("Cache invalidation failed for %s", sorted(families), exc_info=True)
+
+
+def on_model_change(sender, instance, raw=False, using=DEFAULT_DB_ALIAS, **kwargs):
+    if raw:
+        return
+    invalidate(registry.families_for(instance), using=using)
+
+
+def on_m2m_change(sender, action, using=DEFAULT_DB_ALIAS, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate(registry.through.get(sender), using=using)
+
+
+def connect_signals():
+    """Load the dependency graph from settings and wire it to model signals"""
+    registry.load(getattr(settings, 'CACHE_DEPENDENCIES', {}))
+
+    for model in registry.watched_models():
+        post_save.connect(on_model_change, sender=model, dispatch_uid=f'cache-invalidation-save-{model._meta.label}')
+        # pre_delete: SET_NULL references are cleared before post_delete fires
+        pre_delete.connect(on_model_change, sender=model, dispatch_uid=f'cache-invalidation-delete-{model._meta.label}')
+
+    for through in registry.through:
+        m2m_changed.connect(on_m2m_change, sender=through, dispatch_uid=f'cache-invalidation-m2m-{through._meta.label}')
@@ -0,0 +1,232 @@
+"""
+Background jobs stored in the database.
+
+A job is a registered function plus JSON keyword arguments in a core.Job
+row. Apps declare them in their tasks.py (imported at startup):
+
+    @job(max_attempts=5, timeout=60)
+    def notify_contact_message(message_id): ...
+
+    notify_contact_message.enqueue(message_id=message.pk)        # one INSERT
+    notify_contact_message.enqueue(run_at=tomorrow, message_id=message.pk)
+
+`manage.py run_workers` runs JOBS['WORKERS'] worker processes. Each claims
+the oldest due job with SELECT ... FOR UPDATE SKIP LOCKED, so workers never
+wait on or run each other's jobs, and runs it outside the transaction:
+
+    - success marks it done
+    - an exception or running past `timeout` seconds (SIGALRM) requeues it
+      after BACKOFF * 2 ** (attempts - 1) seconds, up to MAX_BACKOFF, until
+      max_attempts is spent and it is marked failed
+    - a job whose worker died stays running until LEASE seconds past its
+      timeout, then is requeued as a failed attempt
+
+Jobs run at least once: an attempt cut short may have done part of its
+work, so job functions must be safe to repeat.
+"""
+import logging
+import os
+import random
+import signal
+import socket
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+# name -> registered function
+REGISTRY = {}
+
+MAX_ERROR_LENGTH = 4000
+
+
+class JobTimeout(Exception):
+    pass
+
+
+def _config():
+    return {
+        'WORKERS': 2,
+        'POLL_INTERVAL': 1.0,  # seconds between polls of an empty queue
+        'BACKOFF': 30,
+        'MAX_BACKOFF': 3600,
+        'LEASE': 300,  # seconds past its timeout before a running job counts as abandoned
+        'KEEP_FINISHED': 7,  # days done and failed jobs are kept
+        **getattr(settings, 'JOBS', {}),
+    }
+
+
+def job(name=None, max_attempts=5, timeout=60):
+    """Register a function as a job; adds .enqueue(run_at=None, **kwargs) to it"""
+    def decorator(function):
+        job_name = name or f"{function.__module__.split('.')[0]}.{function.__name__}"
+        if job_name in REGISTRY and REGISTRY[job_name] is not function:
+            raise ValueError(f"Job {job_name!r} is already registered")
+        REGISTRY[job_name] = function
+        function.job_name = job_name
+        function.max_attempts = max_attempts
+        function.timeout = timeout
+        function.enqueue = lambda run_at=None, **kwargs: enqueue(job_name, run_at=run_at, **kwargs)
+        return function
+    return decorator
+
+
+def enqueue(name, run_at=None, **kwargs):
+    """Queue a run of the registered job `name` at `run_at` (now by default)"""
+    function = REGISTRY.get(name)
+    if function is None:
+        raise KeyError(f"No job registered as {name!r}")
+    return Job.objects.create(
+        name=name,
+        kwargs=kwargs,
+        run_at=run_at or timezone.now(),
+        max_attempts=function.max_attempts,
+        timeout=function.timeout,
+    )
+
+
+def claim(worker):
+    """Lock the oldest due job for `worker` and mark it running; None when nothing is due"""
+    now = timezone.now()
+    with transaction.atomic():
+        job = Job.objects.select_for_update(skip_locked=True).filter(
+            status=Job.QUEUED, run_at__lte=now,
+        ).order_by('run_at', 'pk').first()
+        if job is None:
+            return None
+        # Conditional as well: backends without SKIP LOCKED (SQLite) still never double-claim
+        if not Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_by=worker, locked_at=now, attempts=F('attempts') + 1,
+        ):
+            return None
+    job.status, job.locked_by, job.locked_at, job.attempts = Job.RUNNING, worker, now, job.attempts + 1
+    return job
+
+
+def run(job):
+    """Run a claimed job and record the outcome; returns its final status"""
+    function = REGISTRY.get(job.name)
+    try:
+        if function is None:
+            raise KeyError(f"No job registered as {job.name!r}")
+        with _time_limit(job.timeout):
+            function(**job.kwargs)
+    except Exception as exc:
+        return _fail(job, exc)
+    finally:
+        close_old_connections()
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        status=Job.DONE, finished_at=timezone.now(), last_error='',
+    )
+    return Job.DONE
+
+
+def _fail(job, exc):
+    error = ''.join(traceback.format_exception(exc))[-MAX_ERROR_LENGTH:]
+    now = timezone.now()
+    if job.attempts >= job.max_attempts:
+        logger.error("Job %s (%s) failed for good after %d attempt(s)", job.pk, job.name, job.attempts, exc_info=exc)
+        changes = {'status': Job.FAILED, 'finished_at': now}
+    else:
+        logger.warning("Job %s (%s) failed, attempt %d of %d", job.pk, job.name, job.attempts, job.max_attempts, exc_info=exc)
+        changes = {'status': Job.QUEUED, 'run_at': now + timedelta(seconds=backoff(job.attempts))}
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        locked_by='', locked_at=None, last_error=error, **changes,
+    )
+    return changes['status']
+
+
+def backoff(attempts):
+    """Seconds before retry number `attempts`: exponential, capped, with up to 10% jitter"""
+    config = _config()
+    delay = min(config['BACKOFF'] * 2 ** max(attempts - 1, 0), config['MAX_BACKOFF'])
+    return delay + random.uniform(0, delay / 10)
+
+
+@contextmanager
+def _time_limit(seconds):
+    # SIGALRM only reaches the main thread of a Unix process, which is where workers run jobs
+    if not seconds or not hasattr(signal, 'SIGALRM'):
+        yield
+        return
+
+    def expire(signum, frame):
+        raise JobTimeout(f"Timed out after {seconds}s")
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.alarm(seconds)
+    try:
+        yield
+    finally:
+        signal.alarm(0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def requeue_abandoned():
+    """Requeue (or fail) running jobs whose worker died: locked longer than their timeout plus LEASE"""
+    now = timezone.now()
+    lease = timedelta(seconds=_config()['LEASE'])
+    count = 0
+    running = Job.objects.filter(status=Job.RUNNING, locked_at__lt=now - lease).only(
+        'pk', 'name', 'attempts', 'max_attempts', 'timeout', 'locked_by', 'locked_at',
+    )
+    for job in running:
+        # No timeout: allow an hour of work before assuming the worker is gone
+        if job.locked_at + lease + timedelta(seconds=job.timeout or 3600) < now:
+            _fail(job, JobTimeout(f"Abandoned by worker {job.locked_by}"))
+            count += 1
+    return count
+
+
+def prune():
+    """Delete done and failed jobs finished more than KEEP_FINISHED days ago"""
+    cutoff = timezone.now() - timedelta(days=_config()['KEEP_FINISHED'])
+    return Job.objects.filter(status__in=[Job.DONE, Job.FAILED], finished_at__lt=cutoff).delete()[0]
+
+
+def worker_name(index=0):
+    return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+
+def work(index=0, burst=False, should_stop=lambda: False):
+    """
+    Claim and run jobs until should_stop() (checked between jobs), or with
+    `burst` until the queue has nothing due. Returns the number of jobs run.
+    """
+    config = _config()
+    worker = worker_name(index)
+    ran = 0
+    housekeeping = 0.0
+    while not should_stop():
+        if time.monotonic() - housekeeping > 60:
+            housekeeping = time.monotonic()
+            requeue_abandoned()
+            prune()
+        try:
+            job = claim(worker)
+        except DatabaseError:
+            logger.exception("Worker %s could not claim a job", worker)
+            close_old_connections()
+            if burst:
+                break
+            time.sleep(config['POLL_INTERVAL'] * 5)
+            continue
+        if job is None:
+            close_old_connections()
+            if burst:
+                break
+            time.sleep(config['POLL_INTERVAL'])
+            continue
+        run(job)
+        ran += 1
+    return ran
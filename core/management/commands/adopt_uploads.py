@@ -0,0 +1,52 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Blob
+from core.storage import blob_digest, content_addressed_fields, content_addressed_storage
+
+
+class Command(BaseCommand):
+    help = "Move legacy uploads into content-addressed storage and rebuild blob reference counts"
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recount', action='store_true',
+            help="Only rebuild reference counts from the upload fields",
+        )
+    
+    def handle(self, *args, **options):
+        storage = content_addressed_storage()
+        
+        if not options['recount']:
+            adopted = 0
+            for model, field in content_addressed_fields():
+                rows = model._default_manager.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+                for pk, name in rows.values_list('pk', field).iterator():
+                    if blob_digest(name) or not storage.exists(name):
+                        continue
+                    with storage.open(name, 'rb') as legacy:
+                        new_name = storage.save(name, legacy)
+                    # Queryset update: no save() side effects; counts are rebuilt below
+                    model._default_manager.filter(pk=pk).update(**{field: new_name})
+                    storage.delete(name)
+                    adopted += 1
+            self.stdout.write(f"Adopted {adopted} legacy uploads")
+        
+        references = Counter()
+        for model, field in content_addressed_fields():
+            for name in model._default_manager.values_list(field, flat=True).iterator():
+                digest = blob_digest(name)
+                if digest:
+                    references[digest] += 1
+        
+        with transaction.atomic():
+            changed = 0
+            for blob in Blob.objects.select_for_update().only('pk', 'sha256', 'ref_count'):
+                count = references.get(blob.sha256, 0)
+                if blob.ref_count != count:
+                    Blob.objects.filter(pk=blob.pk).update(ref_count=count)
+                    changed += 1
+        
+        self.stdout.write(self.style.SUCCESS(f"Reference counts rebuilt ({changed} corrected)"))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from core import counters
+
+
+class Command(BaseCommand):
+    help = "Apply buffered view/download counter increments to the database"
+    
+    def handle(self, *args, **options):
+        updated = counters.flush()
+        self.stdout.write(self.style.SUCCESS(f"Flushed counters for {updated} rows"))
@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Blob
+from core.storage import content_addressed_storage
+
+
+class Command(BaseCommand):
+    help = "Delete stored file bodies that no upload field references any more"
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=int, default=24,
+            help="Keep unreferenced bodies touched within the last N hours",
+        )
+    
+    def handle(self, *args, **options):
+        storage = content_addressed_storage()
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        removed = freed = 0
+        
+        for blob in Blob.objects.filter(ref_count=0, touched_at__lt=cutoff).iterator():
+            # Re-check under the same filter so a reference taken meanwhile wins
+            if not Blob.objects.filter(pk=blob.pk, ref_count=0, touched_at__lt=cutoff).delete()[0]:
+                continue
+            storage.delete_blob(blob.name)
+            removed += 1
+            freed += blob.size
+        
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} unreferenced blobs ({freed} bytes)"))
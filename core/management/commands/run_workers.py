@@ -0,0 +1,71 @@
+import multiprocessing
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs
+
+
+def _worker(index, burst):
+    stopping = threading.Event()
+    # Finish the job in hand on SIGTERM/SIGINT, then exit
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stopping.set())
+    ran = jobs.work(index, burst=burst, should_stop=stopping.is_set)
+    connections.close_all()
+    return ran
+
+
+class Command(BaseCommand):
+    help = "Run background job workers (core/jobs.py) until stopped with SIGTERM or Ctrl-C"
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help="Worker processes, overriding JOBS['WORKERS']")
+        parser.add_argument('--burst', action='store_true', help="Exit once nothing is due instead of polling")
+    
+    def handle(self, *args, **options):
+        count = max(options['workers'] or jobs._config()['WORKERS'], 1)
+        burst = options['burst']
+        if count == 1:
+            ran = _worker(0, burst)
+            self.stdout.write(self.style.SUCCESS(f"Worker stopped after {ran} job(s)"))
+            return
+        
+        # Children must not share the parent's database connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        processes = {}
+        stopping = False
+        
+        def start(index):
+            process = context.Process(target=_worker, args=(index, burst), name=f'job-worker-{index}', daemon=False)
+            process.start()
+            processes[index] = process
+        
+        def stop(signum, frame):
+            nonlocal stopping
+            stopping = True
+            for process in processes.values():
+                if process.is_alive():
+                    process.terminate()
+        
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        for index in range(count):
+            start(index)
+        self.stdout.write(f"Started {count} job worker(s)")
+        
+        while processes:
+            time.sleep(1)
+            for index, process in list(processes.items()):
+                if process.is_alive():
+                    continue
+                process.join()
+                del processes[index]
+                if not stopping and not burst:
+                    self.stderr.write(f"Worker {index} exited with code {process.exitcode}; restarting")
+                    start(index)
+        self.stdout.write(self.style.SUCCESS("Job workers stopped"))
@@ -0,0 +1,224 @@
+"""
+Per-endpoint query and latency metrics.
+
+QueryMetricsMiddleware wraps every request in a DB execute_wrapper and
+records, per resolved URL name: requests, SQL queries, SQL time, response
+time and repeated-query fingerprints (the N+1 signature). Each request also
+emits one structured (JSON) log line on the `kacaf.metrics` logger.
+
+Totals are kept per process and published to the shared cache every
+QUERY_METRICS['PUBLISH_INTERVAL'] seconds, so /metrics/ (Prometheus text
+format) adds up all workers.
+
+QUERY_BUDGETS caps queries per URL name. Going over raises
+QueryBudgetExceeded when QUERY_METRICS['RAISE_ON_BUDGET'] is set (the test
+suite) and logs a warning otherwise.
+"""
+import json
+import logging
+import os
+import re
+import socket
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .cache import get_cache
+
+
+logger = logging.getLogger('kacaf.metrics')
+
+PROCESS_KEY = 'metrics:process:{process}'
+PROCESS_INDEX_KEY = 'metrics:processes'
+
+FIELDS = ('requests', 'queries', 'sql_seconds', 'response_seconds', 'duplicate_queries', 'budget_exceeded')
+
+IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def _config():
+    return {
+        'ENABLED': True,
+        'PUBLISH_INTERVAL': 15,
+        'PROCESS_TTL': 300,
+        'RAISE_ON_BUDGET': False,
+        **getattr(settings, 'QUERY_METRICS', {}),
+    }
+
+
+def fingerprint(sql):
+    """Statement shape: parameters are already placeholders; collapse variable-length IN lists"""
+    return IN_LIST_RE.sub('IN (...)', sql)
+
+
+class QueryRecorder:
+    """execute_wrapper that counts and times every statement of one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self):
+        return [(sql, n) for sql, n in self.fingerprints.most_common() if n > 1]
+
+
+class MetricsRegistry:
+    """Per-process totals keyed by endpoint"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+        self.max_queries = defaultdict(int)
+        self.published_at = 0.0
+        self.process = f'{socket.gethostname()}:{os.getpid()}'
+
+    def record(self, endpoint, recorder, seconds, over_budget):
+        with self.lock:
+            totals = self.totals[endpoint]
+            totals['requests'] += 1
+            totals['queries'] += recorder.count
+            totals['sql_seconds'] += recorder.seconds
+            totals['response_seconds'] += seconds
+            totals['duplicate_queries'] += sum(n - 1 for _, n in recorder.duplicates())
+            totals['budget_exceeded'] += int(over_budget)
+            self.max_queries[endpoint] = max(self.max_queries[endpoint], recorder.count)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                endpoint: {**totals, 'max_queries': self.max_queries[endpoint]}
+                for endpoint, totals in self.totals.items()
+            }
+
+    def maybe_publish(self):
+        config = _config()
+        now = time.monotonic()
+        if now - self.published_at < config['PUBLISH_INTERVAL']:
+            return
+        self.published_at = now
+        try:
+            cache = get_cache()
+            cache.set(PROCESS_KEY.format(process=self.process), self.snapshot(), timeout=config['PROCESS_TTL'])
+            processes = cache.get(PROCESS_INDEX_KEY) or []
+            if self.process not in processes:
+                cache.set(PROCESS_INDEX_KEY, processes + [self.process], timeout=None)
+        except Exception:
+            logger.warning("Could not publish request metrics", exc_info=True)
+
+
+registry = MetricsRegistry()
+
+
+def collect():
+    """Totals across every process that published recently (plus this one)"""
+    snapshots = {registry.process: registry.snapshot()}
+    try:
+        cache = get_cache()
+        processes = cache.get(PROCESS_INDEX_KEY) or []
+        published = cache.get_many([PROCESS_KEY.format(process=process) for process in processes])
+        live = [process for process in processes if PROCESS_KEY.format(process=process) in published]
+        if live != processes:
+            cache.set(PROCESS_INDEX_KEY, live, timeout=None)
+        for process in live:
+            if process != registry.process:
+                snapshots[process] = published[PROCESS_KEY.format(process=process)]
+    except Exception:
+        logger.warning("Could not read published request metrics", exc_info=True)
+
+    merged = defaultdict(lambda: {**dict.fromkeys(FIELDS, 0), 'max_queries': 0})
+    for snapshot in snapshots.values():
+        for endpoint, values in snapshot.items():
+            totals = merged[endpoint]
+            for field in FIELDS:
+                totals[field] += values[field]
+            totals['max_queries'] = max(totals['max_queries'], values['max_queries'])
+    return dict(merged)
+
+
+def render_prometheus(metrics):
+    series = [
+        ('kacaf_http_requests_total', 'counter', 'requests', "Requests handled"),
+        ('kacaf_db_queries_total', 'counter', 'queries', "SQL statements executed"),
+        ('kacaf_db_query_seconds_total', 'counter', 'sql_seconds', "Time spent in SQL"),
+        ('kacaf_http_response_seconds_total', 'counter', 'response_seconds', "Time spent producing responses"),
+        ('kacaf_db_duplicate_queries_total', 'counter', 'duplicate_queries', "Statements repeating an earlier one in the same request"),
+        ('kacaf_query_budget_exceeded_total', 'counter', 'budget_exceeded', "Requests over their query budget"),
+        ('kacaf_db_queries_max', 'gauge', 'max_queries', "Most queries issued by a single request"),
+    ]
+    lines = []
+    for name, kind, field, help_text in series:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for endpoint in sorted(metrics):
+            label = endpoint.replace('\\', '\\\\').replace('"', '\\"')
+            lines.append(f'{name}{{endpoint="{label}"}} {metrics[endpoint][field]}')
+    return '\n'.join(lines) + '\n'
+
+
+class QueryMetricsMiddleware:
+    """Count SQL per request and check it against QUERY_BUDGETS"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = _config()
+        if not config['ENABLED']:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        seconds = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        endpoint = match.view_name if match else 'unresolved'
+        budget = getattr(settings, 'QUERY_BUDGETS', {}).get(endpoint)
+        over_budget = budget is not None and recorder.count > budget
+
+        registry.record(endpoint, recorder, seconds, over_budget)
+        registry.maybe_publish()
+        self.log(request, response, endpoint, recorder, seconds, budget)
+
+        if over_budget:
+            message = f"{endpoint} ran {recorder.count} queries (budget {budget})"
+            if config['RAISE_ON_BUDGET']:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def log(self, request, response, endpoint, recorder, seconds, budget):
+        duplicates = recorder.duplicates()
+        logger.info(json.dumps({
+            'event': 'request',
+            'endpoint': endpoint,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(seconds * 1000, 1),
+            'queries': recorder.count,
+            'sql_ms': round(recorder.seconds * 1000, 1),
+            'budget': budget,
+            'duplicates': [{'sql': sql[:200], 'count': n} for sql, n in duplicates[:3]],
+        }))
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:28
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('name', models.CharField(help_text='Path in the content-addressed storage', max_length=255)),
+                ('size', models.BigIntegerField(help_text='Size in bytes')),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('touched_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Last upload or reference; guards against early collection')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['ref_count', 'touched_at'], name='core_blob_orphan_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,117 @@
+from django.db import models
+from django.db.models import F
+from django.utils import timezone
+
+from .geo import geohash_encode, parse_coordinates
+
+
+class Blob(models.Model):
+    """One stored file body, shared by every upload field that references it (see core/storage.py)"""
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, help_text="Path in the content-addressed storage")
+    size = models.BigIntegerField(help_text="Size in bytes")
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    touched_at = models.DateTimeField(default=timezone.now, help_text="Last upload or reference; guards against early collection")
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['ref_count', 'touched_at'], name='core_blob_orphan_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+    
+    @classmethod
+    def register(cls, sha256, name, size):
+        """Record a stored body; re-uploading an existing one only refreshes touched_at"""
+        blob, created = cls.objects.get_or_create(sha256=sha256, defaults={'name': name, 'size': size})
+        if not created:
+            cls.objects.filter(pk=blob.pk).update(touched_at=timezone.now())
+        return blob
+    
+    @classmethod
+    def add_reference(cls, sha256, amount=1):
+        return cls.objects.filter(sha256=sha256).update(
+            ref_count=F('ref_count') + amount,
+            touched_at=timezone.now(),
+        )
+    
+    @classmethod
+    def drop_reference(cls, sha256):
+        # Collection is left to gc_blobs, after a grace period, so a concurrent
+        # re-upload of the same body can never lose its file
+        return cls.objects.filter(sha256=sha256, ref_count__gt=0).update(
+            ref_count=F('ref_count') - 1,
+            touched_at=timezone.now(),
+        )
+
+
+class GeoLocated(models.Model):
+    """
+    Parsed, indexed copy of a model's free-text gps_coordinates ("lat,lng").
+    Kept in sync on save(); code writing with bulk_create/update must call
+    sync_location() itself. See core/geo.py for the query side.
+    """
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False, db_index=True)
+    
+    LOCATION_FIELDS = ['latitude', 'longitude', 'geohash']
+    
+    class Meta:
+        abstract = True
+    
+    def sync_location(self):
+        point = parse_coordinates(self.gps_coordinates)
+        if point is None:
+            self.latitude = self.longitude = None
+            self.geohash = ''
+        else:
+            self.latitude, self.longitude = point
+            self.geohash = geohash_encode(*point)
+    
+    def save(self, *args, **kwargs):
+        self.sync_location()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'gps_coordinates' in update_fields:
+            kwargs['update_fields'] = {*update_fields, *self.LOCATION_FIELDS}
+        super().save(*args, **kwargs)
+
+
+class Job(models.Model):
+    """A unit of background work, run by `manage.py run_workers` (see core/jobs.py)"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+    
+    name = models.CharField(max_length=100, help_text="Registered job function, e.g. communications.notify_contact_message")
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    run_at = models.DateTimeField(default=timezone.now, help_text="Not run before this time; retries move it forward")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    timeout = models.PositiveIntegerField(null=True, blank=True, help_text="Seconds per attempt; empty for no limit")
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['run_at', 'id'], condition=models.Q(status='queued'), name='core_job_queued_idx'),
+            models.Index(fields=['status', 'locked_at'], name='core_job_status_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
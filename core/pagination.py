@@ -0,0 +1,174 @@
+"""
+Opt-in keyset pagination.
+
+StandardPagination behaves exactly like PageNumberPagination until a request
+carries `?cursor` (an empty value starts at the top). It then pages by
+keyset instead: the queryset's ordering (the model's Meta.ordering unless
+?ordering= changed it) plus a pk tiebreaker. Each page is one indexed range
+scan, so there is no COUNT(*) and no OFFSET, and page 5000 costs the same as page 1.
+
+    GET /api/programs/tree-plantings/?cursor=            first page
+    GET /api/programs/tree-plantings/?cursor=<next>      following pages
+
+Keyset responses are {"next": <url or null>, "results": [...]}. Cursors are
+opaque and only move forward, which is what incremental sync needs.
+"""
+import base64
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder rounds datetimes to milliseconds; a cursor needs the exact value"""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination:
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def __init__(self, page_size):
+        self.page_size = page_size
+
+    @classmethod
+    def requested(cls, request):
+        return cls.cursor_query_param in request.query_params
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param)
+        if value is None:
+            return self.page_size
+        try:
+            return max(1, min(int(value), self.max_page_size))
+        except ValueError:
+            raise ValidationError({self.page_size_query_param: "Must be an integer."})
+
+    def get_keys(self, queryset):
+        """[(field, descending)] from the queryset ordering, ending with the pk"""
+        model = queryset.model
+        ordering = queryset.query.order_by or model._meta.ordering
+        keys = []
+        for item in ordering:
+            if not isinstance(item, str) or item == '?':
+                raise ValidationError({'ordering': "Cursor pagination needs plain field ordering."})
+            descending = item.startswith('-')
+            name = item.lstrip('-')
+            if name == 'pk':
+                field = model._meta.pk
+            else:
+                try:
+                    field = model._meta.get_field(name)
+                except FieldDoesNotExist:
+                    raise ValidationError({'ordering': f"Cursor pagination cannot order by '{name}'."})
+                if not field.concrete:
+                    raise ValidationError({'ordering': f"Cursor pagination cannot order by '{name}'."})
+            keys.append((field, descending))
+
+        if not any(field.primary_key for field, _ in keys):
+            keys.append((model._meta.pk, keys[0][1] if keys else False))
+        return keys
+
+    def order_by(self, keys):
+        ordering = []
+        for field, descending in keys:
+            if field.null:
+                # Pin NULL placement so the keyset filter below agrees with the database
+                column = F(field.attname)
+                ordering.append(column.desc(nulls_last=True) if descending else column.asc(nulls_last=True))
+            else:
+                # Plain ordering keeps (field, id) indexes usable
+                ordering.append(f"{'-' if descending else ''}{field.attname}")
+        return ordering
+
+    def after(self, keys, values):
+        """Q for rows strictly after `values` in key order (NULLs sort last)"""
+        condition = None
+        for (field, descending), value in reversed(list(zip(keys, values))):
+            name = field.attname
+            if value is None:
+                beyond = None
+                equal = Q(**{f'{name}__isnull': True})
+            else:
+                beyond = Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+                if field.null:
+                    beyond |= Q(**{f'{name}__isnull': True})
+                equal = Q(**{name: value})
+
+            if condition is None:
+                condition = beyond if beyond is not None else Q(pk__in=[])
+            elif beyond is None:
+                condition = equal & condition
+            else:
+                condition = beyond | (equal & condition)
+        return condition
+
+    def encode_cursor(self, keys, obj):
+        values = [getattr(obj, field.attname) for field, _ in keys]
+        raw = json.dumps(values, cls=CursorEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, keys, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            values = json.loads(raw)
+            if not isinstance(values, list) or len(values) != len(keys):
+                raise ValueError
+            return [
+                None if value is None else field.to_python(value)
+                for (field, _), value in zip(keys, values)
+            ]
+        except Exception:
+            raise ValidationError({self.cursor_query_param: "Invalid cursor."})
+
+    def paginate_queryset(self, queryset, request):
+        self.request = request
+        keys = self.get_keys(queryset)
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.order_by(keys))
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.after(keys, self.decode_cursor(keys, cursor)))
+
+        rows = list(queryset[:page_size + 1])
+        page, has_more = rows[:page_size], len(rows) > page_size
+        self.next_cursor = self.encode_cursor(keys, page[-1]) if has_more else None
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+
+class StandardPagination(PageNumberPagination):
+    """Page numbers by default; keyset paging when the request opts in with ?cursor"""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if KeysetPagination.requested(request):
+            self.keyset = KeysetPagination(self.page_size)
+            return self.keyset.paginate_queryset(queryset, request)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
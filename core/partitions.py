@@ -0,0 +1,133 @@
+"""
+Monthly range partitioning for append-only PostgreSQL tables.
+
+partition_by_month() turns an existing table into one partitioned by a date
+column, keeping its columns, defaults, checks, indexes and foreign keys; rows
+land in a DEFAULT partition until maintain_monthly_partitions() gives each
+month its own table. Queries filtered on the column then only read the
+months they cover, and old months can be detached or dropped wholesale.
+
+Other database backends keep the plain table: both functions do nothing there.
+"""
+import datetime
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+
+def _is_postgresql():
+    return connection.vendor == 'postgresql'
+
+
+def is_partitioned(table):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [table])
+        return cursor.fetchone() is not None
+
+
+def _month_after(month):
+    return (month.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y%m}'
+
+
+def partition_by_month(table, column):
+    """
+    Recreate `table` as a table partitioned by RANGE (`column`) with the rows
+    in its DEFAULT partition. The primary key becomes (id, column), as
+    PostgreSQL requires the partition key in unique constraints.
+    """
+    if not _is_postgresql() or is_partitioned(table):
+        return
+    qn = connection.ops.quote_name
+    old = f'{table}_unpartitioned'
+    sequence = f'{table}_id_seq'
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s",
+            [table, f'{table}_pkey'],
+        )
+        indexes = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+            [table],
+        )
+        foreign_keys = cursor.fetchall()
+
+        # The id sequence (identity or serial) still carries the table's name after
+        # the rename; drop it so the partitioned table can own one of that name
+        cursor.execute(
+            "SELECT attidentity FROM pg_attribute WHERE attrelid = to_regclass(%s) AND attname = 'id'", [table],
+        )
+        identity = cursor.fetchone()[0]
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+        existing = cursor.fetchone()[0]
+        if identity:
+            cursor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN id DROP IDENTITY")
+        elif existing:
+            cursor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN id DROP DEFAULT")
+            cursor.execute(f"DROP SEQUENCE {existing}")
+
+        cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(old)}")
+        cursor.execute(
+            f"CREATE TABLE {qn(table)} (LIKE {qn(old)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE ({qn(column)})"
+        )
+        cursor.execute(f"ALTER TABLE {qn(table)} ADD PRIMARY KEY (id, {qn(column)})")
+        cursor.execute(f"CREATE SEQUENCE {qn(sequence)} OWNED BY {qn(table)}.id")
+        cursor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+        cursor.execute(f"CREATE TABLE {qn(table + '_default')} PARTITION OF {qn(table)} DEFAULT")
+        cursor.execute(f"INSERT INTO {qn(table)} SELECT * FROM {qn(old)}")
+        cursor.execute(f"SELECT setval('{sequence}', COALESCE((SELECT MAX(id) FROM {qn(table)}), 0) + 1, false)")
+        cursor.execute(f"DROP TABLE {qn(old)}")
+
+        for indexdef in indexes:
+            cursor.execute(indexdef.replace(old, table))
+        for name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}")
+
+
+def maintain_monthly_partitions(table, column, ahead=3):
+    """
+    Give every month from the current one to `ahead` months out, and every
+    month with rows still in the DEFAULT partition, its own partition.
+    Returns the names of the partitions created.
+    """
+    if not _is_postgresql() or not is_partitioned(table):
+        return []
+    qn = connection.ops.quote_name
+    default = f'{table}_default'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', {qn(column)})::date FROM {qn(default)}"
+        )
+        months = {row[0] for row in cursor.fetchall()}
+    month = timezone.localdate().replace(day=1)
+    for _ in range(ahead + 1):
+        months.add(month)
+        month = _month_after(month)
+
+    created = []
+    for month in sorted(months):
+        name = partition_name(table, month)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s)", [name])
+            if cursor.fetchone()[0] is not None:
+                continue
+            # Move the month's rows out of the default partition, then attach:
+            # PostgreSQL refuses a new partition whose range the default still holds
+            start, end = month.isoformat(), _month_after(month).isoformat()
+            cursor.execute(f"CREATE TABLE {qn(name)} (LIKE {qn(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {qn(default)} WHERE {qn(column)} >= %s AND {qn(column)} < %s RETURNING *) "
+                f"INSERT INTO {qn(name)} SELECT * FROM moved",
+                [start, end],
+            )
+            cursor.execute(
+                f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(name)} FOR VALUES FROM ('{start}') TO ('{end}')"
+            )
+        created.append(name)
+    return created
@@ -0,0 +1,58 @@
+"""
+Reference counting for content-addressed uploads.
+
+Every model field backed by core.storage.ContentAddressedStorage is found at
+startup. Saving a row that points at a new blob adds a reference, replacing
+or deleting it drops the old one. Queryset .update()/.delete() bypass these
+signals; `manage.py adopt_uploads --recount` rebuilds the counts.
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .models import Blob
+from .storage import blob_digest, content_addressed_fields
+
+
+PREVIOUS_ATTR = '_previous_blob_names'
+
+# model -> names of its content-addressed file fields
+BLOB_FIELDS = {}
+
+
+def remember_blob_names(sender, instance, raw=False, **kwargs):
+    previous = {}
+    if instance.pk and not raw:
+        previous = sender._default_manager.filter(pk=instance.pk).values(*BLOB_FIELDS[sender]).first() or {}
+    setattr(instance, PREVIOUS_ATTR, previous)
+
+
+def update_blob_references(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, PREVIOUS_ATTR, {})
+    for field in BLOB_FIELDS[sender]:
+        old, new = previous.get(field) or '', getattr(instance, field).name or ''
+        if old == new:
+            continue
+        if blob_digest(new):
+            Blob.add_reference(blob_digest(new))
+        if blob_digest(old):
+            Blob.drop_reference(blob_digest(old))
+    setattr(instance, PREVIOUS_ATTR, {field: getattr(instance, field).name for field in BLOB_FIELDS[sender]})
+
+
+def release_blob_references(sender, instance, **kwargs):
+    for field in BLOB_FIELDS[sender]:
+        digest = blob_digest(getattr(instance, field).name)
+        if digest:
+            Blob.drop_reference(digest)
+
+
+def connect_signals():
+    for model, field in content_addressed_fields():
+        BLOB_FIELDS.setdefault(model, []).append(field)
+    
+    for model in BLOB_FIELDS:
+        label = model._meta.label
+        pre_save.connect(remember_blob_names, sender=model, dispatch_uid=f'blob-refs-pre-save-{label}')
+        post_save.connect(update_blob_references, sender=model, dispatch_uid=f'blob-refs-save-{label}')
+        post_delete.connect(release_blob_references, sender=model, dispatch_uid=f'blob-refs-delete-{label}')
@@ -0,0 +1,111 @@
+"""
+Content-addressed file storage with deduplication.
+
+Upload fields that pass storage=content_addressed_storage keep each distinct
+body once, under blobs/<aa>/<bb>/<sha256><ext>. The body is hashed while it
+is written (one pass, no re-read), and an upload whose body already exists
+only records the reference. Blob rows count references from model rows
+(core/signals.py); bodies nobody references are removed by `manage.py gc_blobs`.
+
+Names written before this storage was introduced keep working unchanged;
+`manage.py adopt_uploads` moves them into the blob layout.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.text import slugify
+
+
+BLOB_DIR = 'blobs'
+BLOB_NAME_RE = re.compile(r'^blobs/[0-9a-f]{2}/[0-9a-f]{2}/(?P<digest>[0-9a-f]{64})(\.\w+)?$')
+
+
+def blob_name(digest, extension=''):
+    return f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def blob_digest(name):
+    """SHA-256 encoded in a blob name, or None for a legacy (non content-addressed) name"""
+    match = BLOB_NAME_RE.match(name or '')
+    return match.group('digest') if match else None
+
+
+def download_filename(fieldfile, label):
+    """Blob names are hashes; offer the user something readable instead"""
+    if blob_digest(fieldfile.name):
+        return f"{slugify(label) or 'download'}{os.path.splitext(fieldfile.name)[1]}"
+    return os.path.basename(fieldfile.name)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content hash in _save()
+        return name
+    
+    def _save(self, name, content):
+        from .models import Blob
+        
+        extension = os.path.splitext(name)[1].lower()
+        tmp_dir = self.path(os.path.join(BLOB_DIR, 'tmp'))
+        os.makedirs(tmp_dir, exist_ok=True)
+        
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+            
+            name = blob_name(digest.hexdigest(), extension)
+            full_path = self.path(name)
+            if os.path.exists(full_path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.replace(tmp_path, full_path)
+                # mkstemp creates 0600 files; match what FileSystemStorage would write
+                os.chmod(full_path, self.file_permissions_mode or 0o644)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        
+        Blob.register(digest.hexdigest(), name, size)
+        return name
+    
+    def delete(self, name):
+        # Shared bodies are only removed by gc_blobs once unreferenced
+        if blob_digest(name):
+            return
+        super().delete(name)
+    
+    def delete_blob(self, name):
+        super().delete(name)
+
+
+_storage = ContentAddressedStorage()
+
+
+def content_addressed_storage():
+    """Callable for FileField(storage=...), so migrations don't serialize the instance"""
+    return _storage
+
+
+def content_addressed_fields():
+    """(model, field name) for every upload field backed by this storage"""
+    from django.apps import apps
+    from django.db.models import FileField
+    
+    return [
+        (model, field.name)
+        for model in apps.get_models()
+        for field in model._meta.concrete_fields
+        if isinstance(field, FileField) and isinstance(field.storage, ContentAddressedStorage)
+    ]
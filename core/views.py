@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+from . import metrics as request_metrics
+
+
+@require_GET
+def metrics(request):
+    """Prometheus scrape endpoint: `Authorization: Bearer <METRICS_TOKEN>`, or a staff session"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    authorized = (token and constant_time_compare(header, f'Bearer {token}')) or (
+        request.user.is_authenticated and request.user.is_staff
+    )
+    if not authorized:
+        return HttpResponseForbidden()
+    
+    body = request_metrics.render_prometheus(request_metrics.collect())
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,100 @@
+"""
+Buffered, append-only writer for DocumentAccessLog.
+
+Document views and downloads call record(); entries are queued in process
+memory and written with a single bulk_create every BUFFER_SIZE entries or
+FLUSH_INTERVAL seconds, whichever comes first, and again on worker shutdown.
+A worker killed without a chance to exit cleanly loses at most its
+unflushed entries.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .models import DocumentAccessLog
+
+
+logger = logging.getLogger(__name__)
+
+
+def _config():
+    return {
+        'BUFFER_SIZE': 100,
+        'FLUSH_INTERVAL': 5,
+        **getattr(settings, 'DOCUMENT_ACCESS_LOG', {}),
+    }
+
+
+class AccessLogBuffer:
+    """Thread-safe per-process queue of unsaved DocumentAccessLog rows"""
+    
+    def __init__(self):
+        self._entries = []
+        self._lock = threading.Lock()
+        self._timer = None
+    
+    def record(self, **fields):
+        fields.setdefault('accessed_at', timezone.now())
+        entry = DocumentAccessLog(**fields)
+        config = _config()
+        
+        with self._lock:
+            self._entries.append(entry)
+            full = len(self._entries) >= config['BUFFER_SIZE']
+            if not full and self._timer is None:
+                self._timer = threading.Timer(config['FLUSH_INTERVAL'], self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        
+        if full:
+            self.flush()
+    
+    def flush(self):
+        """Write all queued entries; returns how many were saved"""
+        with self._lock:
+            entries, self._entries = self._entries, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        
+        if not entries:
+            return 0
+        try:
+            DocumentAccessLog.objects.bulk_create(entries, batch_size=500)
+        except Exception:
+            logger.exception("Could not write %d document access log entries", len(entries))
+            return 0
+        return len(entries)
+    
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # Timer threads open their own DB connections
+            connections.close_all()
+    
+    def __len__(self):
+        return len(self._entries)
+
+
+buffer = AccessLogBuffer()
+atexit.register(buffer.flush)
+
+
+def record(document, user, access_type, ip_address=None, user_agent=None):
+    """Queue a document access for the next bulk write"""
+    buffer.record(
+        document=document,
+        user=user,
+        access_type=access_type,
+        ip_address=ip_address,
+        user_agent=user_agent,
+    )
+
+
+def flush():
+    return buffer.flush()
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import DocumentCategory, Document, DocumentAccessLog, DocumentReview, DocumentTemplate
+from .models import DocumentCategory, Document, DocumentAccessLog, DocumentAccessSummary, DocumentReview, DocumentTemplate
 
 
 class DocumentAccessLogInline(admin.TabularInline):
@@ -144,4 +144,15 @@ class DocumentTemplateAdmin(admin.ModelAdmin):
         }),
     )
     
-    readonly_fields = ('created_at', 'updated_at', 'usage_count', 'last_used')
\ No newline at end of file
+    readonly_fields = ('created_at', 'updated_at', 'usage_count', 'last_used')
+
+
+@admin.register(DocumentAccessSummary)
+class DocumentAccessSummaryAdmin(admin.ModelAdmin):
+    list_display = ('document', 'month', 'access_type', 'count')
+    list_filter = ('access_type', 'month')
+    search_fields = ('document__title',)
+    readonly_fields = ('document', 'month', 'access_type', 'count')
+    
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from documents import access_log
+from documents.models import DocumentAccessLog
+
+
+class Command(BaseCommand):
+    help = "Roll document access log entries past the retention window into monthly summaries"
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int,
+            default=settings.DOCUMENT_ACCESS_LOG.get('RETENTION_DAYS', 365),
+            help="Keep entries from the last N days",
+        )
+    
+    def handle(self, *args, **options):
+        access_log.flush()
+        before = timezone.now() - timedelta(days=options['days'])
+        removed = DocumentAccessLog.prune(before)
+        self.stdout.write(self.style.SUCCESS(
+            f"Pruned {removed} access log entries older than {before:%Y-%m-%d}"
+        ))
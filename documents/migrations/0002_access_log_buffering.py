@@ -0,0 +1,52 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:24
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentAccessSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('access_type', models.CharField(choices=[('view', 'View'), ('download', 'Download')], max_length=10)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Document Access Summaries',
+                'ordering': ['-month'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='documentaccesslog',
+            name='accessed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='documentaccesslog',
+            index=models.Index(fields=['document', '-accessed_at'], name='doc_access_document_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documentaccesslog',
+            index=models.Index(fields=['accessed_at'], name='doc_access_accessed_at_idx'),
+        ),
+        migrations.AddField(
+            model_name='documentaccesssummary',
+            name='document',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access_summaries', to='documents.document'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='documentaccesssummary',
+            unique_together={('document', 'month', 'access_type')},
+        ),
+    ]
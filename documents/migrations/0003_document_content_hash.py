@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0002_access_log_buffering'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, help_text='SHA-256 of the file, used as its ETag', max_length=64),
+        ),
+    ]
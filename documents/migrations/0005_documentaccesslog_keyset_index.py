@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0004_alter_document_file'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='documentaccesslog',
+            name='doc_access_document_idx',
+        ),
+        migrations.AddIndex(
+            model_name='documentaccesslog',
+            index=models.Index(fields=['document', '-accessed_at', '-id'], name='doc_access_document_idx'),
+        ),
+    ]
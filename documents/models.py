@@ -1,7 +1,12 @@
-from django.db import models
+import hashlib
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.core.validators import FileExtensionValidator
+from core.storage import blob_digest, content_addressed_storage
 
 
 User = get_user_model()
@@ -60,12 +65,14 @@ class Document(models.Model):
     # File details
     file = models.FileField(
         upload_to='documents/',
+        storage=content_addressed_storage,
         validators=[
             FileExtensionValidator(allowed_extensions=['pdf', 'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', 'txt', 'jpg', 'png'])
         ]
     )
     file_size = models.BigIntegerField(help_text="Size in bytes", default=0)
     file_format = models.CharField(max_length=10, help_text="File extension")
+    content_hash = models.CharField(max_length=64, blank=True, default='', editable=False, help_text="SHA-256 of the file, used as its ETag")
     
     # Metadata
     description = models.TextField(null=True, blank=True)
@@ -113,31 +120,110 @@ class Document(models.Model):
         return f"{self.title} (v{self.version})"
     
     def save(self, *args, **kwargs):
-        # Set file size and format
+        # Set file size, format and hash. A new upload is committed first: the
+        # storage hashes it while writing, and the hash is part of its name.
         if self.file:
+            if not self.file._committed:
+                self.file.save(self.file.name, self.file.file, save=False)
             self.file_size = self.file.size
             self.file_format = self.file.name.split('.')[-1].lower()
+            self.content_hash = blob_digest(self.file.name) or self.content_hash or self.compute_content_hash()
         
         # Set created_by if not set
         if not self.created_by and hasattr(self, 'request') and self.request.user:
             self.created_by = self.request.user
         
         super().save(*args, **kwargs)
+    
+    @classmethod
+    def visible_to(cls, user):
+        """Active documents the user may list, by access level"""
+        queryset = cls.objects.filter(is_active=True)
+        if user.is_staff or getattr(user, 'user_type', None) == 'executive':
+            return queryset
+        elif user.is_authenticated:
+            return queryset.exclude(access_level='confidential')
+        else:
+            return queryset.filter(access_level='public')
+    
+    def compute_content_hash(self):
+        digest = hashlib.sha256()
+        for chunk in self.file.chunks():
+            digest.update(chunk)
+        return digest.hexdigest()
+    
+    def ensure_content_hash(self):
+        """Hash files uploaded before content hashes were stored"""
+        if not self.content_hash and self.file:
+            self.content_hash = self.compute_content_hash()
+            Document.objects.filter(pk=self.pk).update(content_hash=self.content_hash)
+        return self.content_hash
 
 
 class DocumentAccessLog(models.Model):
     document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='access_logs')
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     access_type = models.CharField(max_length=10, choices=[('view', 'View'), ('download', 'Download')])
-    accessed_at = models.DateTimeField(auto_now_add=True)
+    # Set when the access happens, not when the buffered entry is written (see documents/access_log.py)
+    accessed_at = models.DateTimeField(default=timezone.now)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(null=True, blank=True)
     
     class Meta:
         ordering = ['-accessed_at']
+        indexes = [
+            models.Index(fields=['accessed_at'], name='doc_access_accessed_at_idx'),
+            models.Index(fields=['document', '-accessed_at', '-id'], name='doc_access_document_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user} {self.access_type}d {self.document.title}"
+    
+    @classmethod
+    def prune(cls, before):
+        """
+        Fold entries older than `before` into DocumentAccessSummary and delete
+        them, one day per transaction so a large backlog never holds long locks.
+        Returns the number of entries removed.
+        """
+        removed = 0
+        oldest = cls.objects.filter(accessed_at__lt=before).order_by('accessed_at').first()
+        if oldest is None:
+            return 0
+        
+        day_start = oldest.accessed_at.replace(hour=0, minute=0, second=0, microsecond=0)
+        while day_start < before:
+            day_end = min(day_start + timedelta(days=1), before)
+            with transaction.atomic():
+                entries = cls.objects.filter(accessed_at__gte=day_start, accessed_at__lt=day_end)
+                totals = entries.values('document_id', 'access_type').annotate(total=models.Count('id'))
+                month = day_start.date().replace(day=1)
+                for row in totals:
+                    summary, _ = DocumentAccessSummary.objects.get_or_create(
+                        document_id=row['document_id'],
+                        month=month,
+                        access_type=row['access_type'],
+                    )
+                    DocumentAccessSummary.objects.filter(pk=summary.pk).update(count=F('count') + row['total'])
+                removed += entries.delete()[0]
+            day_start = day_end
+        return removed
+
+
+class DocumentAccessSummary(models.Model):
+    """Monthly access totals for log rows pruned by the retention job"""
+    document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='access_summaries')
+    month = models.DateField(help_text="First day of the month")
+    access_type = models.CharField(max_length=10, choices=[('view', 'View'), ('download', 'Download')])
+    count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-month']
+        unique_together = ['document', 'month', 'access_type']
+        verbose_name_plural = "Document Access Summaries"
+    
+    def __str__(self):
+        return f"{self.document.title} {self.month:%Y-%m}: {self.count} {self.access_type}s"
 
 
 class DocumentReview(models.Model):
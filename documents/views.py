@@ -1,12 +1,19 @@
 from django.db.models import Q, Count
 from django.utils import timezone
+from django.urls import reverse
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.http import FileResponse, Http404
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from core.cache import cache_policy
+from core.pagination import KeysetPagination
+from core.downloads import PassthroughRenderer, serve_file, starts_download
+from core.storage import download_filename
+from core import counters
 from .models import DocumentCategory, Document, DocumentAccessLog, DocumentReview, DocumentTemplate
 from .serializers import (
     DocumentCategorySerializer, DocumentSerializer,
@@ -14,6 +21,8 @@ from .serializers import (
     DocumentAccessSerializer
 )
 from .permissions import CanAccessDocument
+from . import access_log
+from search.filters import FullTextSearchFilter
 
 
 class DocumentCategoryViewSet(viewsets.ModelViewSet):
@@ -28,6 +37,7 @@ class DocumentCategoryViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
     
     @action(detail=True, methods=['get'])
+    @cache_policy('documents.category_documents')
     def documents(self, request, pk=None):
         category = self.get_object()
         documents = category.documents.filter(is_active=True)
@@ -48,40 +58,30 @@ class DocumentCategoryViewSet(viewsets.ModelViewSet):
 class DocumentViewSet(viewsets.ModelViewSet):
     queryset = Document.objects.filter(is_active=True)
     serializer_class = DocumentSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ['document_type', 'category', 'status', 'access_level', 'program', 'project', 'event']
     search_fields = ['title', 'description', 'tags', 'keywords']
     ordering_fields = ['title', 'created_at', 'download_count', 'effective_date']
     permission_classes = [permissions.IsAuthenticated, CanAccessDocument]
     
     def get_queryset(self):
-        queryset = super().get_queryset()
-        user = self.request.user
-        
         # Apply access level filtering
-        if user.is_staff or user.user_type == 'executive':
-            return queryset
-        elif user.is_authenticated:
-            return queryset.exclude(access_level='confidential')
-        else:
-            return queryset.filter(access_level='public')
+        return Document.visible_to(self.request.user)
     
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
         
-        # Log view access
+        # Log view access (buffered, written in bulk)
         if request.user.is_authenticated:
-            DocumentAccessLog.objects.create(
+            access_log.record(
                 document=instance,
                 user=request.user,
                 access_type='view',
                 ip_address=self.get_client_ip(request)
             )
             
-            # Update view count
-            instance.view_count += 1
-            instance.last_viewed = timezone.now()
-            instance.save()
+            # Update view count (buffered; last_viewed is set when flushed)
+            counters.increment(instance, 'view_count')
         
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
@@ -94,27 +94,48 @@ class DocumentViewSet(viewsets.ModelViewSet):
         if not self.check_download_permission(request.user, document):
             return Response({'error': 'Not authorized to download this document.'}, status=status.HTTP_403_FORBIDDEN)
         
-        # Log download access
-        if request.user.is_authenticated:
-            DocumentAccessLog.objects.create(
+        # Return the streaming URL; the download itself is logged by file()
+        return Response({
+            'download_url': request.build_absolute_uri(reverse('documents:document-file', args=[document.pk])),
+            'filename': download_filename(document.file, document.title),
+            'file_size': document.file_size,
+            'file_format': document.file_format,
+            'content_hash': document.content_hash,
+        })
+    
+    @action(detail=True, methods=['get'], renderer_classes=[JSONRenderer, PassthroughRenderer])
+    def file(self, request, pk=None):
+        """Stream the file with Range, ETag and Last-Modified support (resumable downloads)"""
+        document = self.get_object()
+        
+        if not self.check_download_permission(request.user, document):
+            return Response({'error': 'Not authorized to download this document.'}, status=status.HTTP_403_FORBIDDEN)
+        if not document.file:
+            raise Http404
+        
+        response = serve_file(
+            request,
+            document.file,
+            etag=document.ensure_content_hash(),
+            last_modified=document.updated_at,
+            filename=download_filename(document.file, document.title),
+            private=document.access_level != 'public',
+        )
+        
+        # Count a download once: not for HEAD, 304s or resumed ranges
+        if starts_download(request, response):
+            # Log download access (buffered, written in bulk)
+            access_log.record(
                 document=document,
                 user=request.user,
                 access_type='download',
                 ip_address=self.get_client_ip(request)
             )
             
-            # Update download count
-            document.download_count += 1
-            document.last_downloaded = timezone.now()
-            document.save()
+            # Update download count (buffered; last_downloaded is set when flushed)
+            counters.increment(document, 'download_count')
         
-        # Return file URL
-        return Response({
-            'download_url': request.build_absolute_uri(document.file.url),
-            'filename': document.file.name.split('/')[-1],
-            'file_size': document.file_size,
-            'file_format': document.file_format
-        })
+        return response
     
     @action(detail=True, methods=['get'])
     def access_logs(self, request, pk=None):
@@ -122,7 +143,11 @@ class DocumentViewSet(viewsets.ModelViewSet):
         if not request.user.is_staff and request.user.user_type != 'executive':
             return Response({'error': 'Not authorized.'}, status=status.HTTP_403_FORBIDDEN)
         
-        logs = document.access_logs.all()[:100]  # Limit to recent 100
+        logs = document.access_logs.select_related('user')
+        
+        # ?cursor pages through the full history; otherwise the recent 100
+        paginated = KeysetPagination.requested(request)
+        logs = self.paginate_queryset(logs) if paginated else logs[:100]
         data = [
             {
                 'user': log.user.get_full_name() if log.user else 'Anonymous',
@@ -132,7 +157,7 @@ class DocumentViewSet(viewsets.ModelViewSet):
             }
             for log in logs
         ]
-        return Response(data)
+        return self.get_paginated_response(data) if paginated else Response(data)
     
     @action(detail=False, methods=['get'])
     def expired(self, request):
@@ -218,10 +243,8 @@ class DocumentTemplateViewSet(viewsets.ModelViewSet):
     def download(self, request, pk=None):
         template = self.get_object()
         
-        # Update usage statistics
-        template.usage_count += 1
-        template.last_used = timezone.now()
-        template.save()
+        # Update usage statistics (buffered; last_used is set when flushed)
+        counters.increment(template, 'usage_count')
         
         return Response({
             'download_url': request.build_absolute_uri(template.template_file.url),
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Event, EventRegistration, EventPhoto, EventResource
+from django.utils import timezone
+from .models import Event, EventRegistration, EventPhoto, EventResource, CheckInScan
+from . import registration as registrations
 
 
 class EventRegistrationInline(admin.TabularInline):
@@ -58,19 +60,35 @@ class EventAdmin(admin.ModelAdmin):
             'fields': ('banner_image',)
         }),
         ('Statistics', {
-            'fields': ('total_registrations', 'total_attendance')
+            'fields': ('seats_taken', 'total_registrations', 'total_attendance')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at', 'published_at')
         }),
     )
     
-    readonly_fields = ('created_at', 'updated_at', 'total_registrations', 'total_attendance')
+    readonly_fields = ('created_at', 'updated_at', 'seats_taken', 'total_registrations', 'total_attendance')
     
     def save_model(self, request, obj, form, change):
         if obj.status == 'published' and not obj.published_at:
             obj.published_at = timezone.now()
         super().save_model(request, obj, form, change)
+    
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Registrations edited inline bypass the seat counter
+        registrations.sync_seats(form.instance)
+
+
+class CheckInScanInline(admin.TabularInline):
+    model = CheckInScan
+    extra = 0
+    fields = ('kind', 'scanned_at', 'device_id', 'synced_by', 'synced_at')
+    readonly_fields = ('kind', 'scanned_at', 'device_id', 'synced_by', 'synced_at')
+    can_delete = False
+    
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(EventRegistration)
@@ -100,6 +118,21 @@ class EventRegistrationAdmin(admin.ModelAdmin):
     )
     
     readonly_fields = ('registration_date',)
+    inlines = [CheckInScanInline]
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        registrations.sync_seats(obj.event)
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        registrations.sync_seats(obj.event)
+    
+    def delete_queryset(self, request, queryset):
+        events = list(Event.objects.filter(registrations__in=queryset).distinct())
+        super().delete_queryset(request, queryset)
+        for event in events:
+            registrations.sync_seats(event)
 
 
 @admin.register(EventPhoto)
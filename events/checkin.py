@@ -0,0 +1,175 @@
+"""
+Offline check-in for events.
+
+Each registration has a ticket token, an HMAC of its ids under SECRET_KEY,
+shown to the participant (e.g. as a QR code together with the registration
+id). roster() lists every active registration with a SHA-256 hash of its
+token, so a device that downloaded the roster can validate tickets with no
+connection, without ever holding tokens it could forge tickets from.
+
+sync_scans() applies a batch of timestamped scans from such a device:
+
+    1. scans are validated, and deduplicated within the batch and against
+       the stored CheckInScan rows by (registration, kind, scanned_at)
+    2. the registrations are locked and changed in memory, then written
+       with one bulk_update
+    3. Event.total_attendance (and seats_taken, for walk-ins from the
+       waiting list) get one UPDATE for the whole batch
+
+Scans are applied in scanned_at order; re-sending a batch changes nothing.
+"""
+import hashlib
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from .models import CheckInScan, Event, EventRegistration
+from .registration import CANCELLED, SEAT_STATUSES
+from .serializers import CheckInScanSerializer
+
+
+TOKEN_SALT = 'events.checkin.ticket'
+TOKEN_LENGTH = 20
+HASH_LENGTH = 16
+
+ROSTER_FIELDS = ['id', 'token_hash', 'status', 'checked_in']
+
+APPLIED = 'applied'
+DUPLICATE = 'duplicate'
+ERROR = 'error'
+
+MAX_SCANS = 2000
+
+
+class TooManyScans(Exception):
+    pass
+
+
+def ticket_token(registration):
+    return _token(registration.event_id, registration.pk)
+
+
+def _token(event_id, registration_id):
+    return salted_hmac(TOKEN_SALT, f'{event_id}:{registration_id}').hexdigest()[:TOKEN_LENGTH]
+
+
+def token_hash(token):
+    return hashlib.sha256(token.encode()).hexdigest()[:HASH_LENGTH]
+
+
+def roster(event):
+    """Active registrations as compact rows in ROSTER_FIELDS order"""
+    registrations = EventRegistration.objects.filter(event=event).exclude(status=CANCELLED).order_by('pk')
+    return [
+        [pk, token_hash(_token(event.pk, pk)), status, attended]
+        for pk, status, attended in registrations.values_list('pk', 'status', 'attended')
+    ]
+
+
+def sync_scans(event, rows, user):
+    if len(rows) > MAX_SCANS:
+        raise TooManyScans(f"At most {MAX_SCANS} scans per sync.")
+
+    results = [None] * len(rows)
+    scans = {}
+    for index, row in enumerate(rows):
+        serializer = CheckInScanSerializer(data=row) if isinstance(row, dict) else None
+        if serializer is None or not serializer.is_valid():
+            errors = serializer.errors if serializer is not None else {'non_field_errors': ["Expected an object."]}
+            results[index] = _error(index, row, errors)
+            continue
+        data = serializer.validated_data
+        key = (data['registration'], data['kind'], data['scanned_at'])
+        if key in scans:
+            results[index] = _result(index, data, DUPLICATE)
+        else:
+            scans[key] = (index, data)
+
+    with transaction.atomic():
+        # Same lock order as events.registration: the event row, then its registrations
+        Event.objects.select_for_update().filter(pk=event.pk).values_list('pk', flat=True).get()
+        registrations = EventRegistration.objects.select_for_update().filter(
+            event=event, pk__in={registration_id for registration_id, _, _ in scans},
+        ).only('pk', 'event_id', 'status', 'attended', 'check_in_time', 'check_out_time')
+        registrations = {registration.pk: registration for registration in registrations}
+        stored = set(CheckInScan.objects.filter(
+            registration_id__in=list(registrations),
+            scanned_at__in={scanned_at for _, _, scanned_at in scans},
+        ).values_list('registration_id', 'kind', 'scanned_at'))
+
+        changed, new_scans = {}, []
+        newly_attended = walk_ins = 0
+        for key, (index, data) in sorted(scans.items(), key=lambda item: item[0][2]):
+            registration_id, kind, scanned_at = key
+            registration = registrations.get(registration_id)
+            errors = _check(registration, data)
+            if errors:
+                results[index] = _error(index, data, errors)
+                continue
+            if key in stored:
+                results[index] = _result(index, data, DUPLICATE)
+                continue
+
+            if kind == 'in':
+                if not registration.attended:
+                    newly_attended += 1
+                    if registration.status not in SEAT_STATUSES:
+                        walk_ins += 1
+                registration.attended = True
+                registration.status = 'attended'
+                if registration.check_in_time is None or scanned_at < registration.check_in_time:
+                    registration.check_in_time = scanned_at
+            else:
+                if registration.check_out_time is None or scanned_at > registration.check_out_time:
+                    registration.check_out_time = scanned_at
+            changed[registration.pk] = registration
+            new_scans.append(CheckInScan(
+                registration=registration, kind=kind, scanned_at=scanned_at,
+                device_id=data.get('device_id', ''), synced_by=user,
+            ))
+            results[index] = _result(index, data, APPLIED)
+
+        EventRegistration.objects.bulk_update(
+            list(changed.values()), ['attended', 'status', 'check_in_time', 'check_out_time'], batch_size=500,
+        )
+        CheckInScan.objects.bulk_create(new_scans, batch_size=500, ignore_conflicts=True)
+        if newly_attended:
+            Event.objects.filter(pk=event.pk).update(
+                total_attendance=F('total_attendance') + newly_attended,
+                seats_taken=F('seats_taken') + walk_ins,
+            )
+
+    counts = {APPLIED: 0, DUPLICATE: 0, ERROR: 0}
+    for result in results:
+        counts[result['status']] += 1
+    return {
+        'received': len(rows),
+        'applied': counts[APPLIED],
+        'duplicates': counts[DUPLICATE],
+        'errors': counts[ERROR],
+        'synced_at': timezone.now(),
+        'results': results,
+    }
+
+
+def _check(registration, data):
+    if registration is None:
+        return {'registration': ["Not registered for this event."]}
+    if 'token' in data and not constant_time_compare(data['token'], ticket_token(registration)):
+        return {'token': ["Invalid ticket."]}
+    if registration.status == CANCELLED:
+        return {'registration': ["Registration was cancelled."]}
+    if data['kind'] == 'out' and not registration.attended:
+        return {'kind': ["Checked out before checking in."]}
+    return None
+
+
+def _result(index, data, status):
+    return {'index': index, 'registration': data['registration'], 'kind': data['kind'], 'status': status}
+
+
+def _error(index, row, errors):
+    registration_id = row.get('registration') if isinstance(row, dict) else None
+    return {'index': index, 'registration': registration_id, 'status': ERROR, 'errors': errors}
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0002_alter_eventresource_file'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eventregistration',
+            index=models.Index(fields=['-registration_date', '-id'], name='eventreg_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:54
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_seats(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    EventRegistration = apps.get_model('events', 'EventRegistration')
+
+    def counted(**filters):
+        rows = EventRegistration.objects.filter(event=OuterRef('pk'), **filters).order_by().values('event')
+        return Coalesce(Subquery(rows.annotate(count=Count('id')).values('count')[:1], output_field=IntegerField()), 0)
+
+    Event.objects.update(
+        seats_taken=counted(status__in=['pending', 'confirmed', 'attended']),
+        total_registrations=counted(),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_geolocation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='seats_taken',
+            field=models.IntegerField(default=0, editable=False, help_text='Registrations holding a seat; maintained by events.registration'),
+        ),
+        migrations.AddIndex(
+            model_name='eventregistration',
+            index=models.Index(fields=['event', 'status', 'registration_date', 'id'], name='eventreg_waiting_idx'),
+        ),
+        migrations.RunPython(count_seats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_event_seats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckInScan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('in', 'Check-in'), ('out', 'Check-out')], max_length=3)),
+                ('scanned_at', models.DateTimeField(help_text='Device clock at the time of the scan')),
+                ('device_id', models.CharField(blank=True, max_length=64)),
+                ('synced_at', models.DateTimeField(auto_now_add=True)),
+                ('registration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scans', to='events.eventregistration')),
+                ('synced_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['scanned_at', 'id'],
+                'constraints': [models.UniqueConstraint(fields=('registration', 'kind', 'scanned_at'), name='checkinscan_unique')],
+            },
+        ),
+    ]
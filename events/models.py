@@ -2,12 +2,14 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
+from core.models import GeoLocated
+from core.storage import content_addressed_storage
 
 
 User = get_user_model()
 
 
-class Event(models.Model):
+class Event(GeoLocated):
     EVENT_TYPE = (
         ('workshop', 'Workshop'),
         ('training', 'Training'),
@@ -77,6 +79,8 @@ class Event(models.Model):
     gallery = models.ManyToManyField('EventPhoto', blank=True, related_name='event_gallery')
     
     # Statistics
+    seats_taken = models.IntegerField(default=0, editable=False,
+                                      help_text="Registrations holding a seat; maintained by events.registration")
     total_registrations = models.IntegerField(default=0)
     total_attendance = models.IntegerField(default=0)
     
@@ -85,11 +89,30 @@ class Event(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     published_at = models.DateTimeField(null=True, blank=True)
     
+    COUNTER_FIELDS = ['seats_taken', 'total_registrations']
+    
     class Meta:
         ordering = ['-start_datetime']
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='event_latlng_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.get_event_type_display()}"
+    
+    def save(self, *args, **kwargs):
+        # Registration counters are only written by events.registration, never from a
+        # possibly stale instance (an edit form opened before someone registered)
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+    
+    @property
+    def seats_available(self):
+        return max(self.max_participants - self.seats_taken, 0)
 
 
 class EventRegistration(models.Model):
@@ -148,11 +171,45 @@ class EventRegistration(models.Model):
     class Meta:
         ordering = ['-registration_date']
         unique_together = ['event', 'participant']
+        indexes = [
+            # Keyset pagination: ordering + pk tiebreaker (core/pagination.py)
+            models.Index(fields=['-registration_date', '-id'], name='eventreg_keyset_idx'),
+            # Waiting-list promotion: oldest waiting registration of an event first
+            models.Index(fields=['event', 'status', 'registration_date', 'id'], name='eventreg_waiting_idx'),
+        ]
     
     def __str__(self):
         return f"{self.participant.get_full_name()} - {self.event.title}"
 
 
+class CheckInScan(models.Model):
+    """
+    A ticket scan synced from a check-in device. Scans are deduplicated on
+    (registration, kind, scanned_at), so a device can resend a batch after a
+    dropped connection without applying anything twice.
+    """
+    KIND_CHOICES = (
+        ('in', 'Check-in'),
+        ('out', 'Check-out'),
+    )
+    
+    registration = models.ForeignKey(EventRegistration, on_delete=models.CASCADE, related_name='scans')
+    kind = models.CharField(max_length=3, choices=KIND_CHOICES)
+    scanned_at = models.DateTimeField(help_text="Device clock at the time of the scan")
+    device_id = models.CharField(max_length=64, blank=True)
+    synced_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    synced_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['scanned_at', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['registration', 'kind', 'scanned_at'], name='checkinscan_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.registration_id} {self.kind} at {self.scanned_at}"
+
+
 class EventPhoto(models.Model):
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='photos')
     title = models.CharField(max_length=200, null=True, blank=True)
@@ -185,7 +242,7 @@ class EventResource(models.Model):
     title = models.CharField(max_length=200)
     resource_type = models.CharField(max_length=20, choices=RESOURCE_TYPE)
     description = models.TextField(null=True, blank=True)
-    file = models.FileField(upload_to='events/resources/')
+    file = models.FileField(upload_to='events/resources/', storage=content_addressed_storage)
     uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     is_public = models.BooleanField(default=True)
@@ -0,0 +1,141 @@
+"""
+Event registration with enforced capacity.
+
+Event.seats_taken counts the registrations holding a seat (SEAT_STATUSES).
+register() locks the event row, then takes a seat with a conditional
+UPDATE ... SET seats_taken = seats_taken + 1 WHERE seats_taken < max_participants,
+so concurrent sign-ups queue on the row lock and can never oversell; when
+no seat is left the registration goes on the waiting list. cancel() hands a
+freed seat to the longest-waiting registration in the same transaction, and
+fill_seats() does the same when capacity grows.
+"""
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Event, EventRegistration
+
+
+logger = logging.getLogger(__name__)
+
+SEAT_STATUSES = ('pending', 'confirmed', 'attended')
+WAITING = 'waiting_list'
+CANCELLED = 'cancelled'
+
+
+class RegistrationError(Exception):
+    pass
+
+
+def register(event, participant, **details):
+    """
+    Register `participant` for `event`: with a seat ('pending') while there is
+    one, otherwise on the waiting list. Raises RegistrationError when
+    registration is closed or the participant is already registered.
+    """
+    if event.requires_registration and event.registration_deadline and timezone.now() > event.registration_deadline:
+        raise RegistrationError("Registration deadline has passed.")
+
+    try:
+        with transaction.atomic():
+            Event.objects.select_for_update().filter(pk=event.pk).values_list('pk', flat=True).get()
+            seated = Event.objects.filter(pk=event.pk, seats_taken__lt=F('max_participants')).update(
+                seats_taken=F('seats_taken') + 1,
+                total_registrations=F('total_registrations') + 1,
+            )
+            if not seated:
+                Event.objects.filter(pk=event.pk).update(total_registrations=F('total_registrations') + 1)
+            return EventRegistration.objects.create(
+                event=event,
+                participant=participant,
+                status='pending' if seated else WAITING,
+                **details,
+            )
+    except IntegrityError:
+        raise RegistrationError("Already registered for this event.")
+
+
+def cancel(registration):
+    """
+    Cancel a registration. A seat it held goes to the longest-waiting
+    registration, which is returned (None when nobody was waiting).
+    """
+    with transaction.atomic():
+        Event.objects.select_for_update().filter(pk=registration.event_id).values_list('pk', flat=True).get()
+        registration = EventRegistration.objects.select_for_update().get(pk=registration.pk)
+        if registration.status == CANCELLED:
+            return None
+        held_seat = registration.status in SEAT_STATUSES
+        registration.status = CANCELLED
+        registration.save(update_fields=['status'])
+        if not held_seat:
+            return None
+        Event.objects.filter(pk=registration.event_id).update(seats_taken=F('seats_taken') - 1)
+        promoted = _promote(registration.event_id, 1)
+    return promoted[0] if promoted else None
+
+
+def withdraw(registration):
+    """Delete a registration, releasing its seat to the waiting list first"""
+    with transaction.atomic():
+        promoted = cancel(registration)
+        registration.delete()
+        Event.objects.filter(pk=registration.event_id).update(total_registrations=F('total_registrations') - 1)
+    return promoted
+
+
+def check_in(registration, when=None):
+    """Mark a registration attended and count it; a walk-in from the waiting list takes a seat"""
+    with transaction.atomic():
+        Event.objects.select_for_update().filter(pk=registration.event_id).values_list('pk', flat=True).get()
+        registration = EventRegistration.objects.select_for_update().get(pk=registration.pk)
+        if not registration.attended:
+            walk_in = registration.status not in SEAT_STATUSES
+            Event.objects.filter(pk=registration.event_id).update(
+                total_attendance=F('total_attendance') + 1,
+                seats_taken=F('seats_taken') + int(walk_in),
+            )
+        registration.check_in_time = when or timezone.now()
+        registration.attended = True
+        registration.status = 'attended'
+        registration.save(update_fields=['check_in_time', 'attended', 'status'])
+    return registration
+
+
+def fill_seats(event):
+    """Promote waiting registrations into any free seats, e.g. after max_participants was raised"""
+    with transaction.atomic():
+        free = Event.objects.select_for_update().filter(pk=event.pk).values_list(
+            F('max_participants') - F('seats_taken'), flat=True,
+        ).get()
+        return _promote(event.pk, free) if free > 0 else []
+
+
+def sync_seats(event):
+    """Recount seats_taken and total_registrations from the registrations, then fill free seats"""
+    with transaction.atomic():
+        Event.objects.select_for_update().filter(pk=event.pk).values_list('pk', flat=True).get()
+        registrations = EventRegistration.objects.filter(event_id=event.pk)
+        Event.objects.filter(pk=event.pk).update(
+            seats_taken=registrations.filter(status__in=SEAT_STATUSES).count(),
+            total_registrations=registrations.count(),
+        )
+        return fill_seats(event)
+
+
+def _promote(event_id, seats):
+    """Move the `seats` longest-waiting registrations into seats; the caller holds the event lock"""
+    waiting = list(
+        EventRegistration.objects.filter(event_id=event_id, status=WAITING)
+        .order_by('registration_date', 'pk')[:seats]
+    )
+    if not waiting:
+        return []
+    EventRegistration.objects.filter(pk__in=[registration.pk for registration in waiting]).update(status='pending')
+    Event.objects.filter(pk=event_id).update(seats_taken=F('seats_taken') + len(waiting))
+    for registration in waiting:
+        registration.status = 'pending'
+    logger.info("Event %s: promoted %d registration(s) from the waiting list", event_id, len(waiting))
+    return waiting
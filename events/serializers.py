@@ -6,6 +6,7 @@ from accounts.serializers import UserSerializer
 class EventSerializer(serializers.ModelSerializer):
     organizer = UserSerializer(read_only=True)
     coordinator = UserSerializer(read_only=True)
+    seats_available = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Event
@@ -19,7 +20,8 @@ class EventRegistrationSerializer(serializers.ModelSerializer):
     class Meta:
         model = EventRegistration
         fields = '__all__'
-        read_only_fields = ['registration_date', 'confirmation_date', 'check_in_time',
+        # Seat-holding status changes go through events.registration (register, cancel, check_in)
+        read_only_fields = ['status', 'attended', 'registration_date', 'confirmation_date', 'check_in_time',
                            'check_out_time', 'payment_date']
 
 
@@ -51,6 +53,15 @@ class CheckInSerializer(serializers.Serializer):
     pass  # No data needed for now
 
 
+class CheckInScanSerializer(serializers.Serializer):
+    """One ticket scan from an offline check-in device"""
+    registration = serializers.IntegerField(min_value=1)
+    kind = serializers.ChoiceField(choices=['in', 'out'], default='in')
+    scanned_at = serializers.DateTimeField()
+    token = serializers.CharField(required=False, max_length=64)
+    device_id = serializers.CharField(required=False, allow_blank=True, max_length=64)
+
+
 class EventFeedbackSerializer(serializers.Serializer):
     rating = serializers.IntegerField(min_value=1, max_value=5)
     feedback = serializers.CharField(required=False, allow_blank=True)
\ No newline at end of file
@@ -1,3 +1,59 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TransactionTestCase, skipUnlessDBFeature
+from django.utils import timezone
+
+from . import registration
+from .models import Event, EventRegistration
+
+
+User = get_user_model()
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentRegistrationTests(TransactionTestCase):
+    """register() from many connections at once, as sign-ups arrive in production"""
+
+    SEATS = 5
+    PARTICIPANTS = 300
+    WORKERS = 20
+
+    def setUp(self):
+        start = timezone.now() + timedelta(days=7)
+        self.event = Event.objects.create(
+            title="Nursery workshop", event_type='workshop', description="Seedling care",
+            start_datetime=start, end_datetime=start + timedelta(hours=3), location="Kisumu",
+            max_participants=self.SEATS,
+        )
+        User.objects.bulk_create([User(username=f'participant{i}') for i in range(self.PARTICIPANTS)])
+        self.participants = list(User.objects.filter(username__startswith='participant'))
+
+    def _register(self, participant):
+        try:
+            return registration.register(self.event, participant).status
+        finally:
+            connection.close()
+
+    def test_concurrent_sign_ups_never_oversell(self):
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            statuses = list(pool.map(self._register, self.participants))
+
+        self.event.refresh_from_db()
+        registrations = EventRegistration.objects.filter(event=self.event)
+        self.assertEqual(self.event.seats_taken, self.SEATS)
+        self.assertEqual(self.event.total_registrations, self.PARTICIPANTS)
+        self.assertEqual(statuses.count('pending'), self.SEATS)
+        self.assertEqual(registrations.filter(status='pending').count(), self.SEATS)
+        self.assertEqual(registrations.filter(status=registration.WAITING).count(), self.PARTICIPANTS - self.SEATS)
+
+        first_waiting = registrations.filter(status=registration.WAITING).order_by('registration_date', 'pk').first()
+        promoted = registration.cancel(registrations.filter(status='pending').first())
+
+        self.assertEqual(promoted.pk, first_waiting.pk)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, self.SEATS)
+        self.assertEqual(registrations.filter(status='pending').count(), self.SEATS)
+        self.assertEqual(registrations.filter(status=registration.WAITING).count(), self.PARTICIPANTS - self.SEATS - 1)
@@ -1,13 +1,23 @@
+import hashlib
+import json
+
 from django.db.models import Q, Count, Avg
 from django.utils import timezone
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from rest_framework import viewsets, permissions, status, filters
 import django_filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from core.cache import cache_policy
+from core import counters
+from core.geo import GeoFilter
 from .models import Event, EventRegistration, EventPhoto, EventResource
+from . import checkin, registration as registrations
 from django.core.paginator import Paginator
 from .serializers import (
     EventSerializer, EventRegistrationSerializer,
@@ -32,13 +42,13 @@ class EventFilter(django_filters.FilterSet):
 class EventViewSet(viewsets.ModelViewSet):
     queryset = Event.objects.all()
     serializer_class = EventSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter, GeoFilter]
     filterset_class = EventFilter
     search_fields = ['title', 'description', 'location', 'agenda']
     ordering_fields = ['start_datetime', 'created_at', 'total_registrations']
     
     def get_permissions(self):
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'roster', 'check_in_sync']:
             permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
         else:
             permission_classes = [permissions.IsAuthenticated]
@@ -62,6 +72,7 @@ class EventViewSet(viewsets.ModelViewSet):
         return queryset
     
     @action(detail=False, methods=['get'])
+    @cache_policy('events.upcoming')
     def upcoming(self, request):
         upcoming_events = Event.objects.filter(
             start_datetime__gte=timezone.now(),
@@ -94,40 +105,63 @@ class EventViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['post'])
     def register(self, request, pk=None):
+        """Register the current user; once the event is full they join the waiting list"""
         event = self.get_object()
-        
-        # Check if registration is open
-        if event.requires_registration and event.registration_deadline:
-            if timezone.now() > event.registration_deadline:
-                return Response({'error': 'Registration deadline has passed.'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Check if already registered
-        existing_registration = EventRegistration.objects.filter(
-            event=event,
-            participant=request.user
-        ).first()
-        
-        if existing_registration:
-            return Response({'error': 'Already registered for this event.'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Check capacity
-        if event.registrations.filter(status__in=['confirmed', 'pending']).count() >= event.max_participants:
-            return Response({'error': 'Event is full.'}, status=status.HTTP_400_BAD_REQUEST)
-        
         serializer = EventRegistrationCreateSerializer(data=request.data)
-        if serializer.is_valid():
-            registration = serializer.save(event=event, participant=request.user)
-            
-            # Update event registration count
-            event.total_registrations = event.registrations.count()
-            event.save()
-            
-            return Response(
-                EventRegistrationSerializer(registration).data,
-                status=status.HTTP_201_CREATED
-            )
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            registration = registrations.register(event, request.user, **serializer.validated_data)
+        except registrations.RegistrationError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            EventRegistrationSerializer(registration).data,
+            status=status.HTTP_201_CREATED
+        )
+    
+    @action(detail=True, methods=['get'])
+    def roster(self, request, pk=None):
+        """
+        Compact roster for offline check-in devices: one row per active
+        registration in the order given by `fields`. Devices validate a scanned
+        ticket by comparing the SHA-256 of its token with `token_hash`.
+        """
+        event = self.get_object()
+        payload = {
+            'event': event.pk,
+            'hash': f'sha256:{checkin.HASH_LENGTH}',
+            'fields': checkin.ROSTER_FIELDS,
+            'rows': checkin.roster(event),
+        }
+        etag = quote_etag(hashlib.md5(json.dumps(payload, separators=(',', ':')).encode()).hexdigest())
+        response = get_conditional_response(request, etag=etag) or Response(payload)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    
+    @action(detail=True, methods=['post'], url_path='check-in-sync')
+    def check_in_sync(self, request, pk=None):
+        """
+        Apply a batch of scans from a check-in device: a list of
+        {registration, kind ("in"/"out"), scanned_at, token, device_id}.
+        Scans are reported individually; re-sending a batch is safe.
+        """
+        event = self.get_object()
+        scans = request.data
+        if not isinstance(scans, list):
+            return Response({'error': 'Expected a list of scans.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            summary = checkin.sync_scans(event, scans, request.user)
+        except checkin.TooManyScans as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        return Response(summary, status=status.HTTP_200_OK)
+    
+    def perform_update(self, serializer):
+        event = serializer.save()
+        # Raised capacity goes to the waiting list
+        registrations.fill_seats(event)
 
 
 class EventRegistrationViewSet(viewsets.ModelViewSet):
@@ -153,6 +187,42 @@ class EventRegistrationViewSet(viewsets.ModelViewSet):
             permission_classes = [permissions.IsAuthenticated]
         return [permission() for permission in permission_classes]
     
+    def perform_create(self, serializer):
+        details = dict(serializer.validated_data)
+        event = details.pop('event')
+        try:
+            serializer.instance = registrations.register(event, self.request.user, **details)
+        except registrations.RegistrationError as exc:
+            raise ValidationError({'error': str(exc)})
+    
+    def perform_destroy(self, instance):
+        registrations.withdraw(instance)
+    
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Cancel a registration; a freed seat goes to the longest-waiting registration"""
+        registration = self.get_object()
+        if registration.status == registrations.CANCELLED:
+            return Response({'error': 'Already cancelled.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        promoted = registrations.cancel(registration)
+        return Response({
+            'message': 'Registration cancelled.',
+            'promoted': promoted.pk if promoted else None,
+        }, status=status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['get'])
+    def ticket(self, request, pk=None):
+        """The registration's ticket token, to be shown as a QR code with its id"""
+        registration = self.get_object()
+        if registration.status == registrations.CANCELLED:
+            return Response({'error': 'Registration was cancelled.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'registration': registration.pk,
+            'event': registration.event_id,
+            'token': checkin.ticket_token(registration),
+        })
+    
     @action(detail=True, methods=['post'])
     def check_in(self, request, pk=None):
         registration = self.get_object()
@@ -162,15 +232,7 @@ class EventRegistrationViewSet(viewsets.ModelViewSet):
         
         serializer = CheckInSerializer(data=request.data)
         if serializer.is_valid():
-            registration.check_in_time = timezone.now()
-            registration.attended = True
-            registration.status = 'attended'
-            registration.save()
-            
-            # Update event attendance count
-            event = registration.event
-            event.total_attendance = event.registrations.filter(attended=True).count()
-            event.save()
+            registrations.check_in(registration)
             
             return Response({'message': 'Checked in successfully.'}, status=status.HTTP_200_OK)
         
@@ -242,8 +304,7 @@ class EventResourceViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def download(self, request, pk=None):
         resource = self.get_object()
-        resource.download_count += 1
-        resource.save()
+        counters.increment(resource, 'download_count')
         
         # Return the file URL for download
         return Response({
@@ -0,0 +1,20 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0001_initial'),
+        ('programs', '0004_treeplanting_treeplanting_keyset_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['-date_received', '-id'], name='income_keyset_idx'),
+        ),
+    ]
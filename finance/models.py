@@ -54,6 +54,10 @@ class Income(models.Model):
     
     class Meta:
         ordering = ['-date_received']
+        indexes = [
+            # Keyset pagination: ordering + pk tiebreaker (core/pagination.py)
+            models.Index(fields=['-date_received', '-id'], name='income_keyset_idx'),
+        ]
     
     def __str__(self):
         return f"{self.description} - KES {self.amount}"
@@ -2,6 +2,7 @@
 Django settings for kacaf project.
 """
 import os
+import sys
 from datetime import timedelta
 from pathlib import Path
 from decouple import config, Csv
@@ -29,6 +30,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.humanize',  # <-- add this
+    'django.contrib.postgres',
     
     # Third party apps
     'rest_framework',
@@ -37,14 +39,16 @@ INSTALLED_APPS = [
     'drf_yasg',
     'django_filters',
     'phonenumber_field',
+    'anymail',
     
     # Health check
     'health_check',
     'health_check.db',
-    'health_check.cache',
+    #'health_check.cache',  # replaced by core's cache check (adds hit-rate stats)
     #'health_check.storage',
     
     # Local apps
+    'core.apps.CoreConfig',
     'accounts.apps.AccountsConfig',
     'governance.apps.GovernanceConfig',
     'programs.apps.ProgramsConfig',
@@ -56,6 +60,7 @@ INSTALLED_APPS = [
     'testimonials.apps.TestimonialsConfig',
     'partners.apps.PartnersConfig',
     'resources.apps.ResourcesConfig',  # Add this line
+    'search.apps.SearchConfig',
 ]
 
 INSTALLED_APPS += ['django_extensions']
@@ -64,6 +69,7 @@ INSTALLED_APPS += ['django_extensions']
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # For static files in production
+    'core.metrics.QueryMetricsMiddleware',  # Per-endpoint query counts and budgets
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -170,7 +176,7 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.StandardPagination',  # ?cursor opts into keyset paging
     'PAGE_SIZE': 20,
     'DEFAULT_THROTTLE_CLASSES': [
         'rest_framework.throttling.AnonRateThrottle',
@@ -324,6 +330,11 @@ LOGGING = {
         },
     },
     'loggers': {
+        'kacaf.metrics': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
         'django': {
             'handlers': ['console', 'file'],
             'level': 'INFO',
@@ -338,11 +349,155 @@ LOGGING = {
 }
 
 # Cache settings
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+# Shared Redis cache when REDIS_URL is set (all workers/instances), local in-process cache otherwise (dev/tests)
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'kacaf',
+            'TIMEOUT': 300,
+        }
     }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+        }
+    }
+
+# Per-view response cache policies (see core/cache.py)
+VIEW_CACHE_ALIAS = 'default'
+VIEW_CACHE_POLICIES = {
+    'events.upcoming': {
+        'TTL': 300,
+        'FAMILIES': ['events'],
+    },
+    'programs.stats': {
+        'TTL': 600,
+        'FAMILIES': ['programs'],
+    },
+    'communications.announcements.latest': {
+        'TTL': 120,
+        'VARY_ON_USER': True,  # specific_users targeting makes the feed per-user
+        'FAMILIES': ['announcements'],
+    },
+    'documents.category_documents': {
+        'TTL': 300,
+        'VARY_ON_ROLE': True,  # access-level filtering depends on the role
+        'FAMILIES': ['documents'],
+    },
+}
+
+# Buffered view/download counters (see core/counters.py)
+COUNTER_BUFFER = {
+    'INTERVAL': 60,     # seconds per buffer bucket
+    'KEY_TTL': 86400,   # unflushed increments older than this are dropped
+    # Buffering needs a cache shared by every process; without REDIS_URL hits are written directly
+    'SHARED': None,     # None: decide from the cache backend
+    'FLUSH_LOCK_TIMEOUT': 600,  # seconds; well above the slowest flush, after which another worker may flush
+}
+
+# Streaming downloads (core/downloads.py). OFFLOAD hands the bytes to a fronting proxy:
+# '' streams from Django, 'x-accel-redirect' for nginx (internal location at ACCEL_PREFIX
+# aliased to MEDIA_ROOT), 'x-sendfile' for Apache mod_xsendfile.
+FILE_DOWNLOADS = {
+    'OFFLOAD': config('DOWNLOAD_OFFLOAD', default=''),
+    'ACCEL_PREFIX': '/protected-media/',
+    'CHUNK_SIZE': 64 * 1024,
+}
+
+# Full-text search (search app): Postgres text search configuration
+SEARCH_CONFIG = config('SEARCH_CONFIG', default='english')
+
+# Request metrics (core/metrics.py), scraped from /metrics/
+# `manage.py test` or pytest (pytest-django imports pytest before settings); TESTING=1/0 overrides
+TESTING = config(
+    'TESTING',
+    default=(len(sys.argv) > 1 and sys.argv[1] == 'test') or 'pytest' in sys.modules,
+    cast=bool,
+)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+QUERY_METRICS = {
+    'ENABLED': config('QUERY_METRICS_ENABLED', default=True, cast=bool),
+    'PUBLISH_INTERVAL': 15,     # seconds between per-process snapshots
+    'RAISE_ON_BUDGET': TESTING, # tests fail on a budget overrun; production logs a warning
+}
+
+# Max SQL queries per resolved URL name. Start loose and tighten as views are fixed.
+QUERY_BUDGETS = {
+    'communications:message_list': 40,
+    'communications:communications_dashboard': 40,
+    'accounts:admin_dashboard': 40,
+    'programs:my_trees': 30,
+    'public_home': 10,
+}
+
+# Document access log buffer and retention (documents/access_log.py)
+DOCUMENT_ACCESS_LOG = {
+    'BUFFER_SIZE': config('ACCESS_LOG_BUFFER_SIZE', default=100, cast=int),     # entries per bulk write
+    'FLUSH_INTERVAL': config('ACCESS_LOG_FLUSH_INTERVAL', default=5, cast=int), # max seconds an entry waits
+    'RETENTION_DAYS': config('ACCESS_LOG_RETENTION_DAYS', default=365, cast=int),
+}
+
+# Bulk tree-planting uploads from offline collection (programs/ingest.py)
+TREE_PLANTING_INGEST = {
+    'MAX_ROWS': config('TREE_INGEST_MAX_ROWS', default=5000, cast=int),   # rows per request
+    'CHUNK_SIZE': config('TREE_INGEST_CHUNK_SIZE', default=500, cast=int), # rows per INSERT
+}
+
+# Newsletter open/click tracking (communications/tracking.py, folded by `manage.py fold_tracking_events`)
+NEWSLETTER_TRACKING = {
+    'BASE_URL': config('SITE_URL', default='http://localhost:8000'),  # absolute links in sent mail
+    'FOLD_BATCH': 50000,  # events folded into the counters per transaction
+}
+
+# anymail tracking webhooks (/anymail/<esp>/tracking/) authenticate with basic auth "user:password"
+ANYMAIL = {
+    'WEBHOOK_SECRET': config('ANYMAIL_WEBHOOK_SECRET', default=''),
+}
+
+# Background jobs (core/jobs.py, run by `manage.py run_workers`)
+JOBS = {
+    'WORKERS': config('JOB_WORKERS', default=2, cast=int),  # worker processes
+    'POLL_INTERVAL': 1.0,  # seconds between polls of an empty queue
+    'BACKOFF': 30,  # seconds before the first retry, doubling per attempt
+    'MAX_BACKOFF': 3600,
+    'KEEP_FINISHED': 7,  # days finished jobs are kept
+}
+
+# Newsletter delivery (communications/delivery.py, run as a background job or by `manage.py send_newsletters`)
+NEWSLETTER_DELIVERY = {
+    'BATCH_SIZE': config('NEWSLETTER_BATCH_SIZE', default=200, cast=int),  # recipients read and sent per batch
+    'CONCURRENCY': config('NEWSLETTER_CONCURRENCY', default=2, cast=int),  # batches in flight, one connection each
+    'STALE_AFTER': 600,  # seconds without progress before another run resumes a send
+}
+
+# Carbon engine (programs/carbon.py): calibrated growth curves override the built-in
+# defaults, {species or tree_type: (Cmax tCO2e per tree, k, p)}. Bump the version with them.
+CARBON_MODEL_VERSION = '2026.1'
+CARBON_CURVES = {}
+
+# Model -> cache key families it invalidates (see core/invalidation.py)
+CACHE_DEPENDENCIES = {
+    'events.Event': {
+        'families': ['events'],
+    },
+    'programs.Program': {
+        'families': ['programs'],
+    },
+    'communications.Announcement': {
+        'families': ['announcements'],
+        'm2m': ['specific_users', 'attachments'],
+        'references': ['event', 'program', 'project'],
+    },
+    'documents.Document': {
+        'families': ['documents'],
+        'references': ['category', 'program', 'project', 'event'],
+    },
 }
 
 # Session settings
@@ -87,6 +87,8 @@ urlpatterns = [
     path("api/events/", include("events.urls")),
     path("api/documents/", include("documents.urls")),
     path("api/communications/", include("communications.urls")),
+    path("anymail/", include("anymail.urls")),  # ESP tracking webhooks
+    path("api/search/", include("search.urls")),
     path("about/", TemplateView.as_view(template_name="base/about.html"), name="about"),
 
     # Add this with the other app URLs
@@ -106,6 +108,7 @@ urlpatterns = [
 
     # Health check
     path("health/", include("health_check.urls")),
+    path("", include("core.urls")),  # /metrics/
 ]
 
 
@@ -1,12 +1,12 @@
 from django.contrib import admin
-from .models import Program, Project, TreePlanting, Training
+from .models import Program, Project, TreePlanting, Training, ImpactSnapshot, PlantingGridCell, SurvivalObservation, SurvivalRollup
 
 
 class ProjectInline(admin.TabularInline):
     model = Project
     extra = 0
     fields = ('title', 'status', 'trees_target', 'trees_planted', 'start_date')
-    readonly_fields = ('created_at',)
+    readonly_fields = ('trees_planted', 'created_at')
 
 
 @admin.register(Program)
@@ -67,7 +67,13 @@ class ProjectAdmin(admin.ModelAdmin):
             'fields': ('program', 'title', 'description')
         }),
         ('Targets', {
-            'fields': ('trees_target', 'trees_planted', 'area_coverage', 'carbon_sequestration')
+            'fields': ('trees_target', 'area_coverage')
+        }),
+        ('Planting Rollups', {
+            'fields': ('trees_planted', 'unique_farmers', 'species_count', 'surviving_trees', 'plantings', 'survival_total')
+        }),
+        ('Carbon', {
+            'fields': ('carbon_sequestration', 'carbon_computed_at', 'carbon_stale')
         }),
         ('Location', {
             'fields': ('gps_coordinates', 'land_owner', 'land_size')
@@ -86,7 +92,19 @@ class ProjectAdmin(admin.ModelAdmin):
         }),
     )
     
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('trees_planted', 'unique_farmers', 'species_count', 'surviving_trees', 'plantings', 'survival_total',
+                       'carbon_sequestration', 'carbon_computed_at', 'carbon_stale', 'created_at', 'updated_at')
+
+
+class SurvivalObservationInline(admin.TabularInline):
+    model = SurvivalObservation
+    extra = 0
+    fields = ('observed_on', 'survival_rate', 'recorded_by')
+    readonly_fields = ('observed_on', 'survival_rate', 'recorded_by')
+    can_delete = False
+    
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(TreePlanting)
@@ -96,6 +114,7 @@ class TreePlantingAdmin(admin.ModelAdmin):
     search_fields = ('species', 'farmer__first_name', 'farmer__last_name', 'planting_site')
     raw_id_fields = ('project', 'farmer')
     date_hierarchy = 'planting_date'
+    inlines = [SurvivalObservationInline]
     
     fieldsets = (
         ('Planting Details', {
@@ -145,4 +164,38 @@ class TrainingAdmin(admin.ModelAdmin):
         }),
     )
     
-    readonly_fields = ('created_at', 'updated_at')
\ No newline at end of file
+    readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(ImpactSnapshot)
+class ImpactSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('key', 'total_trees_planted', 'total_members', 'total_beneficiaries', 'rebuilt_at', 'updated_at')
+    readonly_fields = ('key', 'total_trees_planted', 'total_members', 'total_area_coverage',
+                       'carbon_sequestered', 'total_beneficiaries', 'rebuilt_at', 'updated_at')
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(PlantingGridCell)
+class PlantingGridCellAdmin(admin.ModelAdmin):
+    list_display = ('cell', 'precision', 'plantings', 'trees', 'updated_at')
+    list_filter = ('precision',)
+    search_fields = ('cell',)
+    readonly_fields = ('cell', 'precision', 'center_lat', 'center_lng', 'plantings', 'trees',
+                       'survival_total', 'lat_total', 'lng_total', 'updated_at')
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(SurvivalRollup)
+class SurvivalRollupAdmin(admin.ModelAdmin):
+    list_display = ('project', 'period', 'period_start', 'observations', 'trees', 'updated_at')
+    list_filter = ('period',)
+    raw_id_fields = ('project',)
+    readonly_fields = ('project', 'period', 'period_start', 'observations', 'survival_total', 'trees',
+                       'surviving_total', 'updated_at')
+    
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,214 @@
+"""
+Carbon sequestration engine.
+
+Each planting's CO2 to date is
+
+    quantity x survival_rate/100 x Cmax x (1 - exp(-k x age))^p
+
+a Chapman-Richards growth curve per species (falling back to the planting's
+tree_type), with age in years since planting_date. Curves give tonnes of
+CO2e per surviving tree: Cmax is the mature-tree asymptote, k the growth
+rate and p the shape. The defaults below are conservative placeholders for
+West Pokot agroforestry; calibrated values go in settings.CARBON_CURVES
+(species or tree_type -> (Cmax, k, p)) and bumping CARBON_MODEL_VERSION
+keeps reports traceable to the parameters that produced them.
+
+Whole projects are evaluated at once: plantings are loaded as columns and
+the curve is applied with NumPy, so the portfolio recomputes in one query
+and a few array operations. Results are stored on Project
+(carbon_sequestration, carbon_computed_at); a project is recomputed only when
+its plantings changed (carbon_stale, set by the rollup signals) or its
+figure is from an earlier day, since trees keep growing. refresh() runs from
+`manage.py compute_carbon` (cron), never from a read: API responses serve the
+stored figures and carbon_stale. Program totals are cached in the shared
+cache and dropped whenever one of their projects is recomputed, moves to
+another program, has its figure edited or is deleted (programs.signals).
+"""
+import datetime
+import logging
+import time
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from core.cache import get_cache
+
+from .models import ImpactSnapshot, Project, TreePlanting
+
+
+logger = logging.getLogger(__name__)
+
+MODEL_VERSION = getattr(settings, 'CARBON_MODEL_VERSION', '2026.1')
+
+# tree_type -> (Cmax tCO2e per tree, k per year, p)
+TYPE_CURVES = {
+    'indigenous': (1.5, 0.06, 2.0),
+    'fruit': (0.8, 0.10, 2.0),
+    'timber': (2.0, 0.09, 2.0),
+    'fodder': (0.4, 0.20, 1.8),
+    'medicinal': (0.8, 0.07, 2.0),
+    'ornamental': (0.5, 0.08, 2.0),
+}
+DEFAULT_CURVE = (0.8, 0.07, 2.0)
+
+# Lower-cased species name -> curve; overrides the tree_type curve
+SPECIES_CURVES = {
+    'grevillea robusta': (1.8, 0.09, 2.0),
+    'grevillea': (1.8, 0.09, 2.0),
+    'eucalyptus': (2.2, 0.12, 2.0),
+    'croton megalocarpus': (1.6, 0.06, 2.0),
+    'croton': (1.6, 0.06, 2.0),
+    'acacia': (1.0, 0.08, 2.0),
+    'azadirachta indica': (1.2, 0.08, 2.0),
+    'neem': (1.2, 0.08, 2.0),
+    'mangifera indica': (1.0, 0.08, 2.0),
+    'mango': (1.0, 0.08, 2.0),
+    'persea americana': (0.9, 0.08, 2.0),
+    'avocado': (0.9, 0.08, 2.0),
+    'calliandra': (0.3, 0.25, 1.8),
+    'leucaena': (0.5, 0.20, 1.8),
+}
+
+PROGRAM_CACHE_KEY = 'carbon:program:{program_id}:{version}'
+PROGRAM_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def curve_for(species, tree_type):
+    custom = getattr(settings, 'CARBON_CURVES', {})
+    key = (species or '').strip().lower()
+    for table in (custom, SPECIES_CURVES):
+        if key in table:
+            return table[key]
+    return custom.get(tree_type) or TYPE_CURVES.get(tree_type, DEFAULT_CURVE)
+
+
+def sequestration(species, tree_types, planting_dates, quantities, survival_rates, as_of):
+    """
+    Vectorized CO2e to date (tonnes) per planting. Arguments are equal-length
+    sequences; curves are looked up once per distinct (species, tree_type).
+    """
+    if not len(quantities):
+        return np.zeros(0)
+    pairs = np.array([f'{s}\x1f{t}' for s, t in zip(species, tree_types)])
+    distinct, inverse = np.unique(pairs, return_inverse=True)
+    params = np.array([curve_for(*pair.split('\x1f')) for pair in distinct], dtype=float)
+    cmax, k, p = params[inverse].T
+
+    days = (np.datetime64(as_of, 'D') - np.array(planting_dates, dtype='datetime64[D]')).astype(float)
+    age = np.clip(days / 365.25, 0, None)
+    surviving = np.asarray(quantities, dtype=float) * np.clip(np.asarray(survival_rates, dtype=float), 0, 100) / 100
+    return surviving * cmax * (1 - np.exp(-k * age)) ** p
+
+
+def project_totals(project_ids, as_of):
+    """{project_id: tonnes CO2e} for the given projects, from one query and one pass of array maths"""
+    rows = list(TreePlanting.objects.filter(project_id__in=project_ids).order_by().values_list(
+        'project_id', 'species', 'tree_type', 'planting_date', 'quantity', 'survival_rate',
+    ))
+    totals = dict.fromkeys(project_ids, 0.0)
+    if not rows:
+        return totals
+    projects, species, tree_types, dates, quantities, survival_rates = zip(*rows)
+    co2 = sequestration(species, tree_types, dates, quantities, survival_rates, as_of)
+    ids, index = np.unique(np.array(projects), return_inverse=True)
+    for project_id, total in zip(ids.tolist(), np.bincount(index, weights=co2).tolist()):
+        totals[project_id] = total
+    return totals
+
+
+def species_breakdown(plantings, as_of=None):
+    """[{species, trees, co2_tonnes}] for a planting queryset, largest first (donor reports)"""
+    as_of = as_of or timezone.localdate()
+    rows = list(plantings.order_by().values_list('species', 'tree_type', 'planting_date', 'quantity', 'survival_rate'))
+    if not rows:
+        return []
+    species, tree_types, dates, quantities, survival_rates = zip(*rows)
+    co2 = sequestration(species, tree_types, dates, quantities, survival_rates, as_of)
+    names, index = np.unique(np.array(species), return_inverse=True)
+    co2_totals = np.bincount(index, weights=co2)
+    trees = np.bincount(index, weights=np.array(quantities, dtype=float))
+    breakdown = [
+        {'species': name, 'trees': int(count), 'co2_tonnes': round(float(total), 3)}
+        for name, count, total in zip(names.tolist(), trees, co2_totals)
+    ]
+    return sorted(breakdown, key=lambda row: -row['co2_tonnes'])
+
+
+def refresh(projects=None, force=False):
+    """
+    Recompute carbon for projects whose plantings changed or whose figure is
+    from an earlier day (all of them with force=True). `projects` limits the
+    candidates to a queryset. Returns the number of projects recomputed.
+    """
+    today = timezone.localdate()
+    start_of_day = timezone.make_aware(datetime.datetime.combine(today, datetime.time.min))
+    candidates = projects if projects is not None else Project.objects.all()
+    if not force:
+        candidates = candidates.filter(
+            Q(carbon_stale=True) | Q(carbon_computed_at__isnull=True) | Q(carbon_computed_at__lt=start_of_day)
+        )
+    with transaction.atomic():
+        # Overlapping runs (cron and `compute_carbon --all`) take disjoint projects, so no
+        # two of them add a delta computed from the same old carbon_sequestration
+        stale = list(
+            candidates.select_for_update(skip_locked=True, of=('self',))
+            .order_by().only('pk', 'program_id', 'carbon_sequestration')
+        )
+        if not stale:
+            return 0
+
+        # Clear the flag before reading the plantings: a planting saved meanwhile waits on the lock, then sets it again
+        Project.objects.filter(pk__in=[project.pk for project in stale]).update(carbon_stale=False)
+        started = time.perf_counter()
+        totals = project_totals([project.pk for project in stale], today)
+        now = timezone.now()
+        delta = Decimal('0')
+        for project in stale:
+            value = Decimal(str(round(totals[project.pk], 2)))
+            delta += value - (project.carbon_sequestration or 0)
+            project.carbon_sequestration = value
+            project.carbon_computed_at = now
+
+        Project.objects.bulk_update(stale, ['carbon_sequestration', 'carbon_computed_at'], batch_size=500)
+        # bulk_update skips the post_save signal that feeds the homepage counter
+        ImpactSnapshot.apply_deltas(carbon_sequestered=delta)
+    forget_program_totals({project.program_id for project in stale})
+
+    logger.info("Carbon recomputed for %d project(s) in %.2fs", len(stale), time.perf_counter() - started)
+    return len(stale)
+
+
+def program_cache_key(program_id):
+    return PROGRAM_CACHE_KEY.format(program_id=program_id, version=MODEL_VERSION)
+
+
+def forget_program_totals(program_ids):
+    """Drop the cached totals of `program_ids`; the next program_total() recomputes them"""
+    program_ids = [program_id for program_id in program_ids if program_id is not None]
+    if not program_ids:
+        return
+    try:
+        get_cache().delete_many([program_cache_key(program_id) for program_id in program_ids])
+    except Exception:
+        logger.warning("Could not drop cached program carbon totals", exc_info=True)
+
+
+def program_total(program):
+    """Tonnes CO2e across a program's projects as last computed, cached per program"""
+    cache = get_cache()
+    key = program_cache_key(program.pk)
+    try:
+        total = cache.get(key)
+    except Exception:
+        total = None
+    if total is None:
+        total = program.projects.aggregate(total=Sum('carbon_sequestration'))['total'] or Decimal('0')
+        try:
+            cache.set(key, total, timeout=PROGRAM_CACHE_TIMEOUT)
+        except Exception:
+            logger.warning("Could not cache program carbon total", exc_info=True)
+    return total
@@ -69,9 +69,7 @@ class ProjectForm(forms.ModelForm):
             'title',
             'description',
             'trees_target',
-            'trees_planted',
             'area_coverage',
-            'carbon_sequestration',
             'gps_coordinates',
             'land_owner',
             'land_size',
@@ -86,9 +84,7 @@ class ProjectForm(forms.ModelForm):
             'title': forms.TextInput(attrs={'class': 'form-control'}),
             'description': forms.Textarea(attrs={'rows': 4, 'class': 'form-control'}),
             'trees_target': forms.NumberInput(attrs={'class': 'form-control'}),
-            'trees_planted': forms.NumberInput(attrs={'class': 'form-control'}),
             'area_coverage': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
-            'carbon_sequestration': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
             'gps_coordinates': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Latitude,Longitude'}),
             'land_owner': forms.TextInput(attrs={'class': 'form-control'}),
             'land_size': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
@@ -150,6 +146,27 @@ class TreePlantingForm(forms.ModelForm):
         self.fields['gps_coordinates'].required = False
 
 
+class SurvivalUpdateForm(forms.Form):
+    """One planting's row on the monitoring-visit form; only ticked or edited rows are recorded"""
+    id = forms.IntegerField(widget=forms.HiddenInput)
+    checked = forms.BooleanField(
+        required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+        help_text="Checked on this visit",
+    )
+    survival_rate = forms.IntegerField(
+        min_value=0, max_value=100,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '1', 'min': '0', 'max': '100'}),
+    )
+    monitoring_notes = forms.CharField(
+        required=False,
+        widget=forms.TextInput(attrs={'class': 'form-control'}),
+    )
+
+
+SurvivalUpdateFormSet = forms.formset_factory(SurvivalUpdateForm, extra=0)
+
+
 class TrainingForm(forms.ModelForm):
     """Form for creating and editing trainings"""
     
@@ -0,0 +1,204 @@
+"""
+Bulk ingestion of TreePlanting records collected offline.
+
+ingest_plantings() takes a list of row dicts (a JSON array or NDJSON upload)
+and stores the valid ones in a fixed number of queries:
+
+    1. every row is validated without touching the database
+       (TreePlantingIngestSerializer)
+    2. project ids, farmer ids and client UUIDs are resolved for the whole
+       batch with one query each
+    3. new rows are inserted with bulk_create in CHUNK_SIZE chunks inside a
+       single transaction; the impact snapshot, the map grid
+       (PlantingGridCell) and the project rollups get one batched delta each
+
+Bad rows are reported per row and never fail the batch. A row whose
+client_uuid is already stored is reported as a duplicate with the existing
+id, so a client retrying after a dropped connection gets the same answer
+without creating anything twice.
+"""
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+
+from .models import ImpactSnapshot, PlantingGridCell, Project, TreePlanting
+from .serializers import TreePlantingIngestSerializer
+
+
+User = get_user_model()
+
+CREATED = 'created'
+DUPLICATE = 'duplicate'
+ERROR = 'error'
+
+
+class TooManyRows(Exception):
+    pass
+
+
+def _config():
+    return {
+        'MAX_ROWS': 5000,
+        'CHUNK_SIZE': 500,
+        **getattr(settings, 'TREE_PLANTING_INGEST', {}),
+    }
+
+
+def ingest_plantings(rows, user):
+    """
+    Validate and store `rows`. Staff may set `farmer` per row; everyone else
+    records plantings as themselves. Returns a summary with one result per row,
+    in input order.
+    """
+    config = _config()
+    if len(rows) > config['MAX_ROWS']:
+        raise TooManyRows(f"At most {config['MAX_ROWS']} rows per upload.")
+
+    results = [None] * len(rows)
+    valid = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            results[index] = _error(index, {'non_field_errors': ["Expected an object."]})
+            continue
+        serializer = TreePlantingIngestSerializer(data=row)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            results[index] = _error(index, serializer.errors, row.get('client_uuid'))
+
+    valid = _check_references(valid, results, user)
+
+    # Repeated UUIDs: within this upload, and against rows already stored
+    seen = {}
+    pending = []
+    for index, data in valid:
+        client_uuid = data.setdefault('client_uuid', uuid.uuid4())
+        if client_uuid in seen:
+            results[index] = _result(index, DUPLICATE, client_uuid, duplicate_of=seen[client_uuid])
+        else:
+            seen[client_uuid] = index
+            pending.append((index, data))
+    stored = _stored_ids([data['client_uuid'] for _, data in pending])
+
+    plantings = []
+    for index, data in pending:
+        client_uuid = data['client_uuid']
+        if client_uuid in stored:
+            results[index] = _result(index, DUPLICATE, client_uuid, id=stored[client_uuid])
+        else:
+            farmer_id = data.pop('farmer', None) or user.pk
+            project_id = data.pop('project')
+            planting = TreePlanting(farmer_id=farmer_id, project_id=project_id, **data)
+            planting.sync_location()
+            plantings.append((index, planting))
+
+    with transaction.atomic():
+        chunk_size = config['CHUNK_SIZE']
+        created_trees = 0
+        grid_cells = []
+        project_totals = defaultdict(lambda: [0, 0, 0, 0])
+        for start in range(0, len(plantings), chunk_size):
+            for index, planting in _insert_chunk(plantings[start:start + chunk_size], results):
+                results[index] = _result(index, CREATED, planting.client_uuid, id=planting.pk)
+                created_trees += planting.quantity
+                grid_cells.append(PlantingGridCell.contribution(
+                    planting.geohash, planting.quantity, planting.survival_rate, planting.latitude, planting.longitude,
+                ))
+                totals = project_totals[planting.project_id]
+                totals[0] += planting.quantity
+                totals[1] += planting.quantity * planting.survival_rate
+                totals[2] += 1
+                totals[3] += planting.survival_rate
+        # bulk_create skips the post_save signals that keep the homepage counters,
+        # map grid and project rollups current
+        ImpactSnapshot.apply_deltas(total_trees_planted=created_trees)
+        PlantingGridCell.apply_deltas(grid_cells)
+        Project.apply_rollup_deltas({project_id: tuple(totals) for project_id, totals in project_totals.items()})
+
+    counts = {CREATED: 0, DUPLICATE: 0, ERROR: 0}
+    for result in results:
+        counts[result['status']] += 1
+    return {
+        'received': len(rows),
+        'created': counts[CREATED],
+        'duplicates': counts[DUPLICATE],
+        'errors': counts[ERROR],
+        'results': results,
+    }
+
+
+def _check_references(valid, results, user):
+    """Drop rows pointing at missing projects or farmers, with one query per model"""
+    project_ids = {data['project'] for _, data in valid}
+    projects = set(Project.objects.filter(pk__in=project_ids).values_list('pk', flat=True))
+
+    farmer_ids = {data['farmer'] for _, data in valid if 'farmer' in data}
+    farmers = set()
+    if farmer_ids and user.is_staff:
+        farmers = set(User.objects.filter(pk__in=farmer_ids).values_list('pk', flat=True))
+
+    checked = []
+    for index, data in valid:
+        errors = {}
+        if data['project'] not in projects:
+            errors['project'] = [f"Project {data['project']} does not exist."]
+        farmer_id = data.get('farmer')
+        if farmer_id is not None and farmer_id != user.pk:
+            if not user.is_staff:
+                errors['farmer'] = ["Only staff may record plantings for another farmer."]
+            elif farmer_id not in farmers:
+                errors['farmer'] = [f"User {farmer_id} does not exist."]
+        if errors:
+            results[index] = _error(index, errors, data.get('client_uuid'))
+        else:
+            checked.append((index, data))
+    return checked
+
+
+def _stored_ids(client_uuids):
+    stored = {}
+    chunk_size = _config()['CHUNK_SIZE']
+    for start in range(0, len(client_uuids), chunk_size):
+        chunk = client_uuids[start:start + chunk_size]
+        stored.update(TreePlanting.objects.filter(client_uuid__in=chunk).values_list('client_uuid', 'pk'))
+    return stored
+
+
+def _insert_chunk(chunk, results):
+    """
+    bulk_create one chunk and return the (index, planting) pairs inserted.
+    A concurrent upload of the same UUIDs makes the insert fail; the chunk is
+    then retried without the rows that other request stored first.
+    """
+    try:
+        with transaction.atomic():
+            TreePlanting.objects.bulk_create([planting for _, planting in chunk])
+        return chunk
+    except IntegrityError:
+        stored = _stored_ids([planting.client_uuid for _, planting in chunk])
+        remaining = []
+        for index, planting in chunk:
+            if planting.client_uuid in stored:
+                results[index] = _result(index, DUPLICATE, planting.client_uuid, id=stored[planting.client_uuid])
+            else:
+                planting.pk = None
+                remaining.append((index, planting))
+        if len(remaining) == len(chunk):
+            raise
+        return _insert_chunk(remaining, results)
+
+
+def _result(index, status, client_uuid, **extra):
+    return {'index': index, 'status': status, 'client_uuid': str(client_uuid), **extra}
+
+
+def _error(index, errors, client_uuid=None):
+    return {
+        'index': index,
+        'status': ERROR,
+        'client_uuid': str(client_uuid) if client_uuid else None,
+        'errors': errors,
+    }
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+from programs import carbon
+from programs.models import Program
+
+
+class Command(BaseCommand):
+    help = "Recompute carbon sequestration for projects whose plantings changed or whose figure is out of date"
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Recompute the whole portfolio")
+    
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = carbon.refresh(force=options['all'])
+        self.stdout.write(f"Recomputed {count} project(s) in {time.perf_counter() - started:.2f}s "
+                          f"(model {carbon.MODEL_VERSION})")
+        for program in Program.objects.order_by('title'):
+            self.stdout.write(f"  {program.title}: {carbon.program_total(program)} t CO2e")
+        self.stdout.write(self.style.SUCCESS("Carbon figures up to date"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from core.partitions import maintain_monthly_partitions
+from programs.models import SurvivalObservation
+
+
+class Command(BaseCommand):
+    help = "Create monthly partitions of the monitoring observations ahead of time (PostgreSQL; run monthly)"
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, default=3, help="Months to create beyond the current one")
+    
+    def handle(self, *args, **options):
+        created = maintain_monthly_partitions(SurvivalObservation._meta.db_table, 'observed_on', ahead=options['ahead'])
+        for name in created:
+            self.stdout.write(f"  {name}")
+        self.stdout.write(self.style.SUCCESS(f"Monitoring partitions created: {len(created)}"))
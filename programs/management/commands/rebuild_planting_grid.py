@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from programs.models import PlantingGridCell
+
+
+class Command(BaseCommand):
+    help = "Rebuild the precomputed planting map grid from the tree plantings"
+    
+    def handle(self, *args, **options):
+        cells = PlantingGridCell.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Planting grid rebuilt: {cells} cells"))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from programs.models import Project
+
+
+class Command(BaseCommand):
+    help = "Rebuild project rollups (trees, farmers, species, survival) from the tree plantings and verify them"
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--verify-only', action='store_true', help="Report mismatches without fixing them")
+    
+    def handle(self, *args, **options):
+        if not options['verify_only']:
+            corrected = Project.rebuild_rollups()
+            self.stdout.write(f"Rebuilt rollups: {corrected} project(s) corrected")
+        
+        mismatches = Project.verify_rollups()
+        for project, field, stored, actual in mismatches:
+            self.stdout.write(f"  {project.pk} {project.title}: {field} is {stored}, plantings give {actual}")
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} rollup value(s) disagree with the plantings")
+        self.stdout.write(self.style.SUCCESS("Project rollups verified"))
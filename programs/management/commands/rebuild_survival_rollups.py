@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from programs.models import SurvivalRollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily, monthly and seasonal survival rollups from the monitoring observations (run after changing the planting season dates)"
+    
+    def handle(self, *args, **options):
+        rollups = SurvivalRollup.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Survival rollups rebuilt: {rollups} rows"))
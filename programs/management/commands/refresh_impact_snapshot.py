@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from programs.models import ImpactSnapshot
+
+
+class Command(BaseCommand):
+    help = "Rebuild the homepage impact snapshot from the source tables"
+    
+    def handle(self, *args, **options):
+        snapshot = ImpactSnapshot.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Impact snapshot rebuilt: {snapshot.total_trees_planted} trees, "
+            f"{snapshot.total_members} members, {snapshot.total_beneficiaries} beneficiaries"
+        ))
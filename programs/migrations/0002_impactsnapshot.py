@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImpactSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(default='global', max_length=20, unique=True)),
+                ('total_trees_planted', models.BigIntegerField(default=0)),
+                ('total_members', models.IntegerField(default=0)),
+                ('total_area_coverage', models.DecimalField(decimal_places=2, default=0.0, help_text='Area in hectares', max_digits=14)),
+                ('carbon_sequestered', models.DecimalField(decimal_places=2, default=0.0, help_text='CO2 in tons', max_digits=14)),
+                ('total_beneficiaries', models.BigIntegerField(default=0)),
+                ('rebuilt_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Impact Snapshot',
+            },
+        ),
+    ]
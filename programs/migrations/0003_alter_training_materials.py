@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:28
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0002_impactsnapshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='training',
+            name='materials',
+            field=models.FileField(blank=True, null=True, storage=core.storage.content_addressed_storage, upload_to='trainings/materials/'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0003_alter_training_materials'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='treeplanting',
+            index=models.Index(fields=['-planting_date', '-id'], name='treeplanting_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0004_treeplanting_treeplanting_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='treeplanting',
+            name='client_uuid',
+            field=models.UUIDField(blank=True, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+from core.geo import geohash_encode, parse_coordinates
+
+
+APP = 'programs'
+MODELS = ['Project', 'TreePlanting']
+
+
+def backfill_locations(apps, schema_editor):
+    for model_name in MODELS:
+        model = apps.get_model(APP, model_name)
+        batch = []
+        rows = model.objects.exclude(gps_coordinates=None).exclude(gps_coordinates='').only('pk', 'gps_coordinates')
+        for row in rows.iterator(chunk_size=1000):
+            point = parse_coordinates(row.gps_coordinates)
+            if point is None:
+                continue
+            row.latitude, row.longitude = point
+            row.geohash = geohash_encode(*point)
+            batch.append(row)
+            if len(batch) == 1000:
+                model.objects.bulk_update(batch, ['latitude', 'longitude', 'geohash'])
+                batch = []
+        model.objects.bulk_update(batch, ['latitude', 'longitude', 'geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0005_treeplanting_client_uuid'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='treeplanting',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='treeplanting',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='treeplanting',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['latitude', 'longitude'], name='project_latlng_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='treeplanting',
+            index=models.Index(fields=['latitude', 'longitude'], name='treeplanting_latlng_idx'),
+        ),
+        migrations.RunPython(backfill_locations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:40
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Substr
+
+from core.geo import ZOOM_PRECISION, geohash_bounds
+
+
+def build_grid(apps, schema_editor):
+    TreePlanting = apps.get_model('programs', 'TreePlanting')
+    PlantingGridCell = apps.get_model('programs', 'PlantingGridCell')
+    located = TreePlanting.objects.exclude(geohash='').order_by()
+    for precision in sorted(set(ZOOM_PRECISION)):
+        rows = located.annotate(grid_cell=Substr('geohash', 1, precision)).values('grid_cell').annotate(
+            plantings=Count('id'),
+            trees=Sum('quantity'),
+            survival_total=Sum('survival_rate'),
+            lat_total=Sum('latitude'),
+            lng_total=Sum('longitude'),
+        )
+        cells = []
+        for row in rows.iterator(chunk_size=2000):
+            cell = row.pop('grid_cell')
+            south, west, north, east = geohash_bounds(cell)
+            cells.append(PlantingGridCell(
+                cell=cell, precision=len(cell), center_lat=(south + north) / 2, center_lng=(west + east) / 2,
+                **{field: value or 0 for field, value in row.items()}
+            ))
+        PlantingGridCell.objects.bulk_create(cells, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0006_geolocation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlantingGridCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cell', models.CharField(max_length=12, unique=True)),
+                ('precision', models.PositiveSmallIntegerField()),
+                ('center_lat', models.FloatField()),
+                ('center_lng', models.FloatField()),
+                ('plantings', models.IntegerField(default=0)),
+                ('trees', models.BigIntegerField(default=0)),
+                ('survival_total', models.BigIntegerField(default=0, help_text='Sum of survival_rate, for the mean')),
+                ('lat_total', models.FloatField(default=0, help_text='Sum of latitudes, for the centroid')),
+                ('lng_total', models.FloatField(default=0, help_text='Sum of longitudes, for the centroid')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['precision', 'center_lat', 'center_lng'], name='plantinggrid_tile_idx')],
+            },
+        ),
+        migrations.RunPython(build_grid, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:42
+
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+
+
+def fill_rollups(apps, schema_editor):
+    Project = apps.get_model('programs', 'Project')
+    TreePlanting = apps.get_model('programs', 'TreePlanting')
+    rows = TreePlanting.objects.order_by().values('project').annotate(
+        trees_planted=Sum('quantity'),
+        unique_farmers=Count('farmer', distinct=True),
+        species_count=Count('species', distinct=True),
+        surviving_trees=Sum(F('quantity') * F('survival_rate')),
+    )
+    totals = {row.pop('project'): row for row in rows}
+    projects = list(Project.objects.only('pk'))
+    for project in projects:
+        row = totals.get(project.pk, {})
+        for field in ('trees_planted', 'unique_farmers', 'species_count', 'surviving_trees'):
+            setattr(project, field, row.get(field) or 0)
+    Project.objects.bulk_update(projects, ['trees_planted', 'unique_farmers', 'species_count', 'surviving_trees'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0007_plantinggridcell'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='species_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='surviving_trees',
+            field=models.BigIntegerField(default=0, editable=False, help_text='Sum of quantity x survival rate (%)'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='unique_farmers',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='project',
+            name='trees_planted',
+            field=models.IntegerField(default=0, editable=False, help_text='Sum of tree planting quantities'),
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0008_project_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='carbon_computed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='carbon_stale',
+            field=models.BooleanField(default=True, editable=False, help_text='Plantings changed since carbon was computed'),
+        ),
+        migrations.AlterField(
+            model_name='project',
+            name='carbon_sequestration',
+            field=models.DecimalField(decimal_places=2, default=0.0, editable=False, help_text='Estimated CO2 sequestration in tons (programs.carbon)', max_digits=10),
+        ),
+    ]
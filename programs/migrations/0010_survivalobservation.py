@@ -0,0 +1,45 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:46
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_history(apps, schema_editor):
+    """Start each monitored planting's history with its current survival rate"""
+    TreePlanting = apps.get_model('programs', 'TreePlanting')
+    SurvivalObservation = apps.get_model('programs', 'SurvivalObservation')
+    monitored = TreePlanting.objects.filter(last_monitoring_date__isnull=False).values_list(
+        'pk', 'last_monitoring_date', 'survival_rate',
+    )
+    SurvivalObservation.objects.bulk_create([
+        SurvivalObservation(planting_id=pk, observed_on=observed_on, survival_rate=min(max(survival_rate, 0), 100))
+        for pk, observed_on, survival_rate in monitored.iterator()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0009_project_carbon'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurvivalObservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('observed_on', models.DateField(default=django.utils.timezone.localdate)),
+                ('survival_rate', models.PositiveSmallIntegerField(help_text='Percentage')),
+                ('planting', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='survival_history', to='programs.treeplanting')),
+                ('recorded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-observed_on', '-id'],
+                'indexes': [models.Index(fields=['planting', 'observed_on'], name='survival_obs_planting_idx')],
+            },
+        ),
+        migrations.RunPython(seed_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_planting_fields(apps, schema_editor):
+    TreePlanting = apps.get_model('programs', 'TreePlanting')
+    SurvivalObservation = apps.get_model('programs', 'SurvivalObservation')
+    planting = TreePlanting.objects.filter(pk=OuterRef('planting_id'))
+    SurvivalObservation.objects.update(
+        project_id=Subquery(planting.values('project_id')[:1]),
+        quantity=Subquery(planting.values('quantity')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0010_survivalobservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survivalobservation',
+            name='project',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='programs.project'),
+        ),
+        migrations.AddField(
+            model_name='survivalobservation',
+            name='quantity',
+            field=models.PositiveIntegerField(help_text='Trees in the planting when observed', null=True),
+        ),
+        migrations.RunPython(copy_planting_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:52
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+
+from core.partitions import partition_by_month
+from programs.periods import PERIODS, period_start
+
+
+def partition_observations(apps, schema_editor):
+    SurvivalObservation = apps.get_model('programs', 'SurvivalObservation')
+    partition_by_month(SurvivalObservation._meta.db_table, 'observed_on')
+
+
+def fill_rollups(apps, schema_editor):
+    SurvivalObservation = apps.get_model('programs', 'SurvivalObservation')
+    SurvivalRollup = apps.get_model('programs', 'SurvivalRollup')
+    days = SurvivalObservation.objects.order_by().values('project_id', 'observed_on').annotate(
+        count=Count('id'),
+        survival=Sum('survival_rate'),
+        tree_count=Sum('quantity'),
+        surviving=Sum(F('quantity') * F('survival_rate')),
+    )
+    totals = defaultdict(lambda: [0, 0, 0, 0])
+    for row in days:
+        values = (row['count'], row['survival'], row['tree_count'], row['surviving'])
+        for period in PERIODS:
+            total = totals[(row['project_id'], period, period_start(period, row['observed_on']))]
+            for position, value in enumerate(values):
+                total[position] += value or 0
+    SurvivalRollup.objects.bulk_create([
+        SurvivalRollup(
+            project_id=project_id, period=period, period_start=start,
+            observations=observations, survival_total=survival, trees=trees, surviving_total=surviving,
+        )
+        for (project_id, period, start), (observations, survival, trees, surviving) in totals.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0011_survivalobservation_planting_fields'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='survivalobservation',
+            name='project',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='programs.project'),
+        ),
+        migrations.AlterField(
+            model_name='survivalobservation',
+            name='quantity',
+            field=models.PositiveIntegerField(help_text='Trees in the planting when observed'),
+        ),
+        # PostgreSQL only: monthly range partitions on observed_on
+        migrations.RunPython(partition_observations, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='SurvivalRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'day'), ('month', 'month'), ('season', 'season')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('observations', models.IntegerField(default=0)),
+                ('survival_total', models.BigIntegerField(default=0, help_text='Sum of survival_rate, for the mean')),
+                ('trees', models.BigIntegerField(default=0, help_text='Sum of quantity')),
+                ('surviving_total', models.BigIntegerField(default=0, help_text='Sum of quantity x survival rate (%)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='survival_rollups', to='programs.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period', 'period_start'], name='survival_rollup_period_idx')],
+                'constraints': [models.UniqueConstraint(fields=('project', 'period', 'period_start'), name='survival_rollup_unique')],
+            },
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.0.1 on 2026-10-17 04:20
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_survival(apps, schema_editor):
+    Project = apps.get_model('programs', 'Project')
+    TreePlanting = apps.get_model('programs', 'TreePlanting')
+    totals = {
+        row.pop('project'): row
+        for row in TreePlanting.objects.order_by().values('project').annotate(
+            plantings=Count('id'),
+            survival_total=Sum('survival_rate'),
+        )
+    }
+    projects = list(Project.objects.only('pk'))
+    for project in projects:
+        row = totals.get(project.pk, {})
+        project.plantings = row.get('plantings') or 0
+        project.survival_total = row.get('survival_total') or 0
+    Project.objects.bulk_update(projects, ['plantings', 'survival_total'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0012_survivalrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='plantings',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='survival_total',
+            field=models.BigIntegerField(default=0, editable=False, help_text='Sum of survival rate (%), for the mean'),
+        ),
+        migrations.RunPython(fill_survival, migrations.RunPython.noop),
+    ]
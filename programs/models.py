@@ -1,12 +1,30 @@
-from django.db import models
+from collections import defaultdict
+
+from django.db import models, transaction
+from django.db.models import Case, F, FloatField, IntegerField, Sum, Value, When
+from django.db.models.functions import Substr
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from core.geo import ZOOM_PRECISION, geohash_bounds, tile_bounds, zoom_precision
+from core.models import GeoLocated
+from core.storage import content_addressed_storage
+from .periods import PERIODS, period_start
 
 
 User = get_user_model()
 
 
-class Program(models.Model):
+class LoadedValuesMixin:
+    """Remember field values as loaded from the database so signal handlers can compute deltas"""
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+
+class Program(LoadedValuesMixin, models.Model):
     PROGRAM_TYPE = (
         ('agroforestry', 'Agroforestry'),
         ('climate_smart_ag', 'Climate-Smart Agriculture'),
@@ -68,16 +86,18 @@ class Program(models.Model):
         return self.title
 
 
-class Project(models.Model):
+class Project(LoadedValuesMixin, GeoLocated):
     program = models.ForeignKey(Program, on_delete=models.CASCADE, related_name='projects')
     title = models.CharField(max_length=200)
     description = models.TextField()
     
     # Specifics
     trees_target = models.IntegerField(default=0, help_text="Target number of trees to plant")
-    trees_planted = models.IntegerField(default=0)
+    trees_planted = models.IntegerField(default=0, editable=False, help_text="Sum of tree planting quantities")
     area_coverage = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, help_text="Area in hectares")
-    carbon_sequestration = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, help_text="Estimated CO2 sequestration in tons")
+    carbon_sequestration = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, editable=False, help_text="Estimated CO2 sequestration in tons (programs.carbon)")
+    carbon_computed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    carbon_stale = models.BooleanField(default=True, editable=False, help_text="Plantings changed since carbon was computed")
     
     # Location details
     gps_coordinates = models.CharField(max_length=100, null=True, blank=True, help_text="Latitude,Longitude")
@@ -104,17 +124,126 @@ class Project(models.Model):
         ('monitoring', 'Under Monitoring'),
     ], default='planned')
     
+    # Rollups of tree_plantings, maintained by programs.signals (trees_planted above is one too)
+    unique_farmers = models.IntegerField(default=0, editable=False)
+    species_count = models.IntegerField(default=0, editable=False)
+    surviving_trees = models.BigIntegerField(default=0, editable=False, help_text="Sum of quantity x survival rate (%)")
+    plantings = models.IntegerField(default=0, editable=False)
+    survival_total = models.BigIntegerField(default=0, editable=False, help_text="Sum of survival rate (%), for the mean")
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    ROLLUP_FIELDS = ['trees_planted', 'unique_farmers', 'species_count', 'surviving_trees', 'plantings', 'survival_total']
+    CARBON_FIELDS = ['carbon_sequestration', 'carbon_computed_at', 'carbon_stale']
+    
     class Meta:
         ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='project_latlng_idx'),
+        ]
     
     def __str__(self):
         return f"{self.program.title} - {self.title}"
+    
+    def save(self, *args, **kwargs):
+        # Never write rollups or carbon from a possibly stale instance (e.g. an admin
+        # form opened before a planting was added); only their own code paths set them
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            derived = self.ROLLUP_FIELDS + self.CARBON_FIELDS
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in derived
+            ]
+        super().save(*args, **kwargs)
+    
+    @property
+    def weighted_survival(self):
+        """Survival rate (%) weighted by the number of trees in each planting"""
+        return round(self.surviving_trees / self.trees_planted, 1) if self.trees_planted else 0
+    
+    @property
+    def avg_survival(self):
+        """Mean survival rate (%) of the plantings"""
+        return round(self.survival_total / self.plantings, 1) if self.plantings else 0
+    
+    @classmethod
+    def apply_rollup_deltas(cls, deltas, refresh=()):
+        """
+        Add {project_id: (trees, surviving_trees, plantings, survival_total)} with F() updates, then recount
+        distinct farmers and species for those projects plus any in `refresh`.
+        Projects are locked in id order, so concurrent writers queue instead of
+        deadlocking, and each recount sees every earlier committed planting.
+        """
+        project_ids = sorted(set(deltas) | set(refresh))
+        if not project_ids:
+            return
+        with transaction.atomic():
+            for project_id in project_ids:
+                trees, surviving, plantings, survival = deltas.get(project_id, (0, 0, 0, 0))
+                cls.objects.filter(pk=project_id).update(
+                    trees_planted=F('trees_planted') + trees,
+                    surviving_trees=F('surviving_trees') + surviving,
+                    plantings=F('plantings') + plantings,
+                    survival_total=F('survival_total') + survival,
+                    carbon_stale=True,
+                )
+            counts = {
+                row['project']: row
+                for row in TreePlanting.objects.filter(project_id__in=project_ids).order_by().values('project').annotate(
+                    unique_farmers=models.Count('farmer', distinct=True),
+                    species_count=models.Count('species', distinct=True),
+                )
+            }
+            for project_id in project_ids:
+                row = counts.get(project_id, {})
+                cls.objects.filter(pk=project_id).update(
+                    unique_farmers=row.get('unique_farmers', 0),
+                    species_count=row.get('species_count', 0),
+                )
+    
+    @classmethod
+    def rollup_totals(cls):
+        """{project_id: {rollup field: value}} recomputed from the plantings in one grouped query"""
+        rows = TreePlanting.objects.order_by().values('project').annotate(
+            trees_planted=Sum('quantity'),
+            unique_farmers=models.Count('farmer', distinct=True),
+            species_count=models.Count('species', distinct=True),
+            surviving_trees=Sum(F('quantity') * F('survival_rate')),
+            plantings=models.Count('id'),
+            survival_total=Sum('survival_rate'),
+        )
+        return {row.pop('project'): {field: value or 0 for field, value in row.items()} for row in rows}
+    
+    @classmethod
+    def verify_rollups(cls, totals=None):
+        """[(project, field, stored, actual)] for every rollup that disagrees with the plantings"""
+        totals = cls.rollup_totals() if totals is None else totals
+        empty = dict.fromkeys(cls.ROLLUP_FIELDS, 0)
+        mismatches = []
+        for project in cls.objects.only('pk', 'title', *cls.ROLLUP_FIELDS).iterator():
+            actual = totals.get(project.pk, empty)
+            for field in cls.ROLLUP_FIELDS:
+                if getattr(project, field) != actual[field]:
+                    mismatches.append((project, field, getattr(project, field), actual[field]))
+        return mismatches
+    
+    @classmethod
+    def rebuild_rollups(cls):
+        """Recompute every project's rollups from scratch; returns the number of projects corrected"""
+        with transaction.atomic():
+            totals = cls.rollup_totals()
+            stale = {project.pk: project for project, *_ in cls.verify_rollups(totals)}
+            empty = dict.fromkeys(cls.ROLLUP_FIELDS, 0)
+            for project in stale.values():
+                for field, value in totals.get(project.pk, empty).items():
+                    setattr(project, field, value)
+                project.carbon_stale = True
+            cls.objects.bulk_update(list(stale.values()), cls.ROLLUP_FIELDS + ['carbon_stale'], batch_size=500)
+        return len(stale)
 
 
-class TreePlanting(models.Model):
+class TreePlanting(LoadedValuesMixin, GeoLocated):
     TREE_TYPE = (
         ('indigenous', 'Indigenous'),
         ('fruit', 'Fruit Tree'),
@@ -143,17 +272,173 @@ class TreePlanting(models.Model):
     # Images
     photo = models.ImageField(upload_to='trees/', null=True, blank=True)
     
+    # Offline sync: set by the collecting device so a retried upload is not stored twice
+    client_uuid = models.UUIDField(unique=True, null=True, blank=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-planting_date']
         verbose_name_plural = "Tree Plantings"
+        indexes = [
+            # Keyset pagination: ordering + pk tiebreaker (core/pagination.py)
+            models.Index(fields=['-planting_date', '-id'], name='treeplanting_keyset_idx'),
+            models.Index(fields=['latitude', 'longitude'], name='treeplanting_latlng_idx'),
+        ]
     
     def __str__(self):
         return f"{self.species} - {self.farmer.get_full_name()}"
 
 
+class SurvivalObservation(models.Model):
+    """
+    One survival check of a planting. Append-only, so survival trends can be
+    charted; TreePlanting.survival_rate holds the latest value. The planting's
+    project and tree count are copied at observation time so SurvivalRollup
+    can be kept from these rows alone. On PostgreSQL the table is partitioned
+    by month of observed_on (core.partitions, see the create_monitoring_partitions
+    command).
+    """
+    planting = models.ForeignKey(TreePlanting, on_delete=models.CASCADE, related_name='survival_history')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='+')
+    observed_on = models.DateField(default=timezone.localdate)
+    survival_rate = models.PositiveSmallIntegerField(help_text="Percentage")
+    quantity = models.PositiveIntegerField(help_text="Trees in the planting when observed")
+    recorded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    
+    class Meta:
+        ordering = ['-observed_on', '-id']
+        indexes = [
+            models.Index(fields=['planting', 'observed_on'], name='survival_obs_planting_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.planting_id} on {self.observed_on}: {self.survival_rate}%"
+
+
+class SurvivalRollup(models.Model):
+    """
+    Survival observations of one project summed per day, month and season
+    (programs.periods), so trend series over any history length read a
+    bounded number of rows. Kept up to date incrementally by
+    programs.monitoring and programs.signals; rebuild() recomputes from the
+    observations.
+    """
+    PERIOD_CHOICES = [(period, period) for period in PERIODS]
+    UPDATE_CHUNK_SIZE = 500
+    
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='survival_rollups')
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    
+    # Counters
+    observations = models.IntegerField(default=0)
+    survival_total = models.BigIntegerField(default=0, help_text="Sum of survival_rate, for the mean")
+    trees = models.BigIntegerField(default=0, help_text="Sum of quantity")
+    surviving_total = models.BigIntegerField(default=0, help_text="Sum of quantity x survival rate (%)")
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'period', 'period_start'], name='survival_rollup_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['period', 'period_start'], name='survival_rollup_period_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.project_id} {self.period} {self.period_start}: {self.observations} observations"
+    
+    @classmethod
+    def contribution(cls, project_id, observed_on, survival_rate, quantity, sign=1):
+        """Counter deltas one observation adds to (sign=1) or removes from (sign=-1) its rollups"""
+        quantity, survival_rate = int(quantity or 0), int(survival_rate or 0)
+        values = (sign, sign * survival_rate, sign * quantity, sign * quantity * survival_rate)
+        return {(project_id, period, period_start(period, observed_on)): values for period in PERIODS}
+    
+    @classmethod
+    def apply_deltas(cls, contributions):
+        """
+        Add counter deltas {(project_id, period, period_start): (observations,
+        survival, trees, surviving)}, summed across contributions, with one
+        UPDATE per chunk of rollups. Rollups left without observations are removed.
+        """
+        totals = defaultdict(lambda: [0, 0, 0, 0])
+        for deltas in contributions:
+            for key, values in deltas.items():
+                total = totals[key]
+                for position, value in enumerate(values):
+                    total[position] += value
+        totals = {key: total for key, total in totals.items() if any(total)}
+        if not totals:
+            return
+        
+        fields = ['observations', 'survival_total', 'trees', 'surviving_total']
+        with transaction.atomic():
+            cls.objects.bulk_create([
+                cls(project_id=project_id, period=period, period_start=start)
+                for project_id, period, start in totals
+            ], ignore_conflicts=True)
+            keys = list(totals)
+            for offset in range(0, len(keys), cls.UPDATE_CHUNK_SIZE):
+                chunk = keys[offset:offset + cls.UPDATE_CHUNK_SIZE]
+                rows = cls.objects.filter(
+                    project_id__in={key[0] for key in chunk},
+                    period_start__in={key[2] for key in chunk},
+                ).values_list('pk', 'project_id', 'period', 'period_start')
+                ids = {(project_id, period, start): pk for pk, project_id, period, start in rows}
+                ids = {ids[key]: totals[key] for key in chunk}
+                changes = {
+                    field: F(field) + Case(
+                        *[When(pk=pk, then=Value(values[position])) for pk, values in ids.items()],
+                        default=Value(0),
+                        output_field=IntegerField(),
+                    )
+                    for position, field in enumerate(fields)
+                }
+                cls.objects.filter(pk__in=list(ids)).update(**changes)
+                cls.objects.filter(pk__in=list(ids), observations__lte=0).delete()
+    
+    @classmethod
+    def apply_observations(cls, observations, sign=1):
+        cls.apply_deltas([
+            cls.contribution(
+                observation.project_id, observation.observed_on, observation.survival_rate, observation.quantity,
+                sign=sign,
+            )
+            for observation in observations
+        ])
+    
+    @classmethod
+    def rebuild(cls):
+        """Recompute every rollup from the daily sums of the observations"""
+        days = SurvivalObservation.objects.order_by().values('project_id', 'observed_on').annotate(
+            count=models.Count('id'),
+            survival=Sum('survival_rate'),
+            tree_count=Sum('quantity'),
+            surviving=Sum(F('quantity') * F('survival_rate')),
+        )
+        totals = defaultdict(lambda: [0, 0, 0, 0])
+        for row in days.iterator(chunk_size=2000):
+            values = (row['count'], row['survival'], row['tree_count'], row['surviving'])
+            for period in PERIODS:
+                total = totals[(row['project_id'], period, period_start(period, row['observed_on']))]
+                for position, value in enumerate(values):
+                    total[position] += value or 0
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create([
+                cls(
+                    project_id=project_id, period=period, period_start=start,
+                    observations=observations, survival_total=survival, trees=trees, surviving_total=surviving,
+                )
+                for (project_id, period, start), (observations, survival, trees, surviving) in totals.items()
+            ], batch_size=cls.UPDATE_CHUNK_SIZE)
+        return len(totals)
+
+
 class Training(models.Model):
     TRAINING_TYPE = (
         ('agroforestry', 'Agroforestry Practices'),
@@ -182,7 +467,7 @@ class Training(models.Model):
     
     # Materials
     agenda = models.TextField(null=True, blank=True)
-    materials = models.FileField(upload_to='trainings/materials/', null=True, blank=True)
+    materials = models.FileField(upload_to='trainings/materials/', storage=content_addressed_storage, null=True, blank=True)
     photos = models.ImageField(upload_to='trainings/photos/', null=True, blank=True)
     
     # Feedback
@@ -196,4 +481,191 @@ class Training(models.Model):
         ordering = ['-date']
     
     def __str__(self):
-        return f"{self.title} - {self.date}"
\ No newline at end of file
+        return f"{self.title} - {self.date}"
+
+
+class ImpactSnapshot(models.Model):
+    """
+    Materialized impact counters for the public homepage.
+    Kept up to date incrementally by programs.signals; rebuild() recomputes from scratch.
+    """
+    GLOBAL_KEY = 'global'
+    
+    key = models.CharField(max_length=20, unique=True, default=GLOBAL_KEY)
+    
+    # Counters
+    total_trees_planted = models.BigIntegerField(default=0)
+    total_members = models.IntegerField(default=0)
+    total_area_coverage = models.DecimalField(max_digits=14, decimal_places=2, default=0.00, help_text="Area in hectares")
+    carbon_sequestered = models.DecimalField(max_digits=14, decimal_places=2, default=0.00, help_text="CO2 in tons")
+    total_beneficiaries = models.BigIntegerField(default=0)
+    
+    rebuilt_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Impact Snapshot"
+    
+    def __str__(self):
+        return f"Impact snapshot ({self.key})"
+    
+    @classmethod
+    def current(cls):
+        """Return the global snapshot, building it on first use"""
+        snapshot = cls.objects.filter(key=cls.GLOBAL_KEY).first()
+        if snapshot is None:
+            snapshot = cls.rebuild()
+        return snapshot
+    
+    @classmethod
+    def rebuild(cls):
+        """Recompute every counter from the source tables"""
+        now = timezone.now()
+        totals = {
+            'total_trees_planted': TreePlanting.objects.aggregate(total=Sum('quantity'))['total'] or 0,
+            'total_members': User.objects.count(),
+            'total_area_coverage': Project.objects.aggregate(total=Sum('area_coverage'))['total'] or 0,
+            'carbon_sequestered': Project.objects.aggregate(total=Sum('carbon_sequestration'))['total'] or 0,
+            'total_beneficiaries': Program.objects.aggregate(total=Sum('beneficiaries_reached'))['total'] or 0,
+            'rebuilt_at': now,
+        }
+        snapshot, _ = cls.objects.update_or_create(key=cls.GLOBAL_KEY, defaults=totals)
+        return snapshot
+    
+    @classmethod
+    def apply_deltas(cls, **deltas):
+        """Atomically add deltas to counters with a single UPDATE"""
+        changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+        if not changes:
+            return
+        changes['updated_at'] = timezone.now()
+        cls.objects.filter(key=cls.GLOBAL_KEY).update(**changes)
+
+
+class PlantingGridCell(models.Model):
+    """
+    Precomputed map aggregate: the plantings inside one geohash cell, kept for
+    every prefix length a map zoom level uses (see core.geo.ZOOM_PRECISION).
+    A cell's precision is its length, so the cell string alone identifies it.
+    Kept up to date incrementally by programs.signals and programs.ingest;
+    rebuild() recomputes from scratch.
+    """
+    PRECISIONS = sorted(set(ZOOM_PRECISION))
+    UPDATE_CHUNK_SIZE = 500
+    
+    cell = models.CharField(max_length=12, unique=True)
+    precision = models.PositiveSmallIntegerField()
+    # Cell centre: places each cell in exactly one map tile
+    center_lat = models.FloatField()
+    center_lng = models.FloatField()
+    
+    # Counters
+    plantings = models.IntegerField(default=0)
+    trees = models.BigIntegerField(default=0)
+    survival_total = models.BigIntegerField(default=0, help_text="Sum of survival_rate, for the mean")
+    lat_total = models.FloatField(default=0, help_text="Sum of latitudes, for the centroid")
+    lng_total = models.FloatField(default=0, help_text="Sum of longitudes, for the centroid")
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['precision', 'center_lat', 'center_lng'], name='plantinggrid_tile_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.cell} ({self.plantings} plantings)"
+    
+    @classmethod
+    def contribution(cls, geohash, quantity, survival_rate, latitude, longitude, sign=1):
+        """Counter deltas one planting adds to (sign=1) or removes from (sign=-1) its cells"""
+        if not geohash:
+            return {}
+        values = (sign, sign * int(quantity or 0), sign * int(survival_rate or 0), sign * latitude, sign * longitude)
+        return {geohash[:precision]: values for precision in cls.PRECISIONS}
+    
+    @classmethod
+    def apply_deltas(cls, contributions):
+        """
+        Add counter deltas {cell: (plantings, trees, survival, lat, lng)}, summed
+        across contributions, with one UPDATE per chunk of cells.
+        Cells left without plantings are removed.
+        """
+        totals = defaultdict(lambda: [0, 0, 0, 0.0, 0.0])
+        for deltas in contributions:
+            for cell, values in deltas.items():
+                total = totals[cell]
+                for position, value in enumerate(values):
+                    total[position] += value
+        totals = {cell: total for cell, total in totals.items() if any(total)}
+        if not totals:
+            return
+        
+        cells = list(totals)
+        fields = [
+            ('plantings', IntegerField()),
+            ('trees', IntegerField()),
+            ('survival_total', IntegerField()),
+            ('lat_total', FloatField()),
+            ('lng_total', FloatField()),
+        ]
+        with transaction.atomic():
+            cls.objects.bulk_create([cls.empty(cell) for cell in cells], ignore_conflicts=True)
+            for start in range(0, len(cells), cls.UPDATE_CHUNK_SIZE):
+                chunk = cells[start:start + cls.UPDATE_CHUNK_SIZE]
+                changes = {
+                    field: F(field) + Case(
+                        *[When(cell=cell, then=Value(totals[cell][position])) for cell in chunk],
+                        default=Value(0),
+                        output_field=output_field,
+                    )
+                    for position, (field, output_field) in enumerate(fields)
+                }
+                cls.objects.filter(cell__in=chunk).update(**changes)
+                cls.objects.filter(cell__in=chunk, plantings__lte=0).delete()
+    
+    @classmethod
+    def tile(cls, z, x, y):
+        """
+        Cells for map tile z/x/y as compact rows:
+        [cell, centroid lat, centroid lng, plantings, trees, mean survival %]
+        """
+        south, west, north, east = tile_bounds(z, x, y)
+        rows = cls.objects.filter(
+            precision=zoom_precision(z),
+            center_lat__gte=south, center_lat__lt=north,
+            center_lng__gte=west, center_lng__lt=east,
+        ).order_by('cell').values_list('cell', 'plantings', 'trees', 'survival_total', 'lat_total', 'lng_total')
+        return [
+            [cell, round(lat_total / plantings, 5), round(lng_total / plantings, 5), plantings, trees,
+             round(survival_total / plantings, 1)]
+            for cell, plantings, trees, survival_total, lat_total, lng_total in rows
+        ]
+    
+    @classmethod
+    def empty(cls, cell):
+        south, west, north, east = geohash_bounds(cell)
+        return cls(cell=cell, precision=len(cell), center_lat=(south + north) / 2, center_lng=(west + east) / 2)
+    
+    @classmethod
+    def rebuild(cls):
+        """Recompute every cell with one grouped query per precision"""
+        located = TreePlanting.objects.exclude(geohash='').order_by()
+        with transaction.atomic():
+            cls.objects.all().delete()
+            for precision in cls.PRECISIONS:
+                rows = located.annotate(grid_cell=Substr('geohash', 1, precision)).values('grid_cell').annotate(
+                    plantings=models.Count('id'),
+                    trees=Sum('quantity'),
+                    survival_total=Sum('survival_rate'),
+                    lat_total=Sum('latitude'),
+                    lng_total=Sum('longitude'),
+                )
+                cells = []
+                for row in rows.iterator(chunk_size=2000):
+                    cell = cls.empty(row.pop('grid_cell'))
+                    for field, value in row.items():
+                        setattr(cell, field, value or 0)
+                    cells.append(cell)
+                cls.objects.bulk_create(cells, batch_size=cls.UPDATE_CHUNK_SIZE)
+        return cls.objects.count()
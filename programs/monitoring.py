@@ -0,0 +1,122 @@
+"""
+Survival monitoring: apply a visit's worth of survival checks at once.
+
+apply_survival_updates() takes (id, survival_rate, notes) rows and, in one
+transaction:
+
+    1. locks the plantings with one SELECT ... FOR UPDATE
+    2. writes only survival_rate / last_monitoring_date / updated_at (plus
+       monitoring_notes when notes were sent) with bulk_update
+    3. appends one SurvivalObservation per row with bulk_create and adds
+       them to the daily / monthly / seasonal SurvivalRollup rows
+    4. applies the survival change to the map grid and project rollups,
+       which bulk_update would otherwise bypass
+
+Rows the user may not update, or that fail validation, are reported per row.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import PlantingGridCell, Project, SurvivalObservation, SurvivalRollup, TreePlanting
+from .serializers import SurvivalUpdateSerializer
+
+
+UPDATED = 'updated'
+ERROR = 'error'
+
+MAX_ROWS = 1000
+CHUNK_SIZE = 500
+
+
+class TooManyRows(Exception):
+    pass
+
+
+def monitorable_plantings(user):
+    """Plantings a user may record survival for: their own, or any for staff"""
+    plantings = TreePlanting.objects.all()
+    return plantings if user.is_staff else plantings.filter(farmer=user)
+
+
+def apply_survival_updates(rows, user, observed_on=None):
+    if len(rows) > MAX_ROWS:
+        raise TooManyRows(f"At most {MAX_ROWS} rows per request.")
+    observed_on = observed_on or timezone.localdate()
+
+    results = [None] * len(rows)
+    valid = {}
+    for index, row in enumerate(rows):
+        serializer = SurvivalUpdateSerializer(data=row) if isinstance(row, dict) else None
+        if serializer is None or not serializer.is_valid():
+            errors = serializer.errors if serializer is not None else {'non_field_errors': ["Expected an object."]}
+            results[index] = _error(index, row, errors)
+        elif serializer.validated_data['id'] in valid:
+            results[index] = _error(index, row, {'id': ["Planting listed more than once."]})
+        else:
+            valid[serializer.validated_data['id']] = (index, serializer.validated_data)
+
+    now = timezone.now()
+    with transaction.atomic():
+        plantings = monitorable_plantings(user).filter(pk__in=list(valid)).select_for_update().only(
+            'pk', 'project_id', 'quantity', 'survival_rate', 'monitoring_notes',
+            'geohash', 'latitude', 'longitude',
+        )
+        plantings = {planting.pk: planting for planting in plantings}
+
+        changed, observations, grid_cells, project_deltas = [], [], [], {}
+        notes_sent = False
+        for planting_id, (index, data) in valid.items():
+            planting = plantings.get(planting_id)
+            if planting is None:
+                results[index] = _error(index, data, {'id': ["Planting not found."]})
+                continue
+            previous, survival_rate = planting.survival_rate, data['survival_rate']
+            if survival_rate != previous:
+                grid_cells.append(_grid_contribution(planting, previous, sign=-1))
+                grid_cells.append(_grid_contribution(planting, survival_rate))
+                trees, surviving, count, survival = project_deltas.get(planting.project_id, (0, 0, 0, 0))
+                project_deltas[planting.project_id] = (
+                    trees, surviving + planting.quantity * (survival_rate - previous),
+                    count, survival + survival_rate - previous,
+                )
+            planting.survival_rate = survival_rate
+            planting.last_monitoring_date = observed_on
+            planting.updated_at = now
+            if 'monitoring_notes' in data:
+                planting.monitoring_notes = data['monitoring_notes']
+                notes_sent = True
+            changed.append(planting)
+            observations.append(SurvivalObservation(
+                planting=planting, project_id=planting.project_id, observed_on=observed_on,
+                survival_rate=survival_rate, quantity=planting.quantity, recorded_by=user,
+            ))
+            results[index] = {'index': index, 'id': planting_id, 'status': UPDATED, 'survival_rate': survival_rate}
+
+        fields = ['survival_rate', 'last_monitoring_date', 'updated_at']
+        if notes_sent:
+            fields.append('monitoring_notes')
+        TreePlanting.objects.bulk_update(changed, fields, batch_size=CHUNK_SIZE)
+        SurvivalObservation.objects.bulk_create(observations, batch_size=CHUNK_SIZE)
+        SurvivalRollup.apply_observations(observations)
+        PlantingGridCell.apply_deltas(grid_cells)
+        Project.apply_rollup_deltas(project_deltas)
+
+    updated = sum(1 for result in results if result['status'] == UPDATED)
+    return {
+        'received': len(rows),
+        'updated': updated,
+        'errors': len(rows) - updated,
+        'observed_on': observed_on,
+        'results': results,
+    }
+
+
+def _grid_contribution(planting, survival_rate, sign=1):
+    return PlantingGridCell.contribution(
+        planting.geohash, planting.quantity, survival_rate, planting.latitude, planting.longitude, sign=sign,
+    )
+
+
+def _error(index, row, errors):
+    planting_id = row.get('id') if isinstance(row, dict) else None
+    return {'index': index, 'id': planting_id, 'status': ERROR, 'errors': errors}
@@ -0,0 +1,82 @@
+"""
+Reporting periods for time series: days, calendar months and seasons.
+
+Seasons follow KACAF_SETTINGS['TREE_PLANTING_SEASON_START'] / ['..._END']
+("MM-DD"): each year has a planting season from START to END and an
+off-season from the day after END until the next START. A season is
+identified by its first day, so every date belongs to exactly one season.
+"""
+import calendar
+import datetime
+
+from django.conf import settings
+
+
+DAY = 'day'
+MONTH = 'month'
+SEASON = 'season'
+PERIODS = (DAY, MONTH, SEASON)
+
+PLANTING_SEASON = 'planting'
+OFF_SEASON = 'off'
+
+
+def _month_day(key, default):
+    month, day = getattr(settings, 'KACAF_SETTINGS', {}).get(key, default).split('-')
+    return int(month), int(day)
+
+
+def _on(year, month_day):
+    month, day = month_day
+    return datetime.date(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+
+def season_boundaries(year):
+    """(first day of the planting season, first day of the off-season) in `year`"""
+    start = _on(year, _month_day('TREE_PLANTING_SEASON_START', '03-01'))
+    end = _on(year, _month_day('TREE_PLANTING_SEASON_END', '06-30'))
+    return start, end + datetime.timedelta(days=1)
+
+
+def _season_starts(years):
+    for year in years:
+        yield from season_boundaries(year)
+
+
+def season_start(day):
+    return max(start for start in _season_starts((day.year - 1, day.year)) if start <= day)
+
+
+def season_label(start):
+    return PLANTING_SEASON if start == season_boundaries(start.year)[0] else OFF_SEASON
+
+
+def period_start(period, day):
+    """First day of the `period` containing `day`"""
+    if period == DAY:
+        return day
+    if period == MONTH:
+        return day.replace(day=1)
+    return season_start(day)
+
+
+def next_start(period, start):
+    """First day of the period after the one starting on `start`"""
+    if period == DAY:
+        return start + datetime.timedelta(days=1)
+    if period == MONTH:
+        return (start.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return min(day for day in _season_starts((start.year, start.year + 1)) if day > start)
+
+
+def previous_start(period, start):
+    """First day of the period before the one starting on `start`"""
+    return period_start(period, start - datetime.timedelta(days=1))
+
+
+def period_starts(period, first, last):
+    """Start of every `period` overlapping first..last, oldest first"""
+    start = period_start(period, first)
+    while start <= last:
+        yield start
+        start = next_start(period, start)
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Program, Project, TreePlanting, Training
+from .models import Program, Project, TreePlanting, Training, SurvivalObservation
 from accounts.serializers import UserSerializer
 
 
@@ -28,6 +28,40 @@ class TreePlantingSerializer(serializers.ModelSerializer):
         read_only_fields = ['farmer']
 
 
+class TreePlantingIngestSerializer(serializers.ModelSerializer):
+    """
+    One row of a bulk upload. References are plain ids (resolved for the whole
+    batch at once by programs.ingest) and client_uuid has no per-row
+    uniqueness query, so validating a row never touches the database.
+    """
+    project = serializers.IntegerField(min_value=1)
+    farmer = serializers.IntegerField(min_value=1, required=False)
+    client_uuid = serializers.UUIDField(required=False)
+    quantity = serializers.IntegerField(min_value=1, default=1)
+    survival_rate = serializers.IntegerField(min_value=0, max_value=100, default=100)
+    
+    class Meta:
+        model = TreePlanting
+        fields = [
+            'client_uuid', 'project', 'farmer', 'tree_type', 'species', 'quantity',
+            'planting_date', 'planting_site', 'gps_coordinates', 'survival_rate',
+            'last_monitoring_date', 'monitoring_notes',
+        ]
+
+
+class SurvivalUpdateSerializer(serializers.Serializer):
+    """One (id, survival_rate, notes) tuple of a monitoring visit"""
+    id = serializers.IntegerField(min_value=1)
+    survival_rate = serializers.IntegerField(min_value=0, max_value=100)
+    monitoring_notes = serializers.CharField(required=False, allow_blank=True)
+
+
+class SurvivalObservationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SurvivalObservation
+        fields = ['observed_on', 'survival_rate', 'recorded_by']
+
+
 class TrainingSerializer(serializers.ModelSerializer):
     trainer = UserSerializer(read_only=True)
     
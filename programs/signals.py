@@ -0,0 +1,182 @@
+# programs/signals.py
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from . import carbon
+from .models import Program, Project, TreePlanting, ImpactSnapshot, PlantingGridCell, SurvivalRollup
+
+
+# Snapshot counter -> source field, per model
+IMPACT_FIELDS = {
+    TreePlanting: {'total_trees_planted': 'quantity'},
+    Project: {
+        'total_area_coverage': 'area_coverage',
+        'carbon_sequestered': 'carbon_sequestration',
+    },
+    Program: {'total_beneficiaries': 'beneficiaries_reached'},
+}
+
+
+# Fields a planting contributes to the map grid, in PlantingGridCell.contribution() order
+GRID_FIELDS = ['geohash', 'quantity', 'survival_rate', 'latitude', 'longitude']
+# Fields behind the Project rollup columns
+ROLLUP_SOURCE_FIELDS = ['project_id', 'farmer_id', 'species', 'quantity', 'survival_rate']
+TRACKED_FIELDS = list(dict.fromkeys(GRID_FIELDS + ROLLUP_SOURCE_FIELDS))
+# Fields behind the cached program carbon totals (carbon.program_total)
+PROGRAM_CARBON_FIELDS = ['program_id', 'carbon_sequestration']
+
+# Fields whose previous values a save needs, per model
+EXTRA_WATCHED_FIELDS = {TreePlanting: TRACKED_FIELDS, Project: PROGRAM_CARBON_FIELDS}
+WATCHED_FIELDS = {
+    model: list(dict.fromkeys(list(fields.values()) + EXTRA_WATCHED_FIELDS.get(model, [])))
+    for model, fields in IMPACT_FIELDS.items()
+}
+
+
+@receiver(pre_save, sender=TreePlanting)
+@receiver(pre_save, sender=Project)
+@receiver(pre_save, sender=Program)
+def remember_previous_values(sender, instance, raw=False, **kwargs):
+    """
+    Capture what the row contributed before this save. The values loaded with
+    the instance serve when they cover every watched field; otherwise (.only(),
+    .defer(), an instance built by hand) one SELECT reads them.
+    """
+    if raw:
+        return
+    fields = WATCHED_FIELDS[sender]
+    loaded = getattr(instance, '_loaded_values', None)
+    if not instance._state.adding and loaded is not None and all(field in loaded for field in fields):
+        instance._previous_values = {field: loaded[field] for field in fields}
+    elif instance.pk is None:
+        instance._previous_values = {}
+    else:
+        instance._previous_values = sender._default_manager.filter(pk=instance.pk).values(*fields).first() or {}
+
+
+def _current_values(instance, fields):
+    """The row's values after the save; deferred fields were not written, so they are still the previous ones"""
+    deferred = instance.get_deferred_fields()
+    return {
+        field: instance._previous_values[field] if field in deferred else getattr(instance, field)
+        for field in fields
+    }
+
+
+def _remember_values(instance):
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded is None:
+        loaded = instance._loaded_values = {}
+    loaded.update(_current_values(instance, WATCHED_FIELDS[type(instance)]))
+
+
+@receiver(post_save, sender=TreePlanting)
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Program)
+def update_impact_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = instance._previous_values
+    current = _current_values(instance, IMPACT_FIELDS[sender].values())
+    ImpactSnapshot.apply_deltas(**{
+        counter: (current[field] or 0) - (previous.get(field) or 0)
+        for counter, field in IMPACT_FIELDS[sender].items()
+    })
+    _remember_values(instance)
+
+
+@receiver(post_delete, sender=TreePlanting)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Program)
+def update_impact_on_delete(sender, instance, **kwargs):
+    deltas = {
+        counter: -(getattr(instance, field) or 0)
+        for counter, field in IMPACT_FIELDS[type(instance)].items()
+    }
+    ImpactSnapshot.apply_deltas(**deltas)
+
+
+@receiver(post_save, sender=Project)
+def drop_program_carbon_on_save(sender, instance, raw=False, **kwargs):
+    """A project moving between programs or with an edited figure changes the cached program totals"""
+    if raw:
+        return
+    previous = instance._previous_values
+    current = _current_values(instance, PROGRAM_CARBON_FIELDS)
+    if any(previous.get(field) != current[field] for field in PROGRAM_CARBON_FIELDS):
+        program_ids = {previous.get('program_id'), current['program_id']}
+        transaction.on_commit(lambda: carbon.forget_program_totals(program_ids))
+
+
+@receiver(post_delete, sender=Project)
+def drop_program_carbon_on_delete(sender, instance, **kwargs):
+    program_ids = {instance.program_id}
+    transaction.on_commit(lambda: carbon.forget_program_totals(program_ids))
+
+
+def _grid_contribution(values, sign=1):
+    return PlantingGridCell.contribution(*(values[field] for field in GRID_FIELDS), sign=sign)
+
+
+def _project_totals(values, sign=1):
+    quantity = int(values['quantity'] or 0)
+    survival_rate = int(values['survival_rate'] or 0)
+    return sign * quantity, sign * quantity * survival_rate, sign, sign * survival_rate
+
+
+def _rollup_changes(previous, current):
+    """({project_id: (trees, surviving, plantings, survival_total)}, projects whose distinct counts may have changed)"""
+    deltas = defaultdict(lambda: (0, 0, 0, 0))
+    for values, sign in ((previous, -1), (current, 1)):
+        if values:
+            totals = _project_totals(values, sign)
+            deltas[values['project_id']] = tuple(map(sum, zip(deltas[values['project_id']], totals)))
+    deltas = {project_id: delta for project_id, delta in deltas.items() if any(delta)}
+    
+    refresh = set()
+    if not (previous and current) or any(previous[field] != current[field] for field in ('project_id', 'farmer_id', 'species')):
+        refresh = {values['project_id'] for values in (previous, current) if values}
+    return deltas, refresh
+
+
+@receiver(post_save, sender=TreePlanting)
+def update_rollups_on_save(sender, instance, raw=False, **kwargs):
+    """Map grid and Project rollups"""
+    if raw:
+        return
+    previous = instance._previous_values
+    current = _current_values(instance, TRACKED_FIELDS)
+    PlantingGridCell.apply_deltas([
+        _grid_contribution(previous, sign=-1) if previous else {},
+        _grid_contribution(current),
+    ])
+    Project.apply_rollup_deltas(*_rollup_changes(previous, current))
+
+
+@receiver(post_delete, sender=TreePlanting)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    current = {field: getattr(instance, field) for field in TRACKED_FIELDS}
+    PlantingGridCell.apply_deltas([_grid_contribution(current, sign=-1)])
+    Project.apply_rollup_deltas(*_rollup_changes(current, {}))
+
+
+@receiver(pre_delete, sender=TreePlanting)
+def remove_survival_history(sender, instance, **kwargs):
+    """Take the planting's observations out of the survival rollups before they cascade away"""
+    SurvivalRollup.apply_observations(
+        instance.survival_history.order_by().only('project_id', 'observed_on', 'survival_rate', 'quantity'), sign=-1,
+    )
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def update_member_count_on_save(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        ImpactSnapshot.apply_deltas(total_members=1)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def update_member_count_on_delete(sender, instance, **kwargs):
+    ImpactSnapshot.apply_deltas(total_members=-1)
@@ -0,0 +1,75 @@
+"""
+Tree planting statistics computed with grouped queries.
+
+TreeStatistics wraps any TreePlanting queryset (a farmer's, a project's, ...)
+and answers every figure in a fixed number of queries, however many species
+or months are involved:
+
+    summary(year)  1 query: totals, distinct counts, survival, and the
+                   monthly series for `year` via conditional aggregation
+    by_species()   1 query grouped by species
+    yearly()       1 query grouped by TruncYear
+"""
+from django.db.models import Avg, Count, F, Q, Sum
+from django.db.models.functions import TruncYear
+
+
+def _round(value, digits=1):
+    return round(float(value), digits) if value is not None else 0
+
+
+class TreeStatistics:
+
+    def __init__(self, plantings):
+        self.plantings = plantings.order_by()
+
+    def summary(self, year=None):
+        """Totals for the queryset; with `year`, also trees planted per month of that year"""
+        aggregates = {
+            'total_trees': Sum('quantity'),
+            'records': Count('id'),
+            'unique_farmers': Count('farmer', distinct=True),
+            'species_count': Count('species', distinct=True),
+            'avg_survival': Avg('survival_rate'),
+            'surviving_trees': Sum(F('quantity') * F('survival_rate')),
+        }
+        if year is not None:
+            for month in range(1, 13):
+                aggregates[f'month_{month}'] = Sum(
+                    'quantity',
+                    filter=Q(planting_date__year=year, planting_date__month=month),
+                )
+
+        row = self.plantings.aggregate(**aggregates)
+        total_trees = row['total_trees'] or 0
+        summary = {
+            'total_trees': total_trees,
+            'records': row['records'],
+            'unique_farmers': row['unique_farmers'],
+            'species_count': row['species_count'],
+            'avg_survival': _round(row['avg_survival']),
+            # Survival weighted by the number of trees in each record
+            'weighted_survival': _round(row['surviving_trees'] / total_trees) if total_trees else 0,
+        }
+        if year is not None:
+            summary['year'] = year
+            summary['monthly'] = [
+                {'month': month, 'total': row[f'month_{month}'] or 0}
+                for month in range(1, 13)
+            ]
+        return summary
+
+    def by_species(self):
+        rows = self.plantings.values('species').annotate(
+            total=Sum('quantity'),
+            records=Count('id'),
+            avg_survival=Avg('survival_rate'),
+        ).order_by('-total', 'species')
+        return [{**row, 'avg_survival': _round(row['avg_survival'])} for row in rows]
+
+    def yearly(self):
+        rows = self.plantings.annotate(year=TruncYear('planting_date')).values('year').annotate(
+            total=Sum('quantity'),
+            records=Count('id'),
+        ).order_by('year')
+        return [{**row, 'year': row['year'].year} for row in rows]
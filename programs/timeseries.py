@@ -0,0 +1,164 @@
+"""
+Downsampled survival-rate series for a planting, a project or a program.
+
+SurvivalSeries.series() returns at most MAX_POINTS points however long the
+history: with no resolution it picks the finest of day / month / season
+(programs.periods) that covers the range in MAX_POINTS buckets; an explicit
+resolution that would need more keeps the most recent MAX_POINTS buckets and
+reports truncated=True. Dates outside EARLIEST..today + LATEST_AHEAD are
+rejected by series_params(), and the buckets are counted back from the end,
+so a far-off start costs no more than MAX_POINTS steps.
+
+Projects and programs read SurvivalRollup (one grouped query over at most
+MAX_POINTS rows per project); a single planting groups its own observations
+by day, which the observed_on partitions and index keep to the range asked for.
+"""
+import datetime
+from collections import defaultdict
+
+from django.db.models import Count, F, Min, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+from .models import SurvivalRollup
+from .periods import DAY, MONTH, PERIODS, SEASON, period_start, period_starts, previous_start, season_label
+
+
+MAX_POINTS = 120
+
+# Bounds on ?start= / ?end=; outside them the season arithmetic leaves the calendar
+EARLIEST = datetime.date(1900, 1, 1)
+LATEST_AHEAD = datetime.timedelta(days=366)
+
+AUTO = 'auto'
+
+
+def _round(value, digits=1):
+    return round(float(value), digits) if value is not None else None
+
+
+class SurvivalSeries:
+
+    def __init__(self, rollups=None, observations=None):
+        self.rollups = rollups.order_by() if rollups is not None else None
+        self.observations = observations.order_by() if observations is not None else None
+
+    @classmethod
+    def for_planting(cls, planting):
+        return cls(observations=planting.survival_history.all())
+
+    @classmethod
+    def for_project(cls, project):
+        return cls(rollups=project.survival_rollups.all())
+
+    @classmethod
+    def for_program(cls, program):
+        return cls(rollups=SurvivalRollup.objects.filter(project__program=program))
+
+    def first_day(self):
+        if self.rollups is not None:
+            return self.rollups.filter(period=DAY).aggregate(first=Min('period_start'))['first']
+        return self.observations.aggregate(first=Min('observed_on'))['first']
+
+    def totals(self, period, first, last):
+        """{period start: [observations, survival, trees, surviving]} for periods from `first` to `last`"""
+        totals = defaultdict(lambda: [0, 0, 0, 0])
+        if self.rollups is not None:
+            rows = self.rollups.filter(period=period, period_start__gte=first, period_start__lte=last).values(
+                'period_start',
+            ).annotate(
+                count=Sum('observations'),
+                survival=Sum('survival_total'),
+                tree_count=Sum('trees'),
+                surviving=Sum('surviving_total'),
+            ).values_list('period_start', 'count', 'survival', 'tree_count', 'surviving')
+        else:
+            rows = self.observations.filter(observed_on__gte=first, observed_on__lte=last).values(
+                'observed_on',
+            ).annotate(
+                count=Count('id'),
+                survival=Sum('survival_rate'),
+                tree_count=Sum('quantity'),
+                surviving=Sum(F('quantity') * F('survival_rate')),
+            ).values_list('observed_on', 'count', 'survival', 'tree_count', 'surviving')
+        for day, *values in rows:
+            total = totals[period_start(period, day)]
+            for position, value in enumerate(values):
+                total[position] += value or 0
+        return totals
+
+    def series(self, resolution=None, start=None, end=None):
+        end = end or timezone.localdate()
+        start = max(start or self.first_day() or end, EARLIEST)
+        if resolution in (None, AUTO):
+            resolution = next(
+                (period for period in (DAY, MONTH) if self._count(period, start, end) <= MAX_POINTS),
+                SEASON,
+            )
+
+        # The most recent MAX_POINTS buckets, walked back from the end
+        first = period_start(resolution, start)
+        starts = []
+        bucket = period_start(resolution, end)
+        while bucket >= first and len(starts) < MAX_POINTS:
+            starts.append(bucket)
+            bucket = previous_start(resolution, bucket)
+        truncated = bucket >= first
+        starts.reverse()
+
+        points = []
+        if starts:
+            totals = self.totals(resolution, starts[0], end)
+            for bucket in starts:
+                if bucket not in totals:
+                    continue
+                observations, survival, trees, surviving = totals[bucket]
+                point = {
+                    'start': bucket,
+                    'observations': observations,
+                    'avg_survival': _round(survival / observations) if observations else None,
+                    'weighted_survival': _round(surviving / trees) if trees else None,
+                }
+                if resolution == SEASON:
+                    point['season'] = season_label(bucket)
+                points.append(point)
+
+        return {
+            'resolution': resolution,
+            'start': starts[0] if starts else start,
+            'end': end,
+            'truncated': truncated,
+            'points': points,
+        }
+
+    @staticmethod
+    def _count(period, start, end):
+        count = 0
+        for _ in period_starts(period, start, end):
+            count += 1
+            if count > MAX_POINTS:
+                break
+        return count
+
+
+def series_params(params):
+    """resolution / start / end keyword arguments for series() from query parameters"""
+    resolution = params.get('resolution', AUTO)
+    if resolution not in (AUTO, *PERIODS):
+        raise ValidationError({'resolution': f"Expected one of {', '.join((AUTO, *PERIODS))}."})
+    dates = {}
+    for name in ('start', 'end'):
+        if params.get(name):
+            try:
+                dates[name] = parse_date(params[name])
+            except ValueError:
+                dates[name] = None
+            if dates[name] is None:
+                raise ValidationError({name: "Expected YYYY-MM-DD."})
+            latest = timezone.localdate() + LATEST_AHEAD
+            if not EARLIEST <= dates[name] <= latest:
+                raise ValidationError({name: f"Must be between {EARLIEST} and {latest}."})
+    if 'start' in dates and 'end' in dates and dates['start'] > dates['end']:
+        raise ValidationError({'start': "Must not be after end."})
+    return {'resolution': resolution, **dates}
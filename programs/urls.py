@@ -17,6 +17,7 @@ urlpatterns = [
     path('<int:pk>/', views.web_program_detail, name='program_detail'),
     path('<int:pk>/edit/', views.web_program_edit, name='program_edit'),
     path('my-trees/', views.web_my_trees, name='my_trees'),
+    path('trees/monitoring/', views.web_bulk_update_survival, name='bulk_update_survival'),
     path('trees/add/', views.web_add_tree_planting, name='add_tree_planting'),
     path('trees/<int:pk>/', views.web_tree_detail, name='tree_detail'),
     path('trees/<int:pk>/update-survival/', views.web_update_tree_survival, name='update_tree_survival'),
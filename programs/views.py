@@ -1,20 +1,42 @@
 # programs/views.py
+import hashlib
+import json
+
+from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, render, redirect
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from django.db.models import Sum, Count, Q
-from .models import Program, Project, TreePlanting, Training
+from .models import Program, Project, TreePlanting, Training, PlantingGridCell
 from .serializers import (
     ProgramSerializer, ProjectSerializer, 
     TreePlantingSerializer, TrainingSerializer,
-    ProgramProgressSerializer
+    ProgramProgressSerializer, SurvivalObservationSerializer
 )
-from .forms import ProgramForm, TreePlantingForm
+from . import carbon, monitoring
+from .forms import ProgramForm, TreePlantingForm, SurvivalUpdateFormSet
+from .ingest import TooManyRows, ingest_plantings
+from .statistics import TreeStatistics
+from .timeseries import SurvivalSeries, series_params
+from core.cache import cache_policy
+from core.geo import ZOOM_PRECISION, GeoFilter, cluster
+from core.parsers import NDJSONParser
+
+# Map tiles (TreePlantingViewSet.tiles)
+MAX_TILE_ZOOM = len(ZOOM_PRECISION) - 1
+TILE_FIELDS = ['cell', 'lat', 'lng', 'plantings', 'trees', 'survival']
+# Plantings per page of the monitoring-visit form
+MONITORING_PAGE_SIZE = 50
 
 # ============================================================
 # API VIEWS (REST Framework) - URL: /api/programs/*
@@ -36,6 +58,7 @@ class ProgramViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
     
     @action(detail=False, methods=['get'])
+    @cache_policy('programs.stats')
     def stats(self, request):
         """API endpoint for program statistics"""
         stats = {
@@ -43,7 +66,7 @@ class ProgramViewSet(viewsets.ModelViewSet):
             'active_programs': Program.objects.filter(status='active').count(),
             'total_beneficiaries_target': Program.objects.aggregate(Sum('beneficiaries_target'))['beneficiaries_target__sum'] or 0,
             'total_beneficiaries_reached': Program.objects.aggregate(Sum('beneficiaries_reached'))['beneficiaries_reached__sum'] or 0,
-            'programs_by_type': Program.objects.values('program_type').annotate(count=Count('id')),
+            'programs_by_type': list(Program.objects.values('program_type').annotate(count=Count('id'))),
         }
         return Response(stats)
     
@@ -55,6 +78,28 @@ class ProgramViewSet(viewsets.ModelViewSet):
         serializer = ProjectSerializer(projects, many=True, context={'request': request})
         return Response(serializer.data)
     
+    @action(detail=True, methods=['get'])
+    def carbon(self, request, pk=None):
+        """Carbon sequestration for donor reporting: program total, per project and per species"""
+        program = self.get_object()
+        total = carbon.program_total(program)
+        projects = program.projects.order_by('-carbon_sequestration').values(
+            'id', 'title', 'trees_planted', 'carbon_sequestration', 'carbon_computed_at',
+        )
+        return Response({
+            'program': program.pk,
+            'model_version': carbon.MODEL_VERSION,
+            'co2_tonnes': total,
+            'projects': list(projects),
+            'by_species': carbon.species_breakdown(TreePlanting.objects.filter(project__program=program)),
+        })
+    
+    @action(detail=True, methods=['get'])
+    def survival_series(self, request, pk=None):
+        """Survival trend across the program's projects (?resolution=auto|day|month|season&start=&end=)"""
+        program = self.get_object()
+        return Response(SurvivalSeries.for_program(program).series(**series_params(request.query_params)))
+    
     @action(detail=True, methods=['patch'])
     def update_progress(self, request, pk=None):
         """API endpoint to update program progress"""
@@ -78,6 +123,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
     URL: /api/programs/projects/
     """
     serializer_class = ProjectSerializer
+    filter_backends = [*api_settings.DEFAULT_FILTER_BACKENDS, GeoFilter]
     
     def get_queryset(self):
         program_id = self.request.query_params.get('program', None)
@@ -104,14 +150,31 @@ class ProjectViewSet(viewsets.ModelViewSet):
     def statistics(self, request, pk=None):
         """API endpoint for project statistics"""
         project = self.get_object()
+        tree_stats = TreeStatistics(project.tree_plantings.all())
+        # Headline figures are the project's maintained rollup columns; the species and
+        # yearly breakdowns stay live grouped queries over this project's plantings
         stats = {
-            'trees_planted': project.tree_plantings.aggregate(Sum('quantity'))['quantity__sum'] or 0,
-            'unique_farmers': project.tree_plantings.values('farmer').distinct().count(),
-            'species_count': project.tree_plantings.values('species').distinct().count(),
+            'trees_planted': project.trees_planted,
+            'unique_farmers': project.unique_farmers,
+            'species_count': project.species_count,
+            'avg_survival': project.avg_survival,
+            'weighted_survival': project.weighted_survival,
             'total_area': project.area_coverage,
             'carbon_sequestration': project.carbon_sequestration,
+            'carbon_computed_at': project.carbon_computed_at,
+            # Recomputed by `manage.py compute_carbon`, never on a read
+            'carbon_stale': project.carbon_stale,
+            'carbon_model': carbon.MODEL_VERSION,
+            'by_species': tree_stats.by_species(),
+            'yearly': tree_stats.yearly(),
         }
         return Response(stats)
+    
+    @action(detail=True, methods=['get'])
+    def survival_series(self, request, pk=None):
+        """Survival trend for the project (?resolution=auto|day|month|season&start=&end=)"""
+        project = self.get_object()
+        return Response(SurvivalSeries.for_project(project).series(**series_params(request.query_params)))
 
 
 class TreePlantingViewSet(viewsets.ModelViewSet):
@@ -120,6 +183,7 @@ class TreePlantingViewSet(viewsets.ModelViewSet):
     URL: /api/programs/tree-plantings/
     """
     serializer_class = TreePlantingSerializer
+    filter_backends = [*api_settings.DEFAULT_FILTER_BACKENDS, GeoFilter]
     
     def get_queryset(self):
         user = self.request.user
@@ -148,6 +212,119 @@ class TreePlantingViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(trees, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def map(self, request):
+        """
+        Planting map for the visible viewport: ?bbox=west,south,east,north&zoom=<0-18>.
+        Returns geohash clusters (count, trees, centroid) instead of individual rows.
+        """
+        if 'bbox' not in request.query_params:
+            return Response({'error': 'bbox is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            zoom = int(request.query_params.get('zoom', 10))
+        except ValueError:
+            return Response({'error': 'zoom must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        plantings = self.filter_queryset(self.get_queryset())
+        return Response({'zoom': zoom, 'clusters': cluster(plantings, zoom, weight='quantity')})
+    
+    @action(detail=False, methods=['get'], url_path=r'tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)')
+    def tiles(self, request, z, x, y):
+        """
+        Pre-aggregated planting clusters for slippy-map tile z/x/y, read from
+        PlantingGridCell (all plantings, aggregates only). Rows are arrays in
+        the order given by `fields`; the ETag lets map clients revalidate tiles.
+        """
+        z, x, y = int(z), int(x), int(y)
+        if z > MAX_TILE_ZOOM or x >= 2 ** z or y >= 2 ** z:
+            return Response({'error': 'No such tile.'}, status=status.HTTP_404_NOT_FOUND)
+        
+        payload = {'z': z, 'x': x, 'y': y, 'fields': TILE_FIELDS, 'cells': PlantingGridCell.tile(z, x, y)}
+        etag = quote_etag(hashlib.md5(json.dumps(payload, separators=(',', ':')).encode()).hexdigest())
+        response = get_conditional_response(request, etag=etag) or Response(payload)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, max_age=60)
+        return response
+    
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request):
+        """
+        Bulk upload from offline collection: a JSON array or NDJSON
+        (Content-Type: application/x-ndjson) of plantings. Rows are reported
+        individually; set client_uuid on each row to make retries safe.
+        """
+        rows = request.data
+        if not isinstance(rows, list):
+            return Response({'error': 'Expected a list of plantings.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            summary = ingest_plantings(rows, request.user)
+        except TooManyRows as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        return Response(summary, status=status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['get'])
+    def statistics(self, request):
+        """
+        Per-farmer tree statistics: the current user, or ?farmer=<id> for staff.
+        ?year= selects the monthly series (default: this year).
+        """
+        try:
+            farmer_id = int(request.query_params.get('farmer', request.user.pk))
+            year = int(request.query_params.get('year', timezone.now().year))
+        except ValueError:
+            return Response({'error': 'farmer and year must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if farmer_id != request.user.pk and not request.user.is_staff:
+            return Response({'error': 'Not authorized.'}, status=status.HTTP_403_FORBIDDEN)
+        
+        tree_stats = TreeStatistics(TreePlanting.objects.filter(farmer_id=farmer_id))
+        return Response({
+            'farmer': farmer_id,
+            'summary': tree_stats.summary(year=year),
+            'by_species': tree_stats.by_species(),
+            'yearly': tree_stats.yearly(),
+        })
+    
+    @action(detail=False, methods=['post'], url_path='bulk-survival')
+    def bulk_survival(self, request):
+        """
+        Record a monitoring visit: a list of {id, survival_rate, monitoring_notes},
+        or {"observed_on": "YYYY-MM-DD", "updates": [...]}. Rows are reported
+        individually and every update is kept in the planting's survival history.
+        """
+        data = request.data
+        rows, observed_on = data, None
+        if isinstance(data, dict):
+            rows = data.get('updates')
+            observed_on = data.get('observed_on')
+            if observed_on:
+                observed_on = parse_date(str(observed_on))
+                if observed_on is None:
+                    return Response({'error': 'observed_on must be a date.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(rows, list):
+            return Response({'error': 'Expected a list of survival updates.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            summary = monitoring.apply_survival_updates(rows, request.user, observed_on=observed_on)
+        except monitoring.TooManyRows as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        return Response(summary, status=status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['get'])
+    def survival_history(self, request, pk=None):
+        """Survival observations for one planting, oldest first (for trend charts)"""
+        tree_planting = self.get_object()
+        history = tree_planting.survival_history.order_by('observed_on', 'id')
+        serializer = SurvivalObservationSerializer(history, many=True)
+        return Response(serializer.data)
+    
+    @action(detail=True, methods=['get'])
+    def survival_series(self, request, pk=None):
+        """Downsampled survival trend for one planting (?resolution=auto|day|month|season&start=&end=)"""
+        tree_planting = self.get_object()
+        return Response(SurvivalSeries.for_planting(tree_planting).series(**series_params(request.query_params)))
+    
     @action(detail=True, methods=['patch'])
     def update_survival(self, request, pk=None):
         """API endpoint to update tree survival rate"""
@@ -156,10 +333,10 @@ class TreePlantingViewSet(viewsets.ModelViewSet):
         notes = request.data.get('monitoring_notes', '')
         
         if survival_rate is not None:
-            tree_planting.survival_rate = survival_rate
-            tree_planting.monitoring_notes = notes
-            tree_planting.last_monitoring_date = timezone.now().date()
-            tree_planting.save()
+            row = {'id': tree_planting.pk, 'survival_rate': survival_rate, 'monitoring_notes': notes}
+            result = monitoring.apply_survival_updates([row], request.user)['results'][0]
+            if result['status'] == monitoring.ERROR:
+                return Response(result['errors'], status=status.HTTP_400_BAD_REQUEST)
             return Response({'message': 'Survival rate updated.'}, status=status.HTTP_200_OK)
         
         return Response({'error': 'Survival rate required.'}, status=status.HTTP_400_BAD_REQUEST)
@@ -398,33 +575,14 @@ def web_my_trees(request):
     # Get all tree plantings by the current user
     trees = TreePlanting.objects.filter(farmer=request.user).order_by('-planting_date')
     
-    # Calculate statistics
-    total_trees = trees.aggregate(total=Sum('quantity'))['total'] or 0
-    total_species = trees.values('species').distinct().count()
-    
-    # Get trees by species
-    trees_by_species = trees.values('species').annotate(
-        total=Sum('quantity'),
-    ).order_by('-total')
-    
-    # Add average survival rate to each species
-    for species in trees_by_species:
-        species_trees = trees.filter(species=species['species'])
-        avg_survival = species_trees.aggregate(avg=Sum('survival_rate') / Count('id'))['avg'] or 0
-        species['avg_survival'] = round(avg_survival, 1)
-    
-    # Get monthly planting data for charts
+    # Calculate statistics: one query for totals + monthly chart, one per-species
     current_year = timezone.now().year
-    monthly_data = []
-    for month in range(1, 13):
-        month_total = trees.filter(
-            planting_date__year=current_year,
-            planting_date__month=month
-        ).aggregate(total=Sum('quantity'))['total'] or 0
-        monthly_data.append({
-            'month': month,
-            'total': month_total
-        })
+    stats = TreeStatistics(trees)
+    summary = stats.summary(year=current_year)
+    total_trees = summary['total_trees']
+    total_species = summary['species_count']
+    trees_by_species = stats.by_species()
+    monthly_data = summary['monthly']
     
     # Get projects the user has participated in
     projects = Project.objects.filter(
@@ -499,13 +657,15 @@ def web_update_tree_survival(request, pk):
         survival_rate = request.POST.get('survival_rate')
         monitoring_notes = request.POST.get('monitoring_notes', '')
         
-        if survival_rate:
-            tree.survival_rate = survival_rate
-            tree.monitoring_notes = monitoring_notes
-            tree.last_monitoring_date = timezone.now().date()
-            tree.save()
+        row = {'id': tree.pk, 'survival_rate': survival_rate, 'monitoring_notes': monitoring_notes}
+        result = monitoring.apply_survival_updates([row], request.user)['results'][0]
+        if result['status'] == monitoring.ERROR:
+            for field, errors in result['errors'].items():
+                for error in errors:
+                    messages.error(request, f"{field.replace('_', ' ').capitalize()}: {error}")
+        else:
             messages.success(request, "Tree survival rate updated successfully!")
-            return redirect('programs:web_tree_detail', pk=pk)
+            return redirect('programs:tree_detail', pk=pk)
     
     context = {
         'user': request.user,
@@ -514,6 +674,59 @@ def web_update_tree_survival(request, pk):
     return render(request, 'programs/update_tree_survival.html', context)
 
 
+
+@login_required
+def web_bulk_update_survival(request):
+    """
+    Web view for recording a monitoring visit across many plantings at once
+    URL: /programs/trees/monitoring/
+    """
+    trees = monitoring.monitorable_plantings(request.user).select_related('project').order_by(
+        'project__title', 'planting_date', 'pk',
+    )
+    project_id = request.GET.get('project')
+    if project_id:
+        try:
+            trees = trees.filter(project_id=int(project_id))
+        except ValueError:
+            messages.error(request, "Unknown project.")
+            return redirect('programs:bulk_update_survival')
+    page = Paginator(trees, MONITORING_PAGE_SIZE).get_page(request.GET.get('page'))
+    trees_by_id = {str(tree.pk): tree for tree in page}
+    initial = [
+        {'id': tree.pk, 'survival_rate': tree.survival_rate, 'monitoring_notes': tree.monitoring_notes}
+        for tree in trees_by_id.values()
+    ]
+    
+    if request.method == "POST":
+        formset = SurvivalUpdateFormSet(request.POST, initial=initial)
+        if formset.is_valid():
+            # Only the plantings ticked or edited on this visit; the rest were not checked
+            rows = [
+                {field: value for field, value in form.cleaned_data.items() if field != 'checked'}
+                for form in formset if form.has_changed()
+            ]
+            if not rows:
+                messages.info(request, "Nothing recorded: tick or edit the plantings checked on this visit.")
+                return redirect(request.get_full_path())
+            summary = monitoring.apply_survival_updates(rows, request.user)
+            messages.success(request, f"Survival recorded for {summary['updated']} planting(s).")
+            if summary['errors']:
+                messages.warning(request, f"{summary['errors']} planting(s) could not be updated.")
+            return redirect('programs:my_trees')
+    else:
+        formset = SurvivalUpdateFormSet(initial=initial)
+    
+    context = {
+        'user': request.user,
+        'formset': formset,
+        'management_form': formset.management_form,
+        'rows': [(trees_by_id.get(str(form['id'].value())), form) for form in formset],
+        'page_obj': page,
+        'project_id': project_id or '',
+    }
+    return render(request, 'programs/bulk_update_survival.html', context)
+
 # ============================================================
 # Alias for backward compatibility (optional)
 # ============================================================
@@ -577,7 +790,7 @@ def web_program_join(request, pk):
 from django.shortcuts import render
 from django.utils import timezone
 from django.db.models import Sum, Count
-from programs.models import Program, Project, TreePlanting
+from programs.models import Program, ImpactSnapshot
 from events.models import Event
 from testimonials.models import Testimonial
 from partners.models import Partner
@@ -593,13 +806,8 @@ def public_dashboard(request):
     featured_programs = Program.objects.filter(status__iexact='active').order_by('-created_at')[:3]
 
 
-    # Total counts for impact counters
-    total_trees_planted = TreePlanting.objects.aggregate(total=Sum('quantity'))['total'] or 0
-    total_members = User.objects.count()
-    total_area_coverage = Project.objects.aggregate(total=Sum('area_coverage'))['total'] or 0
-    #carbon_sequestered = TreePlanting.objects.aggregate(total=Sum('carbon_sequestered'))['total'] or 0
-    carbon_sequestered = Project.objects.aggregate(total=Sum('carbon_sequestration'))['total'] or 0
-    total_beneficiaries = Program.objects.aggregate(total=Sum('beneficiaries_reached'))['total'] or 0
+    # Impact counters come from the precomputed snapshot (single indexed read)
+    impact = ImpactSnapshot.current()
 
     # Upcoming events (next 3)
     upcoming_events = Event.objects.filter(start_datetime__gte=timezone.now()).order_by('start_datetime')[:3]
@@ -607,16 +815,16 @@ def public_dashboard(request):
     # Testimonials (latest 3)
     testimonials = Testimonial.objects.order_by('-created_at')[:3]
 
-    # Partners
-    partners = Partner.objects.all()
+    # Partners (only the columns the template renders)
+    partners = Partner.objects.only('name', 'logo', 'website')
 
     context = {
         'featured_programs': featured_programs,
-        'total_trees_planted': total_trees_planted,
-        'total_members': total_members,
-        'total_area_coverage': total_area_coverage,
-        'carbon_sequestered': carbon_sequestered,
-        'total_beneficiaries': total_beneficiaries,
+        'total_trees_planted': impact.total_trees_planted,
+        'total_members': impact.total_members,
+        'total_area_coverage': impact.total_area_coverage,
+        'carbon_sequestered': impact.carbon_sequestered,
+        'total_beneficiaries': impact.total_beneficiaries,
         'upcoming_events': upcoming_events,
         'testimonials': testimonials,
         'partners': partners,
@@ -1,6 +1,7 @@
 from django.db import models
 from django.utils import timezone
 from django.urls import reverse
+from core.storage import content_addressed_storage
 
 class ResourceCategory(models.Model):
     name = models.CharField(max_length=100)
@@ -48,7 +49,7 @@ class Resource(models.Model):
     description = models.TextField()
     
     # File or link
-    file = models.FileField(upload_to='resources/', blank=True, null=True)
+    file = models.FileField(upload_to='resources/', storage=content_addressed_storage, blank=True, null=True)
     external_link = models.URLField(blank=True, null=True, help_text="External URL if no file")
     
     # Metadata
@@ -3,7 +3,10 @@ from django.views.generic import ListView, DetailView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.http import HttpResponse, Http404
 from django.db.models import Q, Count
-import os
+from core import counters
+from core.downloads import serve_file, starts_download
+from core.storage import blob_digest, download_filename
+from search.models import SearchEntry
 from .models import Resource, ResourceCategory, ResourceCollection
 
 class ResourceListView(ListView):
@@ -30,14 +33,10 @@ class ResourceListView(ListView):
         if audience:
             queryset = queryset.filter(audience=audience)
         
-        # Search
+        # Search (full-text index)
         query = self.request.GET.get('q')
         if query:
-            queryset = queryset.filter(
-                Q(title__icontains=query) | 
-                Q(description__icontains=query) |
-                Q(author__icontains=query)
-            )
+            queryset = queryset.filter(pk__in=SearchEntry.matching(query, Resource))
         
         return queryset
     
@@ -64,9 +63,8 @@ class ResourceDetailView(DetailView):
     
     def get_object(self):
         resource = super().get_object()
-        # Increment view count
-        resource.views += 1
-        resource.save(update_fields=['views'])
+        # Increment view count (buffered, flushed in bulk)
+        counters.increment(resource, 'views')
         return resource
     
     def get_context_data(self, **kwargs):
@@ -83,13 +81,19 @@ def download_resource(request, slug):
     if not resource.file:
         raise Http404("No file available for download")
     
-    # Increment download count
-    resource.downloads += 1
-    resource.save(update_fields=['downloads'])
+    # Stream the file; the blob hash doubles as a strong ETag
+    response = serve_file(
+        request,
+        resource.file,
+        etag=blob_digest(resource.file.name),
+        last_modified=resource.updated_at,
+        filename=download_filename(resource.file, resource.slug),
+        private=False,
+    )
     
-    # Serve file
-    response = HttpResponse(resource.file, content_type='application/octet-stream')
-    response['Content-Disposition'] = f'attachment; filename="{os.path.basename(resource.file.name)}"'
+    # Increment download count (buffered, flushed in bulk), once per transfer
+    if starts_download(request, response):
+        counters.increment(resource, 'downloads')
     return response
 
 class CategoryDetailView(DetailView):
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class SearchConfig(AppConfig):
+    name = 'search'
+    verbose_name = 'Search'
+    
+    def ready(self):
+        from .signals import connect_signals
+        connect_signals()
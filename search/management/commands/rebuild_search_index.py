@@ -0,0 +1,38 @@
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from search.models import SearchEntry
+from search.sources import SOURCES
+
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index from documents, resources and announcements"
+    
+    def add_arguments(self, parser):
+        parser.add_argument('types', nargs='*', choices=sorted(SOURCES), help="Only these source types")
+    
+    def handle(self, *args, **options):
+        for type_name in options['types'] or sorted(SOURCES):
+            source = SOURCES[type_name]
+            content_type = ContentType.objects.get_for_model(source.model)
+            
+            with transaction.atomic():
+                SearchEntry.objects.filter(content_type=content_type).delete()
+                batch, indexed = [], 0
+                for instance in source.model.objects.iterator(chunk_size=BATCH_SIZE):
+                    if not source.is_indexed(instance):
+                        continue
+                    batch.append(SearchEntry(content_type=content_type, object_id=instance.pk, **source.entry_fields(instance)))
+                    if len(batch) >= BATCH_SIZE:
+                        indexed += len(SearchEntry.objects.bulk_create(batch))
+                        batch = []
+                indexed += len(SearchEntry.objects.bulk_create(batch))
+                
+                # One pass computes every vector in the database
+                SearchEntry.objects.filter(content_type=content_type).update(search_vector=SearchEntry.vector())
+            
+            self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} {type_name}s"))
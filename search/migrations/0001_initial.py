@@ -0,0 +1,37 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:30
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('keywords', models.TextField(blank=True, default='')),
+                ('body', models.TextField(blank=True, default='')),
+                ('url', models.CharField(blank=True, default='', max_length=500)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name_plural': 'Search Entries',
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='search_entry_vector_gin')],
+                'unique_together': {('content_type', 'object_id')},
+            },
+        ),
+    ]
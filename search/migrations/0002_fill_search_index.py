@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.urls import reverse
+from django.utils.html import strip_tags
+
+
+# A frozen copy of the search.sources rules as they stood when the index was
+# introduced; later changes reach existing rows through `manage.py rebuild_search_index`
+
+def _join(*values):
+    return ' '.join(str(value) for value in values if value)
+
+
+def _documents(Document):
+    for document in Document.objects.filter(is_active=True).iterator(chunk_size=500):
+        yield document.pk, {
+            'title': document.title[:255],
+            'keywords': _join(document.tags, document.keywords),
+            'body': strip_tags(document.description or ''),
+            'url': reverse('documents:document-detail', args=[document.pk]),
+        }
+
+
+def _resources(Resource):
+    for resource in Resource.objects.filter(is_published=True).iterator(chunk_size=500):
+        yield resource.pk, {
+            'title': resource.title[:255],
+            'keywords': _join(resource.author, resource.organization, resource.get_resource_type_display()),
+            'body': strip_tags(resource.description or ''),
+            'url': reverse('resources:resource_detail', args=[resource.slug]),
+        }
+
+
+def _announcements(Announcement):
+    for announcement in Announcement.objects.filter(is_published=True).iterator(chunk_size=500):
+        yield announcement.pk, {
+            'title': announcement.title[:255],
+            'keywords': _join(strip_tags(announcement.summary or ''), announcement.meta_keywords),
+            'body': strip_tags(announcement.content or ''),
+            'url': reverse('communications:announcement-detail', args=[announcement.pk]),
+        }
+
+
+def fill_index(apps, schema_editor):
+    """Entries for the rows that existed before the index, so ?search= finds them straight after deploy"""
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    SearchEntry = apps.get_model('search', 'SearchEntry')
+    for label, rows in (
+        ('documents.Document', _documents),
+        ('resources.Resource', _resources),
+        ('communications.Announcement', _announcements),
+    ):
+        model = apps.get_model(label)
+        content_type, _ = ContentType.objects.get_or_create(
+            app_label=model._meta.app_label, model=model._meta.model_name,
+        )
+        SearchEntry.objects.bulk_create([
+            SearchEntry(content_type=content_type, object_id=pk, **fields)
+            for pk, fields in rows(model)
+        ], batch_size=500, ignore_conflicts=True)
+    config = getattr(settings, 'SEARCH_CONFIG', 'english')
+    SearchEntry.objects.update(search_vector=(
+        SearchVector('title', weight='A', config=config)
+        + SearchVector('keywords', weight='B', config=config)
+        + SearchVector('body', weight='C', config=config)
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+        ('communications', '0001_initial'),
+        ('documents', '0001_initial'),
+        ('resources', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,104 @@
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector, SearchVectorField
+from django.db import models
+from django.db.models import F
+
+
+def search_config():
+    return getattr(settings, 'SEARCH_CONFIG', 'english')
+
+
+class SearchEntry(models.Model):
+    """Denormalized, full-text indexed copy of one searchable row (see search/sources.py)"""
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    
+    title = models.CharField(max_length=255)
+    keywords = models.TextField(blank=True, default='')
+    body = models.TextField(blank=True, default='')
+    url = models.CharField(max_length=500, blank=True, default='')
+    
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = "Search Entries"
+        unique_together = ['content_type', 'object_id']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='search_entry_vector_gin'),
+        ]
+    
+    def __str__(self):
+        return f"{self.content_type.model}: {self.title}"
+    
+    @staticmethod
+    def vector():
+        config = search_config()
+        return (
+            SearchVector('title', weight='A', config=config)
+            + SearchVector('keywords', weight='B', config=config)
+            + SearchVector('body', weight='C', config=config)
+        )
+    
+    @staticmethod
+    def query(text):
+        return SearchQuery(text, search_type='websearch', config=search_config())
+    
+    @classmethod
+    def index(cls, source, instance):
+        """Create or refresh the entry for instance, or drop it if it should not be searchable"""
+        content_type = ContentType.objects.get_for_model(instance)
+        if not source.is_indexed(instance):
+            cls.objects.filter(content_type=content_type, object_id=instance.pk).delete()
+            return None
+        
+        entry, _ = cls.objects.update_or_create(
+            content_type=content_type,
+            object_id=instance.pk,
+            defaults=source.entry_fields(instance),
+        )
+        cls.objects.filter(pk=entry.pk).update(search_vector=cls.vector())
+        return entry
+    
+    @classmethod
+    def remove(cls, instance):
+        cls.objects.filter(
+            content_type=ContentType.objects.get_for_model(instance),
+            object_id=instance.pk,
+        ).delete()
+    
+    @classmethod
+    def matching(cls, text, model):
+        """Ids of `model` rows whose entry matches text, for use as a pk__in subquery"""
+        return cls.objects.filter(
+            content_type=ContentType.objects.get_for_model(model),
+            search_vector=cls.query(text),
+        ).values('object_id')
+    
+    @classmethod
+    def search(cls, text, allowed):
+        """
+        Entries matching text among `allowed` ({model: visible queryset}),
+        best match first, each with a rank and a highlighted snippet.
+        """
+        query = cls.query(text)
+        visible = models.Q()
+        for model, queryset in allowed.items():
+            visible |= models.Q(
+                content_type=ContentType.objects.get_for_model(model),
+                object_id__in=queryset.values('pk'),
+            )
+        if not visible:
+            return cls.objects.none()
+        
+        return cls.objects.filter(visible, search_vector=query).defer('search_vector', 'keywords', 'body').annotate(
+            rank=SearchRank(F('search_vector'), query),
+            snippet=SearchHeadline(
+                'body', query,
+                config=search_config(),
+                start_sel='<mark>', stop_sel='</mark>',
+                max_words=35, min_words=15, max_fragments=2,
+            ),
+        ).order_by('-rank', '-updated_at')
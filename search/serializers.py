@@ -0,0 +1,16 @@
+from rest_framework import serializers
+from .models import SearchEntry
+
+
+class SearchResultSerializer(serializers.ModelSerializer):
+    type = serializers.SerializerMethodField()
+    id = serializers.IntegerField(source='object_id')
+    rank = serializers.FloatField()
+    snippet = serializers.CharField()
+    
+    class Meta:
+        model = SearchEntry
+        fields = ['type', 'id', 'title', 'snippet', 'url', 'rank', 'updated_at']
+    
+    def get_type(self, obj):
+        return self.context['types'][obj.content_type_id]
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save
+
+from .models import SearchEntry
+from .sources import SOURCES, source_for
+
+
+def update_search_entry(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    SearchEntry.index(source_for(sender), instance)
+
+
+def remove_search_entry(sender, instance, **kwargs):
+    SearchEntry.remove(instance)
+
+
+def connect_signals():
+    for source in SOURCES.values():
+        label = source.model._meta.label
+        post_save.connect(update_search_entry, sender=source.model, dispatch_uid=f'search-index-save-{label}')
+        post_delete.connect(remove_search_entry, sender=source.model, dispatch_uid=f'search-index-delete-{label}')
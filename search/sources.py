@@ -0,0 +1,106 @@
+"""
+Searchable models.
+
+Each source says how a row is copied into SearchEntry and which rows a user
+may see. Visibility reuses the rules of the app's own API, so search never
+reveals a row the user could not open there.
+"""
+from django.apps import apps
+from django.urls import reverse
+from django.utils.html import strip_tags
+
+
+def _join(*values):
+    return ' '.join(str(value) for value in values if value)
+
+
+class SearchSource:
+    model_label = None
+    type = None
+    
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+    
+    def is_indexed(self, instance):
+        return True
+    
+    def entry_fields(self, instance):
+        raise NotImplementedError
+    
+    def visible_to(self, user):
+        raise NotImplementedError
+
+
+class DocumentSource(SearchSource):
+    model_label = 'documents.Document'
+    type = 'document'
+    
+    def is_indexed(self, instance):
+        return instance.is_active
+    
+    def entry_fields(self, instance):
+        return {
+            'title': instance.title[:255],
+            'keywords': _join(instance.tags, instance.keywords),
+            'body': strip_tags(instance.description or ''),
+            'url': reverse('documents:document-detail', args=[instance.pk]),
+        }
+    
+    def visible_to(self, user):
+        if not user.is_authenticated:
+            return self.model.objects.none()
+        queryset = self.model.visible_to(user)
+        if user.is_staff or user.user_type == 'executive':
+            return queryset
+        # Listed but not openable (CanAccessDocument): keep them out of results
+        return queryset.filter(access_level__in=['public', 'member'])
+
+
+class ResourceSource(SearchSource):
+    model_label = 'resources.Resource'
+    type = 'resource'
+    
+    def is_indexed(self, instance):
+        return instance.is_published
+    
+    def entry_fields(self, instance):
+        return {
+            'title': instance.title[:255],
+            'keywords': _join(instance.author, instance.organization, instance.get_resource_type_display()),
+            'body': strip_tags(instance.description or ''),
+            'url': instance.get_absolute_url(),
+        }
+    
+    def visible_to(self, user):
+        return self.model.objects.filter(is_published=True)
+
+
+class AnnouncementSource(SearchSource):
+    model_label = 'communications.Announcement'
+    type = 'announcement'
+    
+    def is_indexed(self, instance):
+        return instance.is_published
+    
+    def entry_fields(self, instance):
+        return {
+            'title': instance.title[:255],
+            'keywords': _join(strip_tags(instance.summary or ''), instance.meta_keywords),
+            'body': strip_tags(instance.content or ''),
+            'url': reverse('communications:announcement-detail', args=[instance.pk]),
+        }
+    
+    def visible_to(self, user):
+        # Announcement.visible_to decides, anonymous visitors included ('all' announcements)
+        return self.model.visible_to(user)
+
+
+SOURCES = {source.type: source for source in (DocumentSource(), ResourceSource(), AnnouncementSource())}
+
+
+def source_for(model):
+    for source in SOURCES.values():
+        if source.model is model:
+            return source
+    return None
@@ -0,0 +1,47 @@
+from django.contrib.contenttypes.models import ContentType
+from rest_framework import generics, permissions
+from rest_framework.exceptions import ValidationError
+
+from .models import SearchEntry
+from .serializers import SearchResultSerializer
+from .sources import SOURCES
+
+
+class SearchView(generics.ListAPIView):
+    """
+    Full-text search across documents, resources and announcements.
+    
+    ?q=       websearch syntax: words, "quoted phrases", -excluded, or
+    ?type=    comma-separated subset of document,resource,announcement
+    
+    Snippets are plain text with matches wrapped in <mark></mark>.
+    """
+    serializer_class = SearchResultSerializer
+    permission_classes = [permissions.AllowAny]
+    
+    def get_sources(self):
+        requested = self.request.query_params.get('type')
+        if not requested:
+            return list(SOURCES.values())
+        types = [value.strip() for value in requested.split(',') if value.strip()]
+        unknown = [value for value in types if value not in SOURCES]
+        if unknown:
+            raise ValidationError({'type': f"Unknown type(s): {', '.join(unknown)}"})
+        return [SOURCES[value] for value in types]
+    
+    def get_queryset(self):
+        text = self.request.query_params.get('q', '').strip()
+        if not text:
+            return SearchEntry.objects.none()
+        
+        user = self.request.user
+        allowed = {source.model: source.visible_to(user) for source in self.get_sources()}
+        return SearchEntry.search(text, allowed)
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['types'] = {
+            ContentType.objects.get_for_model(source.model).pk: source.type
+            for source in SOURCES.values()
+        }
+        return context